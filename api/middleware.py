@@ -1,39 +1,147 @@
+import math
+import time
 from fastapi import Request
-from utils.logger import Logger
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
+from security.security_config import SECURITY_CONFIG
+from utils.logger import Logger, LogSampler
+from utils.rate_limiter import TokenBucketLimiter, SQLiteRateLimitBackend
+from utils.security import SecurityUtils
 from datetime import datetime
 
 logger = Logger()
+log_sampler = LogSampler()
+
+if SECURITY_CONFIG['RATE_LIMIT_BACKEND'] == "sqlite":
+    rate_limiter = SQLiteRateLimitBackend(SECURITY_CONFIG['RATE_LIMIT_DB'])
+else:
+    rate_limiter = TokenBucketLimiter(shards=SECURITY_CONFIG['RATE_LIMIT_SHARDS'])
+
+# Summary key for requests that match no route, so scans cannot grow the counters
+UNMATCHED_ROUTE = "<unmatched>"
+
+def route_template(request: Request) -> str:
+    """The path template of the route a request will reach, e.g. /threats/{id}
+
+    Middleware runs before routing, so the router's matching is repeated
+    here; a partial match (wrong method) counts as its route, as it does
+    for the router.
+    """
+    route = request.scope.get("route")
+    if route is None:
+        for candidate in request.app.router.routes:
+            match, _ = candidate.matches(request.scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+            if match == Match.PARTIAL and route is None:
+                route = candidate
+    return getattr(route, "path", UNMATCHED_ROUTE)
 
 async def log_requests(request: Request, call_next):
-    """Log all API requests"""
+    """Log API requests, sampled per route so volume tracks incidents, not traffic"""
     start_time = datetime.utcnow()
-    
+    started = time.perf_counter()
+    route = route_template(request)
+    sampled = log_sampler.should_sample(route)
+
     # Log request details
-    logger.log_activity(
-        user_id="system",
-        action="API_REQUEST",
-        details={
-            "method": request.method,
-            "url": str(request.url),
-            "client_ip": request.client.host,
-            "timestamp": start_time.isoformat()
-        }
-    )
-    
-    response = await call_next(request)
-    
-    # Log response details
-    end_time = datetime.utcnow()
-    duration = (end_time - start_time).total_seconds()
+    if sampled and log_sampler.allow("API_REQUEST", route):
+        logger.log_activity(
+            user_id="system",
+            action="API_REQUEST",
+            details={
+                "method": request.method,
+                "url": str(request.url),
+                "client_ip": request.client.host,
+                "timestamp": start_time.isoformat()
+            }
+        )
+    elif not sampled:
+        log_sampler.suppress("API_REQUEST", route)
+
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        # Unhandled errors are always kept, then left to the server to answer
+        details = _response_details(request, 500, time.perf_counter() - started, sampled)
+        details["error"] = repr(e)
+        logger.log_activity(user_id="system", action="API_RESPONSE", details=details)
+        log_sampler.flush_summary(logger)
+        raise
     
-    logger.log_activity(
-        user_id="system",
-        action="API_RESPONSE",
-        details={
-            "status_code": response.status_code,
-            "duration": duration,
-            "timestamp": end_time.isoformat()
-        }
+    # Log response details; errors (4xx included, so denied and throttled
+    # requests stay visible) and slow requests are always kept
+    duration = time.perf_counter() - started
+    always_keep = (
+        response.status_code >= log_sampler.always_log_status
+        or duration * 1000 >= log_sampler.slow_request_ms
     )
-    
+    if always_keep or (sampled and log_sampler.allow("API_RESPONSE", route)):
+        logger.log_activity(
+            user_id="system",
+            action="API_RESPONSE",
+            details=_response_details(request, response.status_code, duration, sampled)
+        )
+    elif not sampled:
+        log_sampler.suppress("API_RESPONSE", route)
+
+    log_sampler.flush_summary(logger)
+    return response
+
+def _response_details(request: Request, status_code: int, duration: float, sampled: bool) -> dict:
+    details = {
+        "status_code": status_code,
+        "duration": duration,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    if not sampled:
+        # The request entry was dropped, so carry its context here
+        details.update(method=request.method, url=str(request.url),
+                       client_ip=request.client.host)
+    return details
+
+async def rate_limit_requests(request: Request, call_next):
+    """Enforce each API key's request rate with a token bucket"""
+    api_key = request.headers.get("X-API-Key")
+    if not api_key:
+        return await call_next(request)
+
+    # Resolve the key first so its own limit applies from the first request;
+    # the route's verification then finds it cached
+    record = SecurityUtils.lookup_cached_api_key(api_key)
+    if record is None:
+        record = await run_in_threadpool(SecurityUtils.load_api_key, api_key)
+    if record:
+        limit = record.get('rate_limit') or SECURITY_CONFIG['RATE_LIMIT_REQUESTS']
+        key = f"key:{record['id']}"
+    else:
+        # Invalid keys share one bucket per client, so guessing keys is
+        # throttled and cannot create a bucket per guess
+        limit = SECURITY_CONFIG['RATE_LIMIT_REQUESTS']
+        key = f"client:{request.client.host}"
+    period = SECURITY_CONFIG['RATE_LIMIT_PERIOD'].total_seconds()
+
+    if rate_limiter.blocking:
+        allowed, retry_after, remaining = await run_in_threadpool(
+            rate_limiter.acquire, key, limit, period
+        )
+    else:
+        allowed, retry_after, remaining = rate_limiter.acquire(key, limit, period)
+
+    headers = {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+    }
+    if not allowed:
+        headers["Retry-After"] = str(math.ceil(retry_after))
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Rate limit exceeded"},
+            headers=headers
+        )
+
+    response = await call_next(request)
+    response.headers.update(headers)
     return response
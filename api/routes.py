@@ -1,16 +1,30 @@
-from fastapi import FastAPI, HTTPException, Depends, Security
+import asyncio
+from fastapi import FastAPI, HTTPException, Depends, Security, Query, Request
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 from datetime import datetime
+from pydantic import ValidationError
 from models import *
+from api.schemas import ThreatReportSchema, AlertSchema, RiskAssessmentSchema, AssetSchema
+from api.streaming import EXPORT_MEDIA_TYPES, CodecJSONResponse, export_response
+from api.middleware import rate_limit_requests, log_requests
+from config import ANALYTICS_CONFIG, API_CONFIG
+from services.threat_service import ThreatService
+from services.alert_service import ALERT_STATUS_FILTERS, AlertService
+from database import Database, db
+from utils.codec import Codec
+from utils.anomaly import volume_detector
 from utils.security import SecurityUtils
+from utils.sketches import sketch_engine
 from utils.logger import Logger
 
 api = FastAPI(
     title="DiploCyber Hub API",
     description="API for IGO Cybersecurity Platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=CodecJSONResponse
 )
 
 # Configure CORS
@@ -22,16 +36,79 @@ api.add_middleware(
     allow_headers=["*"],
 )
 
+# Rate limiting per API key
+api.middleware("http")(rate_limit_requests)
+
+# Sampled request logging, outermost so rate-limited requests are seen too
+api.middleware("http")(log_requests)
+
+@api.on_event("startup")
+async def load_anomaly_baselines():
+    """Replay recent hourly volumes into the anomaly detector once per worker"""
+    await run_in_threadpool(
+        volume_detector.rebuild, db, ANALYTICS_CONFIG["anomaly_seed_weeks"]
+    )
+
+async def flush_sketches_periodically(database: Database):
+    """Merge this worker's sketch deltas into the stored daily sketches"""
+    while True:
+        await asyncio.sleep(ANALYTICS_CONFIG["sketch_flush_interval"])
+        await run_in_threadpool(sketch_engine.flush, database)
+
+@api.on_event("startup")
+async def start_sketch_flusher():
+    api.state.sketch_flusher = asyncio.create_task(flush_sketches_periodically(db))
+
+@api.on_event("shutdown")
+async def flush_sketches():
+    """Stop the periodic flush and merge whatever is still pending"""
+    api.state.sketch_flusher.cancel()
+    await run_in_threadpool(sketch_engine.flush, db)
+
 # Security
 api_key_header = APIKeyHeader(name="X-API-Key")
 logger = Logger()
 
-async def verify_api_key(api_key: str = Security(api_key_header)):
-    # Implement API key verification
-    if not SecurityUtils.verify_api_key(api_key):
+async def verify_api_key(request: Request, api_key: str = Security(api_key_header)):
+    # Cache hits stay on the event loop; misses hit the database in a worker thread
+    record = SecurityUtils.lookup_cached_api_key(api_key)
+    if record is None:
+        record = await run_in_threadpool(SecurityUtils.load_api_key, api_key)
+    if not record:
         raise HTTPException(status_code=403, detail="Invalid API key")
+    request.state.api_key = record
     return api_key
 
+def parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    """Parse an ISO 8601 query parameter"""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}")
+
+def parse_format(value: str) -> str:
+    """Validate the response format query parameter"""
+    if value != "json" and value not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {value}")
+    return value
+
+def parse_severity(value: Optional[str]) -> Optional[str]:
+    """Validate the threat severity filter before any response starts"""
+    if value is not None:
+        try:
+            ThreatLevel(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid severity: {value}")
+    return value
+
+def parse_alert_status(value: Optional[str]) -> Optional[str]:
+    """Validate the alert status filter before any response starts"""
+    if value is not None and value not in ALERT_STATUS_FILTERS:
+        raise HTTPException(status_code=400, detail=f"Invalid status: {value}")
+    return value
+
 # Threat Intelligence Endpoints
 @api.get("/api/v1/threats", tags=["Threats"])
 async def get_threats(
@@ -39,19 +116,43 @@ async def get_threats(
     severity: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(API_CONFIG['page_size'], ge=1, le=API_CONFIG['max_page_size']),
+    export_format: str = Query("json", alias="format"),
     api_key: str = Depends(verify_api_key)
 ):
-    """Get threat intelligence data"""
+    """Get threat intelligence data, one keyset page at a time
+
+    With format=ndjson or format=csv the full filtered range is streamed in
+    chunks instead, so exports run in constant memory.
+    """
+    severity = parse_severity(severity)
+    start = parse_date(start_date, "start_date")
+    end = parse_date(end_date, "end_date")
+    if parse_format(export_format) != "json":
+        chunks = ThreatService.iter_threats(
+            organization_id, severity, start, end, API_CONFIG['export_chunk_size']
+        )
+        return export_response(chunks, export_format, "threats")
     try:
-        # Implement threat retrieval logic
-        return {"status": "success", "data": []}
+        threats, next_cursor = await ThreatService.get_threats_page(
+            organization_id, severity, start, end, cursor, limit
+        )
+        # Returned as a response so FastAPI skips its generic encoder
+        return CodecJSONResponse({
+            "status": "success",
+            "data": threats,
+            "next_cursor": next_cursor
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.log_error(str(e), "API_ERROR")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api.post("/api/v1/threats", tags=["Threats"])
 async def report_threat(
-    threat: ThreatIncident,
+    threat: ThreatReportSchema,
     api_key: str = Depends(verify_api_key)
 ):
     """Report a new security threat"""
@@ -62,6 +163,70 @@ async def report_threat(
         logger.log_error(str(e), "API_ERROR")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def parse_batch_body(body: bytes, content_type: str) -> list:
+    """Decode a batch request body given as a JSON array or NDJSON"""
+    try:
+        if content_type.startswith("application/x-ndjson"):
+            return Codec.decode_ndjson(body)
+        items = Codec.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed batch body")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Batch body must be a JSON array")
+    return items
+
+@api.post("/api/v1/threats:batch", tags=["Threats"])
+async def report_threats_batch(
+    request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """Report a batch of threats as a JSON array or NDJSON body"""
+    items = parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > API_CONFIG['max_batch_size']:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {API_CONFIG['max_batch_size']} threats"
+        )
+
+    # Validate everything up front; only valid items are written
+    results = [None] * len(items)
+    valid, positions = [], []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Threat must be a JSON object")
+            report = ThreatReportSchema(**item)
+            ThreatLevel(report.severity)
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "error", "errors": e.errors()}
+        except ValueError as e:
+            results[index] = {"index": index, "status": "error", "errors": [str(e)]}
+        else:
+            valid.append(report.dict())
+            positions.append(index)
+
+    try:
+        threats = await ThreatService.report_threats(valid)
+    except Exception as e:
+        logger.log_error(str(e), "API_ERROR")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    for index, threat in zip(positions, threats):
+        results[index] = {
+            "index": index,
+            "status": "created",
+            "id": threat.id,
+            "risk_score": threat.risk_score
+        }
+
+    rejected = len(items) - len(threats)
+    return {
+        "status": "success" if not rejected else "partial",
+        "accepted": len(threats),
+        "rejected": rejected,
+        "results": results
+    }
+
 # Risk Assessment Endpoints
 @api.get("/api/v1/risk-assessment/{organization_id}", tags=["Risk Assessment"])
 async def get_risk_assessment(
@@ -78,7 +243,7 @@ async def get_risk_assessment(
 
 @api.post("/api/v1/risk-assessment", tags=["Risk Assessment"])
 async def create_risk_assessment(
-    assessment: RiskAssessment,
+    assessment: RiskAssessmentSchema,
     api_key: str = Depends(verify_api_key)
 ):
     """Create new risk assessment"""
@@ -94,19 +259,40 @@ async def create_risk_assessment(
 async def get_alerts(
     organization_id: str,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(API_CONFIG['page_size'], ge=1, le=API_CONFIG['max_page_size']),
+    export_format: str = Query("json", alias="format"),
     api_key: str = Depends(verify_api_key)
 ):
-    """Get security alerts"""
+    """Get security alerts, one keyset page at a time
+
+    With format=ndjson or format=csv all matching alerts are streamed.
+    """
+    status = parse_alert_status(status)
+    if parse_format(export_format) != "json":
+        chunks = AlertService.iter_alerts(
+            organization_id, status, API_CONFIG['export_chunk_size']
+        )
+        return export_response(chunks, export_format, "alerts")
     try:
-        # Implement alert retrieval logic
-        return {"status": "success", "data": []}
+        alerts, next_cursor = await AlertService.get_alerts_page(
+            organization_id, status, cursor, limit
+        )
+        # Returned as a response so FastAPI skips its generic encoder
+        return CodecJSONResponse({
+            "status": "success",
+            "data": alerts,
+            "next_cursor": next_cursor
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.log_error(str(e), "API_ERROR")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api.post("/api/v1/alerts", tags=["Alerts"])
 async def create_alert(
-    alert: SecurityAlert,
+    alert: AlertSchema,
     api_key: str = Depends(verify_api_key)
 ):
     """Create new security alert"""
@@ -133,7 +319,7 @@ async def get_assets(
 
 @api.post("/api/v1/assets", tags=["Assets"])
 async def register_asset(
-    asset: AssetInventory,
+    asset: AssetSchema,
     api_key: str = Depends(verify_api_key)
 ):
     """Register new asset"""
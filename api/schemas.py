@@ -9,6 +9,8 @@ class ThreatReportSchema(BaseModel):
     affected_systems: List[str]
     reported_by: str
     organization_id: str
+    threat_type: Optional[str] = None
+    source_ip: Optional[str] = None
 
 class AlertSchema(BaseModel):
     title: str
@@ -0,0 +1,56 @@
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, List
+from fastapi.responses import JSONResponse, StreamingResponse
+from utils.codec import Codec
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+class CodecJSONResponse(JSONResponse):
+    """JSON response rendered through the shared codec"""
+
+    def render(self, content: Any) -> bytes:
+        return Codec.dumps(content)
+
+def _csv_value(value):
+    """Flatten a model value into a CSV cell"""
+    if isinstance(value, (dict, list)):
+        return Codec.dumps_text(value)
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def _ndjson_chunks(chunks: AsyncIterator[List]) -> AsyncIterator[bytes]:
+    async for records in chunks:
+        yield Codec.encode_ndjson(records)
+
+async def _csv_chunks(chunks: AsyncIterator[List]) -> AsyncIterator[bytes]:
+    header = None
+    async for records in chunks:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in records:
+            row = record.to_dict()
+            if header is None:
+                header = list(row)
+                writer.writerow(header)
+            writer.writerow(_csv_value(row.get(name)) for name in header)
+        yield buffer.getvalue().encode()
+
+def export_response(chunks: AsyncIterator[List], export_format: str, filename: str) -> StreamingResponse:
+    """Stream model chunks to the client as NDJSON or CSV"""
+    body = _csv_chunks(chunks) if export_format == "csv" else _ndjson_chunks(chunks)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
@@ -7,19 +7,38 @@ import hashlib
 import sqlite3
 import os
 from config import UI_CONFIG, APP_CONFIG
+from database import ACCOUNTS_TABLE, db, migrate_legacy_accounts
+from utils.metrics import metrics_engine
+
+# Dashboard reads go to the totals the database keeps current, so writes
+# from the API show up on the next rerun
+@st.cache_resource(show_spinner=False)
+def get_database():
+    db.connect()
+    return db
+
+# The process-wide connection pool, shared with every page and service
+def get_pool():
+    return get_database().pool
+
+# Overall threat level shown for the most severe open threat
+THREAT_LEVEL_DISPLAY = [
+    ("critical", "Critical", "#FF4B4B"),
+    ("high", "Elevated", "#FFD700"),
+    ("medium", "Guarded", "#87CEEB"),
+]
 
 # Initialize database
 def init_db():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (username TEXT PRIMARY KEY, 
-                  password TEXT,
-                  organization TEXT,
-                  email TEXT,
-                  created_date TEXT)''')
-    conn.commit()
-    conn.close()
+    with get_pool().connection() as conn:
+        migrate_legacy_accounts(conn)
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {ACCOUNTS_TABLE}
+                     (username TEXT PRIMARY KEY, 
+                      password TEXT,
+                      organization TEXT,
+                      email TEXT,
+                      created_date TEXT)''')
+        conn.commit()
 
 # Hash password
 def make_hashed_password(password):
@@ -33,26 +52,20 @@ def check_password(password, hashed_password):
 
 # Add user to database
 def add_user(username, password, organization, email):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
     hashed_password = make_hashed_password(password)
-    try:
-        c.execute("INSERT INTO users VALUES (?,?,?,?,?)", 
-                 (username, hashed_password, organization, email, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
+    with get_pool().connection() as conn:
+        try:
+            conn.execute(f"INSERT INTO {ACCOUNTS_TABLE} VALUES (?,?,?,?,?)", 
+                     (username, hashed_password, organization, email, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.commit()
+            return True
+        except sqlite3.IntegrityError:
+            return False
 
 # Verify user
 def verify_user(username, password):
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute("SELECT password FROM users WHERE username=?", (username,))
-    result = c.fetchone()
-    conn.close()
+    with get_pool().connection() as conn:
+        result = conn.execute(f"SELECT password FROM {ACCOUNTS_TABLE} WHERE username=?", (username,)).fetchone()
     if result is not None:
         return check_password(password, result[0])
     return False
@@ -311,22 +324,29 @@ else:
 
     # Quick Stats Row
     col1, col2, col3, col4 = st.columns(4)
+    totals = metrics_engine.totals(get_database())
+    active_by_level = totals['active_by_level']
+    threat_level, threat_color = "Low", "#90EE90"
+    for level, label, color in THREAT_LEVEL_DISPLAY:
+        if active_by_level[level]:
+            threat_level, threat_color = label, color
+            break
     
     with col1:
-        st.markdown("""
+        st.markdown(f"""
             <div class="metric-card">
                 <h3>Threat Level</h3>
-                <h2 style="color: #FFD700;">Elevated</h2>
-                <p>↑ from Moderate</p>
+                <h2 style="color: {threat_color};">{threat_level}</h2>
+                <p>{totals['unacknowledged_alerts']} unacknowledged alerts</p>
             </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
+        st.markdown(f"""
             <div class="metric-card">
                 <h3>Active Incidents</h3>
-                <h2>12</h2>
-                <p>3 Critical, 9 Moderate</p>
+                <h2>{totals['active_threats']}</h2>
+                <p>{active_by_level['critical']} Critical, {totals['active_threats'] - active_by_level['critical']} Moderate</p>
             </div>
         """, unsafe_allow_html=True)
     
@@ -0,0 +1,87 @@
+"""Compare the shared codec with the standard library json baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_codec [count]
+"""
+import json
+import sys
+import time
+from datetime import datetime
+from enum import Enum
+import utils.codec as codec
+from models import ThreatIncident, ThreatLevel, ThreatStatus
+from utils.codec import Codec
+
+DEFAULT_COUNT = 20_000
+ROUNDS = 5
+
+def _stdlib_default(value):
+    """The per-call-site default used before the codec existed"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def build(count: int) -> list:
+    """Construct count threat incidents to serialize"""
+    return [
+        ThreatIncident(
+            title="Phishing campaign",
+            description="Credential harvesting emails",
+            organization_id="org-1",
+            reported_by="sensor-1",
+            threat_level=ThreatLevel.HIGH,
+            status=ThreatStatus.ACTIVE,
+            affected_systems=["mail", "vpn"],
+            impact_assessment={"users": 12, "departments": ["finance"]},
+            risk_score=6.7
+        )
+        for _ in range(count)
+    ]
+
+def best_of(func) -> float:
+    """Return the fastest of several timed runs"""
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    threats = build(count)
+    rows = [threat.to_dict() for threat in threats]
+    stdlib_body = "".join(json.dumps(row, default=_stdlib_default) + "\n" for row in rows)
+    codec_body = Codec.encode_ndjson(rows)
+
+    cases = {
+        "encode ndjson (models)": (
+            lambda: "".join(json.dumps(t.to_dict(), default=_stdlib_default) + "\n" for t in threats).encode(),
+            lambda: Codec.encode_ndjson(threats),
+        ),
+        "encode ndjson (dicts)": (
+            lambda: "".join(json.dumps(row, default=_stdlib_default) + "\n" for row in rows).encode(),
+            lambda: Codec.encode_ndjson(rows),
+        ),
+        "decode ndjson": (
+            lambda: [json.loads(line) for line in stdlib_body.splitlines()],
+            lambda: Codec.decode_ndjson(codec_body),
+        ),
+        "json column": (
+            lambda: [json.dumps(row["impact_assessment"], default=str) for row in rows],
+            lambda: [Codec.dumps_text(row["impact_assessment"]) for row in rows],
+        ),
+    }
+
+    print(f"json backend: {'orjson' if codec.orjson else 'stdlib'}, "
+          f"binary backend: {'msgpack' if codec.msgpack else 'json'}, {count} threats")
+    for name, (baseline, candidate) in cases.items():
+        before, after = best_of(baseline), best_of(candidate)
+        print(f"{name:>24}: stdlib {before * 1000:8.1f} ms  codec {after * 1000:8.1f} ms  "
+              f"{before / after:5.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compare construction time and memory of the slotted models with the
+previous plain-class models.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_models [count]
+"""
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from enum import Enum
+
+DEFAULT_COUNT = 200_000
+
+class LegacyThreatLevel(Enum):
+    CRITICAL = "critical"
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+class LegacyThreatStatus(Enum):
+    ACTIVE = "active"
+    RESOLVED = "resolved"
+
+class LegacyThreatIncident:
+    """The pre-dataclass model: class-level defaults and a per-instance __dict__"""
+    id: str = str(uuid.uuid4())
+    created_at: datetime = datetime.utcnow()
+    updated_at: datetime = datetime.utcnow()
+    is_active: bool = True
+
+    def __init__(self, **kwargs):
+        now = datetime.utcnow()
+        self.id = str(uuid.uuid4())
+        self.created_at = now
+        self.updated_at = now
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+def build(variant: str, count: int) -> list:
+    """Construct count threat incidents with the chosen model classes"""
+    if variant == "legacy":
+        model, level, status = LegacyThreatIncident, LegacyThreatLevel.HIGH, LegacyThreatStatus.ACTIVE
+    else:
+        from models import ThreatIncident, ThreatLevel, ThreatStatus
+        model, level, status = ThreatIncident, ThreatLevel.HIGH, ThreatStatus.ACTIVE
+    return [
+        model(
+            title="Phishing campaign",
+            description="Credential harvesting emails",
+            organization_id="org-1",
+            reported_by="sensor-1",
+            threat_level=level,
+            status=status,
+            affected_systems=["mail"],
+            impact_assessment=None,
+            mitigation_steps=[],
+            resolution_notes=None,
+            resolved_at=None,
+            resolution_time=None,
+            risk_score=6.7
+        )
+        for _ in range(count)
+    ]
+
+def measure(variant: str, count: int):
+    """Build the models in this process and print seconds and peak RSS growth"""
+    import models  # noqa: F401 - import cost excluded from the measurement
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    instances = build(variant, count)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed:.4f} {peak - baseline} {len(instances)}")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    results = {}
+    for variant in ("legacy", "slotted"):
+        # Each variant runs in a fresh interpreter so RSS is not shared
+        output = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.bench_models", "--measure", variant, str(count)],
+            text=True
+        )
+        elapsed, rss_kb, _ = output.split()
+        results[variant] = (float(elapsed), int(rss_kb))
+        print(f"{variant:>8}: {float(elapsed):.3f}s  {int(rss_kb) / 1024:.1f} MiB for {count} incidents")
+
+    legacy, slotted = results["legacy"], results["slotted"]
+    print(f"construction speedup: {legacy[0] / slotted[0]:.2f}x")
+    print(f"memory reduction:     {legacy[1] / max(slotted[1], 1):.2f}x")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,84 @@
+"""Compare reassessing every organization one after another with the sharded
+process-pool batch.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_risk_batch [organizations] [workers]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from database import Database, async_db, db
+from models import (AssetInventory, ComplianceReport, Organization, ThreatIncident, ThreatLevel,
+                    ThreatStatus)
+from services.risk_service import RiskService
+
+DEFAULT_COUNT = 300
+ASSETS = 200        # per organization
+THREATS = 2_000     # per organization
+START = datetime(2024, 1, 1)
+
+def populate(database: Database, count: int):
+    """Insert count organizations with their assets, compliance history and threats"""
+    rng = np.random.default_rng(11)
+    levels = list(ThreatLevel)
+    statuses = list(ThreatStatus)
+    for index in range(count):
+        organization_id = f"org-{index}"
+        database.bulk_insert(
+            [Organization(id=organization_id, name=f"Agency {index}", type="UN Agency")]
+            + [
+                AssetInventory(organization_id=organization_id, asset_name=f"asset-{i}",
+                               vulnerabilities=["CVE"] * int(rng.integers(0, 3)))
+                for i in range(ASSETS)
+            ]
+            + [
+                ComplianceReport(organization_id=organization_id,
+                                 compliance_score=float(rng.random()),
+                                 assessment_date=START + timedelta(days=30 * month))
+                for month in range(12)
+            ]
+            + [
+                ThreatIncident(organization_id=organization_id,
+                               threat_level=levels[int(rng.integers(0, len(levels)))],
+                               status=statuses[int(rng.integers(0, len(statuses)))],
+                               created_at=START + timedelta(minutes=i))
+                for i in range(THREATS)
+            ]
+        )
+
+async def serial(organization_ids):
+    for organization_id in organization_ids:
+        await RiskService.perform_risk_assessment(organization_id)
+
+def timed(coroutine):
+    started = time.perf_counter()
+    asyncio.run(coroutine)
+    return time.perf_counter() - started
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    with tempfile.TemporaryDirectory() as directory:
+        # Point the database every service shares at the scratch file
+        db.db_name = os.path.join(directory, "bench.db")
+        db.connect()
+        populate(db, count)
+        organization_ids = [f"org-{index}" for index in range(count)]
+
+        serial_time = timed(serial(organization_ids))
+        batch_time = timed(RiskService.assess_organizations(organization_ids, workers=workers))
+        stored = db.fetch_one("SELECT COUNT(*) FROM risk_assessments")[0]
+        assert stored == 2 * count
+
+        print(f"{count} organizations: serial {serial_time:.2f} s, "
+              f"batch on {workers} workers {batch_time:.2f} s "
+              f"({serial_time / batch_time:.1f}x)")
+        async_db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare a year of resolution percentiles and distinct counts read from the
+daily sketches with computing them exactly from the threats table.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sketches [incidents]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from database import Database, sketch_query
+from models import ThreatIncident, ThreatStatus
+from utils.sketches import SketchEngine
+
+DEFAULT_COUNT = 500_000
+CHUNK = 50_000
+START = datetime(2024, 1, 1)
+DAYS = 365
+
+def populate(database: Database, count: int):
+    """Insert count incidents for one organization spread over DAYS days"""
+    rng = np.random.default_rng(3)
+    minutes = rng.lognormal(4, 1, count).astype(int) + 1
+    step = timedelta(days=DAYS) / count
+    for offset in range(0, count, CHUNK):
+        database.bulk_insert([
+            ThreatIncident(
+                organization_id="org-1",
+                affected_systems=[f"system-{i % 5_000}", f"system-{(i * 7) % 5_000}"],
+                source_ip=f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+                reported_by=f"analyst-{i % 300}",
+                status=ThreatStatus.RESOLVED,
+                resolution_time=int(minutes[i]),
+                created_at=START + step * i
+            )
+            for i in range(offset, min(offset + CHUNK, count))
+        ])
+
+def exact(database: Database, end: datetime) -> dict:
+    params = ("org-1", START.isoformat(), end.isoformat())
+    where = "organization_id = ? AND created_at >= ? AND created_at < ?"
+    times = [row[0] for row in database.fetch_all(
+        f"SELECT resolution_time FROM threats WHERE {where}", params
+    )]
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    systems = database.fetch_one(
+        "SELECT COUNT(DISTINCT value) FROM threats, json_each(threats.affected_systems) "
+        f"WHERE {where}", params
+    )[0]
+    ips, reporters = database.fetch_one(
+        f"SELECT COUNT(DISTINCT source_ip), COUNT(DISTINCT reported_by) FROM threats WHERE {where}",
+        params
+    )
+    return {
+        'distinct_affected_systems': systems, 'distinct_source_ips': ips,
+        'distinct_reporters': reporters, 'resolution_time_p50': p50,
+        'resolution_time_p95': p95, 'resolution_time_p99': p99,
+    }
+
+def sketched(database: Database, engine: SketchEngine, end: datetime) -> dict:
+    rows = database.fetch_all(*sketch_query(START, end, "org-1"))
+    return engine.summarize(engine.merged(rows, "org-1", START, end))
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    end = START + timedelta(days=DAYS)
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(os.path.join(directory, "bench.db"))
+        database.connect()
+        populate(database, count)
+        engine = SketchEngine()
+        _, build = timed(engine.rebuild, database)
+        stored = database.fetch_one("SELECT SUM(LENGTH(sketch)) FROM threat_daily_sketches")[0]
+        print(f"{count} incidents over {DAYS} days; sketches built in {build:.2f} s, "
+              f"{stored / 1024:.0f} KiB stored")
+
+        truth, exact_time = timed(exact, database, end)
+        estimate, sketch_time = timed(sketched, database, engine, end)
+        for key, value in truth.items():
+            print(f"{key:>26}: exact {value:10.1f}  sketch {estimate[key]:10.1f}  "
+                  f"{(estimate[key] / value - 1) * 100:+5.1f}%")
+        print(f"exact {exact_time * 1000:.0f} ms  sketch {sketch_time * 1000:.0f} ms  "
+              f"{exact_time / sketch_time:.0f}x")
+        database.disconnect()
+
+if __name__ == "__main__":
+    main()
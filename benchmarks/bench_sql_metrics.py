@@ -0,0 +1,68 @@
+"""Compare SQL GROUP BY threat metrics with loading the rows into the
+in-memory AnalyticsEngine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sql_metrics [incidents]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from database import Database, async_db, db
+from models import ThreatIncident, ThreatLevel, ThreatStatus
+from services.analytics_service import AnalyticsService
+
+DEFAULT_COUNT = 500_000
+CHUNK = 50_000
+START = datetime(2024, 1, 1)
+DAYS = 365
+
+def populate(database: Database, count: int):
+    """Insert count incidents for one organization spread over DAYS days"""
+    levels = list(ThreatLevel)
+    step = timedelta(days=DAYS) / count
+    for offset in range(0, count, CHUNK):
+        database.bulk_insert([
+            ThreatIncident(
+                organization_id="org-1",
+                threat_type="Phishing",
+                threat_level=levels[i % 4],
+                status=ThreatStatus.RESOLVED if i % 3 == 0 else ThreatStatus.ACTIVE,
+                resolution_time=(i % 500) + 10 if i % 3 == 0 else None,
+                created_at=START + step * i
+            )
+            for i in range(offset, min(offset + CHUNK, count))
+        ])
+
+async def best_of(func, rounds: int = 3) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+async def compare(count: int):
+    end = START + timedelta(days=DAYS)
+    for label, start in (("full year", START), ("last 30 days", end - timedelta(days=30))):
+        sql = await best_of(lambda: AnalyticsService._get_threat_metrics("org-1", start, end))
+        memory = await best_of(lambda: AnalyticsService._get_threat_metrics_in_memory("org-1", start, end))
+        print(f"{label:>13}: sql {sql * 1000:8.1f} ms  in-memory {memory * 1000:8.1f} ms  "
+              f"{memory / sql:5.1f}x")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    with tempfile.TemporaryDirectory() as directory:
+        # Point the database every service shares at the scratch file
+        db.db_name = os.path.join(directory, "bench.db")
+        db.connect()
+        populate(db, count)
+        print(f"{count} incidents over {DAYS} days")
+        asyncio.run(compare(count))
+        async_db.close()
+
+if __name__ == "__main__":
+    main()
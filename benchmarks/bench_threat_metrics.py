@@ -0,0 +1,59 @@
+"""Compare the grouped all-organization threat metrics kernel with computing
+metrics one organization at a time.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_threat_metrics [incidents] [organizations]
+"""
+import sys
+import time
+import numpy as np
+from utils.analytics import AnalyticsEngine
+from utils.threat_store import ThreatStore
+
+DEFAULT_COUNT = 10_000_000
+DEFAULT_ORGANIZATIONS = 200
+DAYS = 90
+MS_PER_DAY = 86_400_000
+
+def build(count: int, organizations: int) -> ThreatStore:
+    """Build a store of synthetic incidents spread over DAYS days"""
+    rng = np.random.default_rng(7)
+    start = np.datetime64('2024-01-01', 'ms').astype(np.int64)
+    timestamp = np.sort(start + rng.integers(0, DAYS * MS_PER_DAY, count))
+    resolution = rng.exponential(240.0, count)
+    resolution[rng.random(count) < 0.3] = np.nan
+    return ThreatStore.from_arrays(
+        severity=rng.integers(1, 5, count),
+        timestamp=timestamp,
+        organization=rng.integers(0, organizations, count),
+        threat_type=rng.integers(0, 5, count),
+        resolution_time=resolution,
+        organizations=[f"org-{i}" for i in range(organizations)],
+        threat_types=["Phishing", "Malware", "DDoS", "Unauthorized Access", "Data Breach"]
+    )
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    organizations = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ORGANIZATIONS
+    view = build(count, organizations).view()
+
+    started = time.perf_counter()
+    grouped = AnalyticsEngine.calculate_threat_metrics_by_organization(view)
+    grouped_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    per_organization = {
+        organization_id: AnalyticsEngine.calculate_threat_metrics(view.for_organization(organization_id))
+        for organization_id in view.organizations
+    }
+    loop_seconds = time.perf_counter() - started
+
+    assert grouped.keys() == per_organization.keys()
+    print(f"{count} incidents, {organizations} organizations, {DAYS} days")
+    print(f"  grouped kernel:   {grouped_seconds:.3f}s")
+    print(f"  per organization: {loop_seconds:.3f}s")
+    print(f"  speedup:          {loop_seconds / grouped_seconds:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compare scoring a batch of threats in one vectorized call with scoring them
+one at a time through the single-threat wrapper.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_threat_risk [threats]
+"""
+import sys
+import time
+import numpy as np
+from utils.analytics import CLASSIFICATION_RISK, AnalyticsEngine
+
+DEFAULT_COUNT = 1_000_000
+SAMPLE = 20_000  # threats scored one at a time, extrapolated to the batch
+
+def build(count: int):
+    """Columns for count synthetic threats"""
+    rng = np.random.default_rng(5)
+    classifications = np.array(list(CLASSIFICATION_RISK) + [None], dtype=object)
+    return (
+        rng.integers(1, 5, count),
+        rng.poisson(2.0, count),
+        classifications[rng.integers(0, len(classifications), count)],
+        rng.poisson(8.0, count).astype(np.float64),
+    )
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COUNT
+    levels, affected, classifications, history = build(count)
+
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        scores = AnalyticsEngine.calculate_threat_risk_batch(
+            levels, affected, classifications, history
+        )
+        timings.append(time.perf_counter() - started)
+    batch = min(timings)
+
+    sample = min(SAMPLE, count)
+    started = time.perf_counter()
+    single = [
+        AnalyticsEngine.calculate_threat_risk(*threat)
+        for threat in zip(levels[:sample].tolist(), affected[:sample], classifications[:sample],
+                          history[:sample])
+    ]
+    per_threat = (time.perf_counter() - started) / sample
+    assert np.allclose(single, scores[:sample])
+
+    print(f"{count} threats: batch {batch * 1000:.0f} ms "
+          f"({count / batch / 1e6:.1f}M threats/s)")
+    print(f"one at a time: {per_threat * 1e6:.1f} us/threat, "
+          f"~{per_threat * count:.1f} s for the batch ({per_threat * count / batch:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -39,6 +39,10 @@ SECURITY_CONFIG = {
     "lockout_duration": timedelta(minutes=15),
     "mfa_enabled": False,
     "allowed_domains": ["*.un.org", "*.go.ke", "*.int"],
+    "api_key_cache_size": 10000,
+    "api_key_cache_ttl": 300,  # seconds
+    "api_key_invalid_cache_ttl": 30,  # seconds an unknown or revoked key stays rejected
+    "api_key_version_check": 5,  # seconds before a key changed elsewhere is noticed
 }
 
 # Database Configuration
@@ -48,6 +52,14 @@ DB_CONFIG = {
     "backup_enabled": True,
     "backup_frequency": "daily",
     "max_connections": 20,
+    "pool_timeout": 30,  # seconds to wait for a free connection
+    "busy_timeout": 5000,  # milliseconds
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": 65536,  # KiB per connection
+    "mmap_size": 268435456,  # 256MB
+    "group_commit_interval": 0.005,  # seconds a write may wait for its batch
+    "group_commit_max_rows": 1000,
 }
 
 # Email Configuration
@@ -122,6 +134,26 @@ API_CONFIG = {
     "base_url": "https://api.diplocyber.com",
     "timeout": 30,
     "rate_limit": 100,
+    "page_size": 100,
+    "max_page_size": 1000,
+    "export_chunk_size": 1000,
+    "max_batch_size": 5000,
+}
+
+# Analytics Configuration
+ANALYTICS_CONFIG = {
+    "dashboard_cache_size": 1024,
+    "dashboard_cache_ttl": 30,  # seconds a dashboard is served as fresh
+    "dashboard_stale_ttl": 300,  # further seconds served while it refreshes
+    "metric_timeout": 10,  # seconds per dashboard metric query
+    "sketch_flush_interval": 60,  # seconds between merges of sketch deltas
+    "anomaly_alpha": 0.3,  # EWMA weight of the latest week per hour-of-week
+    "anomaly_threshold": 4.0,  # standard deviations above the baseline
+    "anomaly_min_count": 5,  # threats an hour needs before it can alert
+    "anomaly_warmup_weeks": 2,  # weeks of history before a slot can alert
+    "anomaly_seed_weeks": 8,  # history replayed into the baselines at startup
+    "risk_batch_workers": None,  # processes for batch risk assessment, None for one per core
+    "risk_batch_shard_size": 25,  # organizations assessed per worker task
 }
 
 # Logging Configuration
@@ -131,4 +163,16 @@ LOG_CONFIG = {
     "file": "logs/diplocyber.log",
     "max_size": 10485760,  # 10MB
     "backup_count": 5,
+    "sampling": {
+        "default_rate": 0.01,  # share of ordinary requests logged
+        "routes": {
+            "/api/v1/threats:batch": 1.0,
+            "/api/v1/risk-assessment": 1.0,
+            "/api/v1/risk-assessment/{organization_id}": 1.0,
+        },
+        "slow_request_ms": 1000,  # slower requests are always logged
+        "always_log_status": 400,  # responses at or above this are always logged
+        "max_per_interval": 100,  # per action, per summary interval
+        "summary_interval": 60,  # seconds
+    },
 }
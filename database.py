@@ -1,104 +1,922 @@
 import sqlite3
+import asyncio
+import contextvars
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-import json
+from enum import Enum, IntEnum
 from config import DB_CONFIG
+from utils.codec import Codec
+from utils.sketches import merge_sketch_blobs
+from models import (
+    BaseModel, Organization, User, ThreatIncident, SecurityAlert, AuditLog,
+    RiskAssessment, SecurityPolicy, AssetInventory, VulnerabilityReport,
+    TrainingRecord, IncidentResponse, ComplianceReport, NotificationSettings,
+    APIKey, SystemMetrics, ThreatStatus
+)
+
+# Models persisted by Database, in creation order
+MODELS = [
+    Organization, User, ThreatIncident, SecurityAlert, AuditLog,
+    RiskAssessment, SecurityPolicy, AssetInventory, VulnerabilityReport,
+    TrainingRecord, IncidentResponse, ComplianceReport, NotificationSettings,
+    APIKey, SystemMetrics
+]
+
+# Guards lazy creation of a Database's pool and writer
+_init_lock = threading.RLock()
+
+# time.monotonic() after which SQLite aborts the current task's statements;
+# AsyncDatabase carries it to the worker thread with the rest of the context
+query_deadline = contextvars.ContextVar("query_deadline", default=None)
+
+# SQLite virtual machine steps between deadline checks
+DEADLINE_CHECK_STEPS = 1000
+
+SQL_TYPES = {
+    str: "TEXT",
+    int: "INTEGER",
+    float: "REAL",
+    bool: "BOOLEAN",
+    datetime: "TIMESTAMP",
+    dict: "TEXT",  # JSON encoded
+    list: "TEXT",  # JSON encoded
+}
+
+# Extra column constraints that cannot be derived from the annotations
+COLUMN_CONSTRAINTS = {
+    "organizations": {"name": "NOT NULL", "type": "NOT NULL"},
+    "users": {
+        "email": "UNIQUE NOT NULL",
+        "username": "UNIQUE NOT NULL",
+        "password_hash": "NOT NULL",
+    },
+}
+
+TABLE_CONSTRAINTS = {
+    "users": ["FOREIGN KEY (organization_id) REFERENCES organizations (id)"],
+}
+
+# Composite indexes matching the service access paths: (name, columns, unique)
+INDEXES = {
+    "users": [
+        ("idx_users_org", ("organization_id",), False),
+    ],
+    "threats": [
+        ("idx_threats_org_created", ("organization_id", "created_at", "id"), False),
+        ("idx_threats_org_level_created", ("organization_id", "threat_level", "created_at", "id"), False),
+        ("idx_threats_org_level_status", ("organization_id", "threat_level", "status"), False),
+    ],
+    "alerts": [
+        ("idx_alerts_org_created", ("organization_id", "created_at", "id"), False),
+        ("idx_alerts_org_ack", ("organization_id", "is_acknowledged", "created_at", "id"), False),
+    ],
+    "audit_logs": [
+        ("idx_audit_logs_org_created", ("organization_id", "created_at"), False),
+        ("idx_audit_logs_user_created", ("user_id", "created_at"), False),
+    ],
+    "risk_assessments": [
+        ("idx_risk_assessments_org_date", ("organization_id", "assessment_date"), False),
+    ],
+    "security_policies": [
+        ("idx_security_policies_org_type", ("organization_id", "policy_type"), False),
+    ],
+    "assets": [
+        ("idx_assets_org_type", ("organization_id", "asset_type"), False),
+    ],
+    "vulnerability_reports": [
+        ("idx_vulnerability_reports_org_date", ("organization_id", "scan_date"), False),
+    ],
+    "training_records": [
+        ("idx_training_records_org_user", ("organization_id", "user_id"), False),
+    ],
+    "incident_responses": [
+        ("idx_incident_responses_org_type", ("organization_id", "incident_type"), False),
+    ],
+    "compliance_reports": [
+        ("idx_compliance_reports_org_date", ("organization_id", "assessment_date"), False),
+    ],
+    "notification_settings": [
+        ("idx_notification_settings_user", ("user_id",), False),
+    ],
+    "api_keys": [
+        ("idx_api_keys_hash", ("key_hash",), True),
+        ("idx_api_keys_org", ("organization_id",), False),
+    ],
+    "system_metrics": [
+        ("idx_system_metrics_org_time", ("organization_id", "timestamp"), False),
+    ],
+}
+
+# The Streamlit login table predates the model schema and used to be called
+# users too; it now has its own name so the two never collide
+ACCOUNTS_TABLE = "accounts"
+LEGACY_ACCOUNT_COLUMNS = ["username", "password", "organization", "email", "created_date"]
+
+def migrate_legacy_accounts(connection):
+    """Rename an old login table named users out of the model schema's way"""
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(users)")]
+    taken = connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (ACCOUNTS_TABLE,)
+    ).fetchone()
+    if columns == LEGACY_ACCOUNT_COLUMNS and not taken:
+        connection.execute(f"ALTER TABLE users RENAME TO {ACCOUNTS_TABLE}")
+
+# Daily threat rollups: (org, day, threat type, level) -> counts and resolution
+# minutes. Triggers keep them current inside the writing transaction, so range
+# charts read a few hundred rows however many incidents exist.
+ROLLUP_TABLE = "threat_daily_rollups"
+ROLLUP_KEY = ("organization_id", "day", "threat_type", "threat_level")
+ROLLUP_MEASURES = ("threats", "open_threats", "closed_threats", "resolution_count", "resolution_minutes")
+
+def _rollup_values(row: str, sign: str = "") -> str:
+    """SQL values for one threat row's contribution to its rollup bucket"""
+    resolved = f"({row}.status IS {ThreatStatus.RESOLVED.value})"
+    return (
+        f"COALESCE({row}.organization_id, ''), substr({row}.created_at, 1, 10), "
+        f"COALESCE({row}.threat_type, ''), COALESCE({row}.threat_level, 0), "
+        f"{sign}1, {sign}(NOT {resolved}), {sign}{resolved}, "
+        f"{sign}({resolved} AND {row}.resolution_time IS NOT NULL), "
+        f"{sign}(CASE WHEN {resolved} THEN COALESCE({row}.resolution_time, 0) ELSE 0 END)"
+    )
+
+def _counter_upsert(table: str, key: tuple, measures: tuple, values: str) -> str:
+    """SQL adding one row's values to its counter bucket"""
+    columns = ", ".join(key + measures)
+    updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in measures)
+    return (
+        f"INSERT INTO {table} ({columns}) VALUES ({values}) "
+        f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates};"
+    )
+
+def _rollup_upsert(row: str, sign: str = "") -> str:
+    return _counter_upsert(ROLLUP_TABLE, ROLLUP_KEY, ROLLUP_MEASURES, _rollup_values(row, sign))
+
+_ROLLUP_PRUNE_OLD = (
+    f"DELETE FROM {ROLLUP_TABLE} WHERE threats = 0 "
+    "AND organization_id = COALESCE(OLD.organization_id, '') "
+    "AND day = substr(OLD.created_at, 1, 10) "
+    "AND threat_type = COALESCE(OLD.threat_type, '') "
+    "AND threat_level = COALESCE(OLD.threat_level, 0);"
+)
+
+ROLLUP_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+    organization_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    threat_type TEXT NOT NULL,
+    threat_level INTEGER NOT NULL,
+    threats INTEGER NOT NULL DEFAULT 0,
+    open_threats INTEGER NOT NULL DEFAULT 0,
+    closed_threats INTEGER NOT NULL DEFAULT 0,
+    resolution_count INTEGER NOT NULL DEFAULT 0,
+    resolution_minutes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ({', '.join(ROLLUP_KEY)})
+) WITHOUT ROWID""",
+    f"CREATE INDEX IF NOT EXISTS idx_threat_rollups_day ON {ROLLUP_TABLE} (day)",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_threats_rollup_insert AFTER INSERT ON threats
+BEGIN
+    {_rollup_upsert("NEW")}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_threats_rollup_update
+AFTER UPDATE OF organization_id, created_at, threat_type, threat_level, status, resolution_time
+ON threats
+BEGIN
+    {_rollup_upsert("OLD", "-")}
+    {_rollup_upsert("NEW")}
+    {_ROLLUP_PRUNE_OLD}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_threats_rollup_delete AFTER DELETE ON threats
+BEGIN
+    {_rollup_upsert("OLD", "-")}
+    {_ROLLUP_PRUNE_OLD}
+END""",
+]
+
+# Recompute every rollup bucket from the threats table
+ROLLUP_REBUILD = (
+    f"INSERT INTO {ROLLUP_TABLE} ({', '.join(ROLLUP_KEY + ROLLUP_MEASURES)}) "
+    "SELECT COALESCE(organization_id, ''), substr(created_at, 1, 10), "
+    "COALESCE(threat_type, ''), COALESCE(threat_level, 0), "
+    f"COUNT(*), SUM(status IS NOT {ThreatStatus.RESOLVED.value}), "
+    f"SUM(status IS {ThreatStatus.RESOLVED.value}), "
+    f"SUM(status IS {ThreatStatus.RESOLVED.value} AND resolution_time IS NOT NULL), "
+    f"SUM(CASE WHEN status IS {ThreatStatus.RESOLVED.value} THEN COALESCE(resolution_time, 0) ELSE 0 END) "
+    "FROM threats GROUP BY 1, 2, 3, 4"
+)
+
+# Columns a rollup read may group on
+ROLLUP_GROUPS = ROLLUP_KEY
+
+def rollup_query(start_date=None, end_date=None, organization_id=None, group_by=("day",)):
+    """Build a read of the daily threat rollups over [start_date, end_date)
+
+    Dates may be dates or datetimes; only their day is used. Without an
+    organization the buckets of every organization are summed.
+    """
+    unknown = set(group_by) - set(ROLLUP_GROUPS)
+    if unknown:
+        raise ValueError(f"Cannot group rollups by: {', '.join(sorted(unknown))}")
+    clauses, params = [], []
+    if organization_id is not None:
+        clauses.append("organization_id = ?")
+        params.append(organization_id)
+    if start_date is not None:
+        clauses.append("day >= ?")
+        params.append(start_date.isoformat()[:10])
+    if end_date is not None:
+        clauses.append("day < ?")
+        params.append(end_date.isoformat()[:10])
+    measures = ", ".join(f"SUM({name}) AS {name}" for name in ROLLUP_MEASURES)
+    columns = ", ".join(group_by)
+    query = f"SELECT {columns + ', ' if columns else ''}{measures} FROM {ROLLUP_TABLE}"
+    if clauses:
+        query += f" WHERE {' AND '.join(clauses)}"
+    if columns:
+        query += f" GROUP BY {columns} ORDER BY {columns}"
+    return query, params
+
+# Dashboard totals per organization, kept by triggers like the rollups so the
+# API workers and the Streamlit app all read the same numbers
+TOTALS_TABLE = "threat_status_totals"
+TOTALS_KEY = ("organization_id", "threat_level", "status")
+TOTALS_MEASURES = ("threats", "resolution_count", "resolution_minutes", "resolution_squares")
+ALERT_TOTALS_TABLE = "alert_totals"
+ALERT_TOTALS_KEY = ("organization_id",)
+ALERT_TOTALS_MEASURES = ("alerts", "unacknowledged_alerts")
+
+def _totals_values(row: str, sign: str = "") -> str:
+    """SQL values for one threat row's contribution to its totals bucket"""
+    return (
+        f"COALESCE({row}.organization_id, ''), COALESCE({row}.threat_level, 0), "
+        f"COALESCE({row}.status, {ThreatStatus.ACTIVE.value}), "
+        f"{sign}1, {sign}({row}.resolution_time IS NOT NULL), "
+        f"{sign}COALESCE({row}.resolution_time, 0), "
+        f"{sign}COALESCE({row}.resolution_time * {row}.resolution_time, 0)"
+    )
+
+def _alert_totals_values(row: str, sign: str = "") -> str:
+    return (
+        f"COALESCE({row}.organization_id, ''), "
+        f"{sign}1, {sign}(NOT COALESCE({row}.is_acknowledged, 0))"
+    )
+
+def _totals_upsert(row: str, sign: str = "") -> str:
+    return _counter_upsert(TOTALS_TABLE, TOTALS_KEY, TOTALS_MEASURES, _totals_values(row, sign))
+
+def _alert_totals_upsert(row: str, sign: str = "") -> str:
+    return _counter_upsert(
+        ALERT_TOTALS_TABLE, ALERT_TOTALS_KEY, ALERT_TOTALS_MEASURES, _alert_totals_values(row, sign)
+    )
+
+_TOTALS_PRUNE_OLD = (
+    f"DELETE FROM {TOTALS_TABLE} WHERE threats = 0 "
+    "AND organization_id = COALESCE(OLD.organization_id, '') "
+    "AND threat_level = COALESCE(OLD.threat_level, 0) "
+    f"AND status = COALESCE(OLD.status, {ThreatStatus.ACTIVE.value});"
+)
+
+_ALERT_TOTALS_PRUNE_OLD = (
+    f"DELETE FROM {ALERT_TOTALS_TABLE} WHERE alerts = 0 "
+    "AND organization_id = COALESCE(OLD.organization_id, '');"
+)
+
+TOTALS_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {TOTALS_TABLE} (
+    organization_id TEXT NOT NULL,
+    threat_level INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    threats INTEGER NOT NULL DEFAULT 0,
+    resolution_count INTEGER NOT NULL DEFAULT 0,
+    resolution_minutes INTEGER NOT NULL DEFAULT 0,
+    resolution_squares INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ({', '.join(TOTALS_KEY)})
+) WITHOUT ROWID""",
+    f"""CREATE TABLE IF NOT EXISTS {ALERT_TOTALS_TABLE} (
+    organization_id TEXT NOT NULL PRIMARY KEY,
+    alerts INTEGER NOT NULL DEFAULT 0,
+    unacknowledged_alerts INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_threats_totals_insert AFTER INSERT ON threats
+BEGIN
+    {_totals_upsert("NEW")}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_threats_totals_update
+AFTER UPDATE OF organization_id, threat_level, status, resolution_time ON threats
+BEGIN
+    {_totals_upsert("OLD", "-")}
+    {_totals_upsert("NEW")}
+    {_TOTALS_PRUNE_OLD}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_threats_totals_delete AFTER DELETE ON threats
+BEGIN
+    {_totals_upsert("OLD", "-")}
+    {_TOTALS_PRUNE_OLD}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_alerts_totals_insert AFTER INSERT ON alerts
+BEGIN
+    {_alert_totals_upsert("NEW")}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_alerts_totals_update
+AFTER UPDATE OF organization_id, is_acknowledged ON alerts
+BEGIN
+    {_alert_totals_upsert("OLD", "-")}
+    {_alert_totals_upsert("NEW")}
+    {_ALERT_TOTALS_PRUNE_OLD}
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_alerts_totals_delete AFTER DELETE ON alerts
+BEGIN
+    {_alert_totals_upsert("OLD", "-")}
+    {_ALERT_TOTALS_PRUNE_OLD}
+END""",
+]
+
+# Recompute both totals tables from the threats and alerts tables
+TOTALS_REBUILD = [
+    f"DELETE FROM {TOTALS_TABLE}",
+    f"INSERT INTO {TOTALS_TABLE} ({', '.join(TOTALS_KEY + TOTALS_MEASURES)}) "
+    "SELECT COALESCE(organization_id, ''), COALESCE(threat_level, 0), "
+    f"COALESCE(status, {ThreatStatus.ACTIVE.value}), COUNT(*), COUNT(resolution_time), "
+    "COALESCE(SUM(resolution_time), 0), COALESCE(SUM(resolution_time * resolution_time), 0) "
+    "FROM threats GROUP BY 1, 2, 3",
+    f"DELETE FROM {ALERT_TOTALS_TABLE}",
+    f"INSERT INTO {ALERT_TOTALS_TABLE} ({', '.join(ALERT_TOTALS_KEY + ALERT_TOTALS_MEASURES)}) "
+    "SELECT COALESCE(organization_id, ''), COUNT(*), SUM(NOT COALESCE(is_acknowledged, 0)) "
+    "FROM alerts GROUP BY 1",
+]
+
+# Mergeable daily sketches per organization (see utils.sketches): distinct
+# counts and resolution-time digests, one compact blob per metric
+SKETCH_TABLE = "threat_daily_sketches"
+
+SKETCH_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {SKETCH_TABLE} (
+    organization_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    sketch BLOB NOT NULL,
+    PRIMARY KEY (organization_id, day, metric)
+) WITHOUT ROWID""",
+    f"CREATE INDEX IF NOT EXISTS idx_threat_sketches_day ON {SKETCH_TABLE} (day)",
+]
+
+# Merge a sketch delta into the stored blob without reading it back first
+SKETCH_MERGE = (
+    f"INSERT INTO {SKETCH_TABLE} (organization_id, day, metric, sketch) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (organization_id, day, metric) "
+    "DO UPDATE SET sketch = sketch_merge(sketch, excluded.sketch)"
+)
+
+# A counter every change to an API key's access bumps (revocation, rotation,
+# new permissions, limits or expiry, deletion), so each process can tell
+# with one tiny read whether its verification cache went stale
+API_KEY_VERSION_TABLE = "api_key_version"
+
+API_KEY_VERSION_DDL = [
+    f"""CREATE TABLE IF NOT EXISTS {API_KEY_VERSION_TABLE} (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+)""",
+    f"INSERT OR IGNORE INTO {API_KEY_VERSION_TABLE} (id, version) VALUES (1, 0)",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_api_keys_version_update
+AFTER UPDATE OF is_active, key_hash, permissions, rate_limit, expires_at ON api_keys
+BEGIN
+    UPDATE {API_KEY_VERSION_TABLE} SET version = version + 1 WHERE id = 1;
+END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_api_keys_version_delete AFTER DELETE ON api_keys
+BEGIN
+    UPDATE {API_KEY_VERSION_TABLE} SET version = version + 1 WHERE id = 1;
+END""",
+]
+
+def sketch_query(start_date=None, end_date=None, organization_id=None):
+    """Build a read of the daily sketch blobs over [start_date, end_date)"""
+    clauses, params = [], []
+    if organization_id is not None:
+        clauses.append("organization_id = ?")
+        params.append(organization_id)
+    if start_date is not None:
+        clauses.append("day >= ?")
+        params.append(start_date.isoformat()[:10])
+    if end_date is not None:
+        clauses.append("day < ?")
+        params.append(end_date.isoformat()[:10])
+    query = f"SELECT metric, sketch FROM {SKETCH_TABLE}"
+    if clauses:
+        query += f" WHERE {' AND '.join(clauses)}"
+    return query, params
+
+
+def model_fields(model) -> dict:
+    """Return the annotated fields of a model class, base fields first"""
+    fields = {}
+    for klass in reversed(model.__mro__):
+        fields.update(getattr(klass, '__annotations__', {}))
+    return fields
+
+
+def column_type(annotation) -> str:
+    """Map a model annotation to its SQLite column type"""
+    if isinstance(annotation, type) and issubclass(annotation, IntEnum):
+        return "INTEGER"
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return "TEXT"
+    return SQL_TYPES.get(annotation, "TEXT")
+
+
+def table_ddl(model) -> str:
+    """Build the CREATE TABLE statement for a model class"""
+    table = model.__tablename__
+    constraints = COLUMN_CONSTRAINTS.get(table, {})
+    columns = []
+    for name, annotation in model_fields(model).items():
+        column = f"{name} {column_type(annotation)}"
+        if name == "id":
+            column += " PRIMARY KEY"
+        elif name in constraints:
+            column += f" {constraints[name]}"
+        columns.append(column)
+    columns.extend(TABLE_CONSTRAINTS.get(table, []))
+    body = ",\n    ".join(columns)
+    return f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n)"
+
+
+def to_db_value(value):
+    """Convert a model attribute into a value sqlite3 can store"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return Codec.dumps_text(value)
+    return value
+
+
+def from_db_value(annotation, value):
+    """Convert a stored column value back to its annotated type"""
+    if value is None:
+        return None
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return annotation(value)
+    if annotation is datetime:
+        return datetime.fromisoformat(value)
+    if annotation in (dict, list):
+        return Codec.loads(value)
+    if annotation is bool:
+        return bool(value)
+    return value
+
+
+def model_to_row(instance: BaseModel) -> dict:
+    """Serialize a model instance into a column -> value mapping"""
+    return {
+        name: to_db_value(getattr(instance, name, None))
+        for name in model_fields(type(instance))
+    }
+
+
+def insert_statement(model) -> str:
+    """Build the parameterised INSERT statement for a model class"""
+    columns = list(model_fields(model))
+    placeholders = ", ".join("?" for _ in columns)
+    return (
+        f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) "
+        f"VALUES ({placeholders})"
+    )
+
+
+def insert_models(connection, instances) -> int:
+    """Insert model instances on a connection without committing"""
+    by_model = {}
+    for instance in instances:
+        by_model.setdefault(type(instance), []).append(instance)
+
+    count = 0
+    for model, group in by_model.items():
+        # ULIDs sort by creation time, so ordered inserts append to the index
+        group.sort(key=lambda instance: instance.id)
+        fields = list(model_fields(model))
+        rows = [
+            tuple(to_db_value(getattr(instance, name, None)) for name in fields)
+            for instance in group
+        ]
+        connection.executemany(insert_statement(model), rows)
+        count += len(rows)
+    return count
+
+
+def row_to_model(model, row):
+    """Build a model instance from a database row"""
+    fields = model_fields(model)
+    return model(**{
+        name: from_db_value(fields[name], row[name])
+        for name in row.keys() if name in fields
+    })
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections tuned for concurrent readers.
+
+    Connections are opened lazily up to ``max_connections`` and handed out
+    one per thread; nested checkouts on the same thread reuse the connection
+    already held, so helpers can call each other without deadlocking.
+    """
+
+    def __init__(self, db_name, max_connections=None, timeout=None):
+        self.db_name = db_name
+        self.max_connections = max_connections or DB_CONFIG['max_connections']
+        self.timeout = timeout if timeout is not None else DB_CONFIG['pool_timeout']
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    def _create_connection(self):
+        """Open a new connection and apply the performance pragmas"""
+        connection = sqlite3.connect(
+            self.db_name,
+            timeout=DB_CONFIG['busy_timeout'] / 1000,
+            check_same_thread=False
+        )
+        connection.row_factory = sqlite3.Row
+        # WAL lets readers proceed while a single writer commits
+        connection.execute(f"PRAGMA journal_mode={DB_CONFIG['journal_mode']}")
+        connection.execute(f"PRAGMA synchronous={DB_CONFIG['synchronous']}")
+        connection.execute(f"PRAGMA cache_size=-{DB_CONFIG['cache_size']}")
+        connection.execute(f"PRAGMA mmap_size={DB_CONFIG['mmap_size']}")
+        connection.execute(f"PRAGMA busy_timeout={DB_CONFIG['busy_timeout']}")
+        connection.execute("PRAGMA temp_store=MEMORY")
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def _acquire(self):
+        """Take an idle connection, opening a new one while under the limit"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if self._created < self.max_connections:
+                self._created += 1
+                try:
+                    return self._create_connection()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No database connection available after {self.timeout}s"
+            )
+
+    def _release(self, connection):
+        """Return a connection to the pool in a clean state"""
+        if connection.in_transaction:
+            connection.rollback()
+        if self._closed:
+            connection.close()
+            return
+        self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the current thread"""
+        held = getattr(self._local, 'connection', None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        connection = self._acquire()
+        self._local.connection = connection
+        self._local.depth = 1
+        deadline = query_deadline.get()
+        if deadline is not None:
+            # Past the deadline the running statement fails with "interrupted"
+            connection.set_progress_handler(
+                lambda: time.monotonic() >= deadline, DEADLINE_CHECK_STEPS
+            )
+        try:
+            yield connection
+        finally:
+            if deadline is not None:
+                connection.set_progress_handler(None, 0)
+            self._local.connection = None
+            self._local.depth = 0
+            self._release(connection)
+
+    def close(self):
+        """Close all idle connections and refuse new checkouts"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class GroupCommitWriter:
+    """Single writer thread that batches inserts into shared transactions.
+
+    Concurrent callers submit model instances and get a Future back. The
+    writer commits whatever has queued up once ``max_rows`` is reached or
+    ``interval`` seconds have passed since the first pending write, so one
+    fsync covers the whole batch instead of one per row.
+    """
+
+    def __init__(self, pool, interval=None, max_rows=None):
+        self.pool = pool
+        self.interval = interval if interval is not None else DB_CONFIG['group_commit_interval']
+        self.max_rows = max_rows or DB_CONFIG['group_commit_max_rows']
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def submit(self, instance) -> Future:
+        """Queue a model instance for insertion"""
+        future = Future()
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("Group commit writer is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="db-group-commit", daemon=True
+                )
+                self._thread.start()
+            self._queue.put((instance, future))
+        return future
+
+    def _run(self):
+        """Collect pending writes and commit them in batches"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._commit(batch)
+                    return
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        """Write a batch in one transaction, isolating failures per row"""
+        # Rows whose caller gave up are still written, but nobody is told
+        batch = [
+            (instance, future if future.set_running_or_notify_cancel() else None)
+            for instance, future in batch
+        ]
+        try:
+            with self.pool.connection() as connection:
+                insert_models(connection, [instance for instance, _ in batch])
+                connection.commit()
+        except Exception:
+            # One bad row must not fail its neighbours: retry individually
+            self._commit_each(batch)
+            return
+        for instance, future in batch:
+            if future is not None:
+                future.set_result(instance)
+
+    def _commit_each(self, batch):
+        for instance, future in batch:
+            try:
+                with self.pool.connection() as connection:
+                    insert_models(connection, [instance])
+                    connection.commit()
+                if future is not None:
+                    future.set_result(instance)
+            except Exception as e:
+                if future is not None:
+                    future.set_exception(e)
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        with self._lock:
+            self._stopping = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
 
 class Database:
-    def __init__(self):
-        self.db_name = DB_CONFIG['name']
-        self.connection = None
-        self.cursor = None
+    def __init__(self, db_name=None):
+        self.db_name = db_name or DB_CONFIG['name']
+        self.pool = None
+        self.writer = None
 
     def connect(self):
-        """Establish database connection"""
+        """Establish database connection pool"""
         try:
-            self.connection = sqlite3.connect(self.db_name)
-            self.cursor = self.connection.cursor()
-            self.create_tables()
+            if self.pool is None:
+                self.pool = ConnectionPool(self.db_name)
+            if not self.create_tables():
+                # A half-built schema is not usable; callers must see the failure
+                self.pool.close()
+                self.pool = None
+                return False
             return True
         except Exception as e:
             print(f"Database connection error: {e}")
             return False
 
     def disconnect(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
+        """Close database connection pool"""
+        if self.writer:
+            self.writer.close()
+            self.writer = None
+        if self.pool:
+            self.pool.close()
+            self.pool = None
 
     def create_tables(self):
         """Create all necessary database tables"""
         try:
-            # Create tables for each model
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS organizations (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    type TEXT NOT NULL,
-                    country TEXT,
-                    address TEXT,
-                    contact_email TEXT,
-                    contact_phone TEXT,
-                    security_level TEXT,
-                    subscription_status TEXT,
-                    max_users INTEGER,
-                    features_enabled TEXT,
-                    created_at TIMESTAMP,
-                    updated_at TIMESTAMP,
-                    is_active BOOLEAN
-                )
-            ''')
-
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id TEXT PRIMARY KEY,
-                    email TEXT UNIQUE NOT NULL,
-                    username TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    first_name TEXT,
-                    last_name TEXT,
-                    organization_id TEXT,
-                    role TEXT,
-                    last_login TIMESTAMP,
-                    mfa_enabled BOOLEAN,
-                    failed_login_attempts INTEGER,
-                    password_changed_at TIMESTAMP,
-                    is_locked BOOLEAN,
-                    created_at TIMESTAMP,
-                    updated_at TIMESTAMP,
-                    is_active BOOLEAN,
-                    FOREIGN KEY (organization_id) REFERENCES organizations (id)
+            with self.pool.connection() as connection:
+                self._create_tables(connection)
+                connection.commit()
+            return True
+        except Exception as e:
+            print(f"Table creation error: {e}")
+            return False
+
+    def _create_tables(self, connection):
+        """Issue the table and index DDL on the given connection"""
+        migrate_legacy_accounts(connection)
+        for model in MODELS:
+            connection.execute(table_ddl(model))
+            for name, columns, unique in INDEXES.get(model.__tablename__, []):
+                connection.execute(
+                    f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} "
+                    f"ON {model.__tablename__} ({', '.join(columns)})"
                 )
-            ''')
+        seed_totals = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TOTALS_TABLE,)
+        ).fetchone() is None
+        for statement in ROLLUP_DDL + SKETCH_DDL + TOTALS_DDL + API_KEY_VERSION_DDL:
+            connection.execute(statement)
+        # Databases created before the totals existed get them backfilled once
+        if seed_totals:
+            for statement in TOTALS_REBUILD:
+                connection.execute(statement)
+
+    def rebuild_rollups(self):
+        """Recompute the daily threat rollups from the threats table"""
+        try:
+            with self._get_pool().connection() as connection:
+                # One transaction, so readers see the old or the new rollups
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(f"DELETE FROM {ROLLUP_TABLE}")
+                connection.execute(ROLLUP_REBUILD)
+                connection.commit()
+            return True
+        except Exception as e:
+            print(f"Rollup rebuild error: {e}")
+            return False
 
-            # Add more table creation statements for other models...
+    def rebuild_totals(self):
+        """Recompute the dashboard totals from the threats and alerts tables"""
+        try:
+            with self._get_pool().connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                for statement in TOTALS_REBUILD:
+                    connection.execute(statement)
+                connection.commit()
+            return True
+        except Exception as e:
+            print(f"Totals rebuild error: {e}")
+            return False
 
-            self.connection.commit()
+    def merge_sketches(self, rows):
+        """Merge (organization_id, day, metric, sketch) deltas into the stored sketches"""
+        try:
+            with self._get_pool().connection() as connection:
+                connection.create_function("sketch_merge", 2, merge_sketch_blobs, deterministic=True)
+                connection.executemany(SKETCH_MERGE, rows)
+                connection.commit()
             return True
         except Exception as e:
-            print(f"Table creation error: {e}")
+            print(f"Sketch merge error: {e}")
             return False
 
+    def replace_sketches(self, rows, start_day=None, end_day=None):
+        """Replace the stored sketches for days in [start_day, end_day) with rows"""
+        clauses, params = [], []
+        if start_day is not None:
+            clauses.append("day >= ?")
+            params.append(start_day)
+        if end_day is not None:
+            clauses.append("day < ?")
+            params.append(end_day)
+        try:
+            with self._get_pool().connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    f"DELETE FROM {SKETCH_TABLE}"
+                    + (f" WHERE {' AND '.join(clauses)}" if clauses else ""),
+                    params
+                )
+                connection.executemany(
+                    f"INSERT INTO {SKETCH_TABLE} (organization_id, day, metric, sketch) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                connection.commit()
+            return True
+        except Exception as e:
+            print(f"Sketch rebuild error: {e}")
+            return False
+
+    def _get_pool(self):
+        """Return the pool, connecting on first use"""
+        if self.pool is None:
+            with _init_lock:
+                if self.pool is None and not self.connect():
+                    raise RuntimeError(f"Could not open database {self.db_name}")
+        return self.pool
+
     def execute_query(self, query, params=None):
         """Execute a database query"""
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            self.connection.commit()
+            with self._get_pool().connection() as connection:
+                connection.execute(query, params or ())
+                connection.commit()
             return True
         except Exception as e:
             print(f"Query execution error: {e}")
             return False
 
+    def execute_returning(self, query, params=None):
+        """Execute a write with a RETURNING clause and fetch its rows"""
+        try:
+            with self._get_pool().connection() as connection:
+                rows = connection.execute(query, params or ()).fetchall()
+                connection.commit()
+            return rows
+        except Exception as e:
+            print(f"Query execution error: {e}")
+            return None
+
+    def execute_many(self, query, params_seq):
+        """Execute a statement for every parameter set in one transaction"""
+        try:
+            with self._get_pool().connection() as connection:
+                connection.executemany(query, params_seq)
+                connection.commit()
+            return True
+        except Exception as e:
+            print(f"Query execution error: {e}")
+            return False
+
+    def bulk_insert(self, instances):
+        """Insert model instances of any type in a single transaction"""
+        try:
+            with self._get_pool().connection() as connection:
+                insert_models(connection, instances)
+                connection.commit()
+            return True
+        except Exception as e:
+            print(f"Bulk insert error: {e}")
+            return False
+
+    def submit_write(self, instance) -> Future:
+        """Queue an insert on the group-commit writer"""
+        if self.writer is None:
+            with _init_lock:
+                if self.writer is None:
+                    self.writer = GroupCommitWriter(self._get_pool())
+        return self.writer.submit(instance)
+
     def fetch_one(self, query, params=None):
         """Fetch a single record"""
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            return self.cursor.fetchone()
+            with self._get_pool().connection() as connection:
+                return connection.execute(query, params or ()).fetchone()
         except Exception as e:
             print(f"Fetch error: {e}")
             return None
@@ -106,11 +924,88 @@ class Database:
     def fetch_all(self, query, params=None):
         """Fetch all records"""
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            return self.cursor.fetchall()
+            with self._get_pool().connection() as connection:
+                return connection.execute(query, params or ()).fetchall()
         except Exception as e:
             print(f"Fetch error: {e}")
             return []
+
+
+class AsyncDatabase:
+    """Awaitable data access that keeps sqlite3 off the event loop.
+
+    Every call runs on a dedicated thread pool no larger than the connection
+    pool, so concurrency is bounded and worker threads never wait on a
+    connection checkout.
+    """
+
+    def __init__(self, database=None, max_workers=None):
+        self.database = database or Database()
+        self.max_workers = max_workers or DB_CONFIG['max_connections']
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            with _init_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="db"
+                    )
+        return self._executor
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        # Run in the caller's context so a query_deadline reaches the pool
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(context.run, func, *args)
+        )
+
+    async def run(self, func, *args):
+        """Call func(database, *args) on the worker threads"""
+        return await self._run(func, self.database, *args)
+
+    async def fetch_all(self, query, params=None):
+        """Fetch all records"""
+        return await self._run(self.database.fetch_all, query, params)
+
+    async def fetch_one(self, query, params=None):
+        """Fetch a single record"""
+        return await self._run(self.database.fetch_one, query, params)
+
+    async def execute(self, query, params=None):
+        """Execute a database query"""
+        return await self._run(self.database.execute_query, query, params)
+
+    async def execute_returning(self, query, params=None):
+        """Execute a write with a RETURNING clause and fetch its rows"""
+        return await self._run(self.database.execute_returning, query, params)
+
+    async def execute_many(self, query, params_seq):
+        """Execute a statement for every parameter set in one transaction"""
+        return await self._run(self.database.execute_many, query, params_seq)
+
+    async def bulk_insert(self, instances):
+        """Insert model instances in a single transaction"""
+        return await self._run(self.database.bulk_insert, instances)
+
+    async def write(self, instance):
+        """Insert a model instance through the group-commit writer"""
+        if self.database.pool is None:
+            # Connecting creates the schema; keep that off the event loop too
+            await self._run(self.database._get_pool)
+        return await asyncio.wrap_future(self.database.submit_write(instance))
+
+    def close(self):
+        """Stop the worker threads and close the underlying database"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.database.disconnect()
+
+# The process-wide handles every service shares: one connection pool, one
+# group-commit writer and one worker pool, so the configured bounds hold for
+# the whole process and writes from different services commit together
+db = Database()
+async_db = AsyncDatabase(db)
@@ -1,213 +1,288 @@
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-import uuid
-from enum import Enum
-
-class ThreatLevel(Enum):
-    CRITICAL = "critical"
-    HIGH = "high"
-    MEDIUM = "medium"
-    LOW = "low"
-
-class ThreatStatus(Enum):
-    ACTIVE = "active"
-    INVESTIGATING = "investigating"
-    CONTAINED = "contained"
-    RESOLVED = "resolved"
-
-class UserRole(Enum):
-    ADMINISTRATOR = "administrator"
-    SECURITY_ANALYST = "security_analyst"
-    VIEWER = "viewer"
+from enum import IntEnum
+from utils.ids import new_id
 
+class CodedEnum(IntEnum):
+    """Integer-coded enum that still accepts and renders its lowercase label"""
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+    @classmethod
+    def _missing_(cls, value):
+        if isinstance(value, str):
+            return cls.__members__.get(value.upper())
+        return None
+
+class ThreatLevel(CodedEnum):
+    CRITICAL = 4
+    HIGH = 3
+    MEDIUM = 2
+    LOW = 1
+
+class ThreatStatus(CodedEnum):
+    ACTIVE = 1
+    INVESTIGATING = 2
+    CONTAINED = 3
+    RESOLVED = 4
+
+class UserRole(CodedEnum):
+    ADMINISTRATOR = 1
+    SECURITY_ANALYST = 2
+    VIEWER = 3
+
+@dataclass(slots=True, kw_only=True)
 class BaseModel:
     """Base model with common fields"""
-    id: str = str(uuid.uuid4())
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
+    id: str = field(default_factory=new_id)  # time-ordered ULID
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    updated_at: datetime = None
     is_active: bool = True
 
+    def __post_init__(self):
+        if self.updated_at is None:
+            self.updated_at = self.created_at
+
+    def to_dict(self) -> dict:
+        """Return the model fields as a plain dict, enums as their labels"""
+        data = {}
+        for model_field in fields(self):
+            value = getattr(self, model_field.name)
+            data[model_field.name] = value.label if isinstance(value, CodedEnum) else value
+        return data
+
+@dataclass(slots=True, kw_only=True)
 class Organization(BaseModel):
     """Organization model for IGOs"""
-    name: str
-    type: str  # UN Agency, Regional IGO, etc.
-    country: str
-    address: str
-    contact_email: str
-    contact_phone: str
-    security_level: str
-    subscription_status: str
-    max_users: int
-    features_enabled: dict
+    __tablename__ = "organizations"
+
+    name: str = None
+    type: str = None  # UN Agency, Regional IGO, etc.
+    country: str = None
+    address: str = None
+    contact_email: str = None
+    contact_phone: str = None
+    security_level: str = None
+    subscription_status: str = None
+    max_users: int = None
+    features_enabled: dict = field(default_factory=dict)
 
+@dataclass(slots=True, kw_only=True)
 class User(BaseModel):
     """User model for system access"""
-    email: str
-    username: str
-    password_hash: str
-    first_name: str
-    last_name: str
-    organization_id: str
-    role: UserRole
-    last_login: datetime
-    mfa_enabled: bool
-    failed_login_attempts: int
-    password_changed_at: datetime
-    is_locked: bool
+    __tablename__ = "users"
 
+    email: str = None
+    username: str = None
+    password_hash: str = None
+    first_name: str = None
+    last_name: str = None
+    organization_id: str = None
+    role: UserRole = None
+    last_login: datetime = None
+    mfa_enabled: bool = False
+    failed_login_attempts: int = None
+    password_changed_at: datetime = None
+    is_locked: bool = False
+
+@dataclass(slots=True, kw_only=True)
 class ThreatIncident(BaseModel):
     """Model for tracking security threats and incidents"""
-    title: str
-    description: str
-    organization_id: str
-    reported_by: str
-    threat_level: ThreatLevel
-    status: ThreatStatus
-    affected_systems: list
-    impact_assessment: str
-    mitigation_steps: list
-    resolution_notes: str
-    resolved_at: datetime
-    resolution_time: int  # in minutes
+    __tablename__ = "threats"
+
+    title: str = None
+    description: str = None
+    organization_id: str = None
+    reported_by: str = None
+    source_ip: str = None
+    threat_type: str = None  # Phishing, Malware, DDoS, ...
+    threat_level: ThreatLevel = None
+    status: ThreatStatus = None
+    affected_systems: list = field(default_factory=list)
+    impact_assessment: str = None
+    mitigation_steps: list = field(default_factory=list)
+    resolution_notes: str = None
+    resolved_at: datetime = None
+    resolution_time: int = None  # in minutes
+    risk_score: float = None
 
+@dataclass(slots=True, kw_only=True)
 class SecurityAlert(BaseModel):
     """Security alert notifications"""
-    title: str
-    description: str
-    organization_id: str
-    threat_level: ThreatLevel
-    source: str
-    is_acknowledged: bool
-    acknowledged_by: str
-    acknowledged_at: datetime
-    requires_action: bool
-    action_taken: str
+    __tablename__ = "alerts"
+
+    title: str = None
+    description: str = None
+    organization_id: str = None
+    threat_level: ThreatLevel = None
+    source: str = None
+    is_acknowledged: bool = False
+    acknowledged_by: str = None
+    acknowledged_at: datetime = None
+    requires_action: bool = False
+    action_taken: str = None
 
+@dataclass(slots=True, kw_only=True)
 class AuditLog(BaseModel):
     """System audit logging"""
-    user_id: str
-    organization_id: str
-    action: str
-    resource_type: str
-    resource_id: str
-    ip_address: str
-    user_agent: str
-    details: dict
+    __tablename__ = "audit_logs"
 
+    user_id: str = None
+    organization_id: str = None
+    action: str = None
+    resource_type: str = None
+    resource_id: str = None
+    ip_address: str = None
+    user_agent: str = None
+    details: dict = field(default_factory=dict)
+
+@dataclass(slots=True, kw_only=True)
 class RiskAssessment(BaseModel):
     """Risk assessment records"""
-    organization_id: str
-    conducted_by: str
-    assessment_date: datetime
-    overall_risk_score: float
-    risk_factors: dict
-    recommendations: list
-    next_assessment_date: datetime
-    compliance_status: dict
+    __tablename__ = "risk_assessments"
+
+    organization_id: str = None
+    conducted_by: str = None
+    assessment_date: datetime = None
+    overall_risk_score: float = None
+    risk_factors: dict = field(default_factory=dict)
+    recommendations: list = field(default_factory=list)
+    next_assessment_date: datetime = None
+    compliance_status: dict = field(default_factory=dict)
 
+@dataclass(slots=True, kw_only=True)
 class SecurityPolicy(BaseModel):
     """Security policies and procedures"""
-    organization_id: str
-    title: str
-    content: str
-    version: str
-    approved_by: str
-    approved_at: datetime
-    effective_date: datetime
-    review_date: datetime
-    policy_type: str
-    attachments: list
+    __tablename__ = "security_policies"
+
+    organization_id: str = None
+    title: str = None
+    content: str = None
+    version: str = None
+    approved_by: str = None
+    approved_at: datetime = None
+    effective_date: datetime = None
+    review_date: datetime = None
+    policy_type: str = None
+    attachments: list = field(default_factory=list)
 
+@dataclass(slots=True, kw_only=True)
 class AssetInventory(BaseModel):
     """Digital asset inventory"""
-    organization_id: str
-    asset_name: str
-    asset_type: str
-    location: str
-    status: str
-    owner: str
-    security_classification: str
-    last_assessment_date: datetime
-    vulnerabilities: list
-    patches_applied: list
+    __tablename__ = "assets"
 
+    organization_id: str = None
+    asset_name: str = None
+    asset_type: str = None
+    location: str = None
+    status: str = None
+    owner: str = None
+    security_classification: str = None
+    last_assessment_date: datetime = None
+    vulnerabilities: list = field(default_factory=list)
+    patches_applied: list = field(default_factory=list)
+
+@dataclass(slots=True, kw_only=True)
 class VulnerabilityReport(BaseModel):
     """Vulnerability assessment reports"""
-    organization_id: str
-    scan_date: datetime
-    scanner_type: str
-    vulnerabilities: list
-    risk_score: float
-    remediation_steps: list
-    assigned_to: str
-    status: str
-    verification_status: str
+    __tablename__ = "vulnerability_reports"
+
+    organization_id: str = None
+    scan_date: datetime = None
+    scanner_type: str = None
+    vulnerabilities: list = field(default_factory=list)
+    risk_score: float = None
+    remediation_steps: list = field(default_factory=list)
+    assigned_to: str = None
+    status: str = None
+    verification_status: str = None
 
+@dataclass(slots=True, kw_only=True)
 class TrainingRecord(BaseModel):
     """Security training records"""
-    user_id: str
-    organization_id: str
-    training_type: str
-    completion_date: datetime
-    score: float
-    certification: str
-    valid_until: datetime
-    training_provider: str
-    materials_accessed: list
+    __tablename__ = "training_records"
+
+    user_id: str = None
+    organization_id: str = None
+    training_type: str = None
+    completion_date: datetime = None
+    score: float = None
+    certification: str = None
+    valid_until: datetime = None
+    training_provider: str = None
+    materials_accessed: list = field(default_factory=list)
 
+@dataclass(slots=True, kw_only=True)
 class IncidentResponse(BaseModel):
     """Incident response procedures"""
-    organization_id: str
-    incident_type: str
-    response_team: list
-    procedures: list
-    contact_list: dict
-    resources_required: list
-    escalation_matrix: dict
-    recovery_steps: list
-    lessons_learned: str
+    __tablename__ = "incident_responses"
 
+    organization_id: str = None
+    incident_type: str = None
+    response_team: list = field(default_factory=list)
+    procedures: list = field(default_factory=list)
+    contact_list: dict = field(default_factory=dict)
+    resources_required: list = field(default_factory=list)
+    escalation_matrix: dict = field(default_factory=dict)
+    recovery_steps: list = field(default_factory=list)
+    lessons_learned: str = None
+
+@dataclass(slots=True, kw_only=True)
 class ComplianceReport(BaseModel):
     """Compliance monitoring and reporting"""
-    organization_id: str
-    framework: str
-    assessment_date: datetime
-    assessor: str
-    compliance_score: float
-    findings: list
-    remediation_plan: dict
-    next_review_date: datetime
-    attachments: list
+    __tablename__ = "compliance_reports"
+
+    organization_id: str = None
+    framework: str = None
+    assessment_date: datetime = None
+    assessor: str = None
+    compliance_score: float = None
+    findings: list = field(default_factory=list)
+    remediation_plan: dict = field(default_factory=dict)
+    next_review_date: datetime = None
+    attachments: list = field(default_factory=list)
 
+@dataclass(slots=True, kw_only=True)
 class NotificationSettings(BaseModel):
     """User notification preferences"""
-    user_id: str
-    organization_id: str
-    email_enabled: bool
-    sms_enabled: bool
-    in_app_enabled: bool
-    notification_types: dict
-    quiet_hours: dict
-    preferred_language: str
+    __tablename__ = "notification_settings"
+
+    user_id: str = None
+    organization_id: str = None
+    email_enabled: bool = False
+    sms_enabled: bool = False
+    in_app_enabled: bool = False
+    notification_types: dict = field(default_factory=dict)
+    quiet_hours: dict = field(default_factory=dict)
+    preferred_language: str = None
 
+@dataclass(slots=True, kw_only=True)
 class APIKey(BaseModel):
     """API access keys"""
-    organization_id: str
-    key_name: str
-    key_hash: str
-    permissions: list
-    last_used: datetime
-    expires_at: datetime
-    rate_limit: int
-    created_by: str
+    __tablename__ = "api_keys"
 
+    organization_id: str = None
+    key_name: str = None
+    key_hash: str = None
+    permissions: list = field(default_factory=list)
+    last_used: datetime = None
+    expires_at: datetime = None
+    rate_limit: int = None
+    created_by: str = None
+
+@dataclass(slots=True, kw_only=True)
 class SystemMetrics(BaseModel):
     """System performance metrics"""
-    timestamp: datetime
-    organization_id: str
-    cpu_usage: float
-    memory_usage: float
-    disk_usage: float
-    network_traffic: dict
-    active_users: int
-    response_time: float
-    error_rate: float
+    __tablename__ = "system_metrics"
+
+    timestamp: datetime = None
+    organization_id: str = None
+    cpu_usage: float = None
+    memory_usage: float = None
+    disk_usage: float = None
+    network_traffic: dict = field(default_factory=dict)
+    active_users: int = None
+    response_time: float = None
+    error_rate: float = None
@@ -3,6 +3,7 @@ import plotly.graph_objects as go
 import pandas as pd
 from datetime import datetime
 from config import UI_CONFIG, APP_CONFIG
+from utils.risk_simulation import LOW_RISK_SCORE, MEDIUM_RISK_SCORE, simulate_risk
 
 # Page config
 st.set_page_config(
@@ -124,24 +125,26 @@ with tab1:
     # Risk Categories
     st.markdown("<h3 class='section-header'>Risk Categories</h3>", unsafe_allow_html=True)
     
+    def rated_slider(label, options, value="Standard"):
+        """A maturity select_slider returning (position, number of options)"""
+        choice = st.select_slider(label, options=options, value=value)
+        return options.index(choice), len(options)
+
     # Technical Controls
     st.markdown("<div class='risk-card'>", unsafe_allow_html=True)
     st.markdown("#### 1. Technical Controls")
     tech_controls = {
-        "Data Encryption": st.select_slider(
+        "Data Encryption": rated_slider(
             "Data Encryption Level",
-            options=["None", "Basic", "Standard", "Advanced", "Military-Grade"],
-            value="Standard"
+            ["None", "Basic", "Standard", "Advanced", "Military-Grade"]
         ),
-        "Access Control": st.select_slider(
+        "Access Control": rated_slider(
             "Access Control Measures",
-            options=["Minimal", "Basic", "Standard", "Strong", "Very Strong"],
-            value="Standard"
+            ["Minimal", "Basic", "Standard", "Strong", "Very Strong"]
         ),
-        "Network Security": st.select_slider(
+        "Network Security": rated_slider(
             "Network Security Level",
-            options=["Basic", "Standard", "Enhanced", "Advanced", "Enterprise"],
-            value="Standard"
+            ["Basic", "Standard", "Enhanced", "Advanced", "Enterprise"]
         )
     }
     st.markdown("</div>", unsafe_allow_html=True)
@@ -150,15 +153,13 @@ with tab1:
     st.markdown("<div class='risk-card'>", unsafe_allow_html=True)
     st.markdown("#### 2. Policy & Procedures")
     policy_controls = {
-        "Security Policies": st.select_slider(
+        "Security Policies": rated_slider(
             "Security Policy Implementation",
-            options=["None", "Partial", "Standard", "Comprehensive", "Advanced"],
-            value="Standard"
+            ["None", "Partial", "Standard", "Comprehensive", "Advanced"]
         ),
-        "Incident Response": st.select_slider(
+        "Incident Response": rated_slider(
             "Incident Response Readiness",
-            options=["None", "Basic", "Standard", "Advanced", "Comprehensive"],
-            value="Standard"
+            ["None", "Basic", "Standard", "Advanced", "Comprehensive"]
         )
     }
     st.markdown("</div>", unsafe_allow_html=True)
@@ -167,54 +168,76 @@ with tab1:
     st.markdown("<div class='risk-card'>", unsafe_allow_html=True)
     st.markdown("#### 3. Human Factors")
     human_factors = {
-        "Staff Training": st.select_slider(
+        "Staff Training": rated_slider(
             "Security Training Level",
-            options=["None", "Basic", "Standard", "Advanced", "Comprehensive"],
-            value="Standard"
+            ["None", "Basic", "Standard", "Advanced", "Comprehensive"]
         ),
-        "Security Awareness": st.select_slider(
+        "Security Awareness": rated_slider(
             "Security Awareness Program",
-            options=["None", "Basic", "Standard", "Advanced", "Comprehensive"],
-            value="Standard"
+            ["None", "Basic", "Standard", "Advanced", "Comprehensive"]
         )
     }
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Threat Environment
+    st.markdown("<div class='risk-card'>", unsafe_allow_html=True)
+    st.markdown("#### 4. Threat Environment")
+    threat_likelihood = rated_slider(
+        "Threat Likelihood",
+        ["Rare", "Unlikely", "Possible", "Likely", "Almost Certain"],
+        value="Possible"
+    )
+    st.markdown("</div>", unsafe_allow_html=True)
+
     if st.button("Calculate Risk Score"):
-        # Calculate scores
-        def convert_to_score(value):
-            options = ["None", "Basic", "Standard", "Advanced", "Comprehensive"]
-            return (options.index(value) + 1) / len(options)
+        # Simulate the score over uncertain ratings; cached per combination
+        simulation = simulate_risk(
+            tuple(
+                (category, position, levels)
+                for category, ratings in (
+                    ("technical", tech_controls),
+                    ("policy", policy_controls),
+                    ("human", human_factors),
+                )
+                for position, levels in ratings.values()
+            ),
+            threat_likelihood
+        )
+        score = simulation.score
+        total_score = score.p50
+        tech_score, policy_score, human_score = (
+            simulation.categories[category].p50 for category in ("technical", "policy", "human")
+        )
 
-        tech_score = sum(convert_to_score(v) for v in tech_controls.values()) / len(tech_controls)
-        policy_score = sum(convert_to_score(v) for v in policy_controls.values()) / len(policy_controls)
-        human_score = sum(convert_to_score(v) for v in human_factors.values()) / len(human_factors)
-        
-        total_score = (tech_score + policy_score + human_score) / 3
-        
         # Display results
         st.markdown("<h3 class='section-header'>Assessment Results</h3>", unsafe_allow_html=True)
         
         col1, col2 = st.columns(2)
         with col1:
             # Risk level determination
-            if total_score >= 0.8:
+            if total_score >= LOW_RISK_SCORE:
                 risk_level = "Low Risk"
                 color = "#90EE90"
-            elif total_score >= 0.6:
+            elif total_score >= MEDIUM_RISK_SCORE:
                 risk_level = "Medium Risk"
                 color = "#FFD700"
             else:
                 risk_level = "High Risk"
                 color = "#FF0000"
 
+            odds = simulation.risk_levels
             st.markdown(f"""
                 <div class="risk-card">
                     <h2 style="color: {color};">{risk_level}</h2>
                     <h3>Overall Score: {total_score:.2%}</h3>
+                    <p>90% band: {score.p5:.2%} – {score.p95:.2%}</p>
                     <p>Technical Controls: {tech_score:.2%}</p>
                     <p>Policy & Procedures: {policy_score:.2%}</p>
                     <p>Human Factors: {human_score:.2%}</p>
+                    <p>Residual risk: {simulation.residual_risk.p50:.2%}
+                       ({simulation.residual_risk.p5:.2%} – {simulation.residual_risk.p95:.2%})</p>
+                    <p>Chance of low / medium / high risk:
+                       {odds['low']:.0%} / {odds['medium']:.0%} / {odds['high']:.0%}</p>
                 </div>
             """, unsafe_allow_html=True)
 
@@ -231,6 +254,24 @@ with tab1:
                 </div>
             """, unsafe_allow_html=True)
 
+        # Score distribution across the simulated scenarios
+        counts, edges = simulation.histogram
+        fig_distribution = go.Figure(go.Bar(
+            x=[(low + high) / 2 for low, high in zip(edges, edges[1:])],
+            y=counts,
+            marker_color='#2E8B57'
+        ))
+        for value in (score.p5, score.p95):
+            fig_distribution.add_vline(x=value, line_dash="dash", line_color="#FFD700")
+        fig_distribution.update_layout(
+            title=f'Score Distribution over {simulation.scenarios:,} Scenarios',
+            xaxis_title='Overall Score',
+            yaxis_title='Scenarios',
+            xaxis_tickformat='.0%',
+            height=300
+        )
+        st.plotly_chart(fig_distribution, use_container_width=True)
+
 with tab2:
     st.markdown("<h3 class='section-header'>Detailed Risk Analysis</h3>", unsafe_allow_html=True)
     
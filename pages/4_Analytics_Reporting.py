@@ -1,9 +1,19 @@
+import asyncio
 import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from database import db, rollup_query, sketch_query
+from services.analytics_service import AnalyticsService
+from utils.sketches import sketch_engine
+
+# The process-wide database handle, connected once across reruns and sessions
+@st.cache_resource(show_spinner=False)
+def get_database():
+    db.connect()
+    return db
 
 # Page configuration
 st.set_page_config(
@@ -165,73 +175,119 @@ st.markdown("<h3 style='text-align: center; color: #FFFFFF;'>Comprehensive Secur
 
 # Date Range Selector with improved styling
 st.markdown("<div class='analytics-card'>", unsafe_allow_html=True)
-col1, col2 = st.columns([2, 2])
+organizations = {
+    row['id']: row['name']
+    for row in get_database().fetch_all("SELECT id, name FROM organizations ORDER BY name")
+}
+col1, col2, col3 = st.columns([2, 2, 2])
 with col1:
-    start_date = st.date_input("Start Date", datetime.now() - timedelta(days=30))
+    organization_id = st.selectbox(
+        "Organization", list(organizations), format_func=organizations.get
+    )
 with col2:
+    start_date = st.date_input("Start Date", datetime.now() - timedelta(days=30))
+with col3:
     end_date = st.date_input("End Date", datetime.now())
 st.markdown("</div>", unsafe_allow_html=True)
 
-# Key Metrics Row with enhanced visibility
-metrics_col1, metrics_col2, metrics_col3, metrics_col4 = st.columns(4)
+range_start = datetime.combine(start_date, datetime.min.time())
+range_end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+
+# Threat, risk and compliance metrics for the range, cached and shared across
+# sessions; a section whose queries ran past the time limit comes back None
+dashboard = asyncio.run(
+    AnalyticsService.generate_dashboard_metrics(organization_id, range_start, range_end)
+) if organization_id else {}
+threat_metrics = dashboard.get('threat_metrics')
+risk_metrics = dashboard.get('risk_metrics')
+compliance_metrics = dashboard.get('compliance_metrics')
+
+# Resolution percentiles and distinct counts, merged from the daily sketches
+sketches = sketch_engine.merged(
+    get_database().fetch_all(*sketch_query(range_start, range_end, organization_id)),
+    organization_id, range_start, range_end
+)
+sketch_summary = sketch_engine.summarize(sketches)
 
-with metrics_col1:
-    st.markdown("""
+def metric_card(title: str, value: str, note: str, color: str = "#FFD700"):
+    st.markdown(f"""
         <div class="analytics-card">
-            <h3>Total Incidents</h3>
-            <h2 style="color: #FFD700;">247</h2>
-            <p style="color: #90EE90;">↑ 12% from last month</p>
+            <h3>{title}</h3>
+            <h2 style="color: {color};">{value}</h2>
+            <p style="color: #90EE90;">{note}</p>
         </div>
     """, unsafe_allow_html=True)
 
+UNAVAILABLE = ("—", "Not available right now")
+
+# Key Metrics Row with enhanced visibility
+metrics_col1, metrics_col2, metrics_col3, metrics_col4 = st.columns(4)
+
+with metrics_col1:
+    if threat_metrics is None:
+        metric_card("Total Incidents", *UNAVAILABLE)
+    else:
+        metric_card("Total Incidents", f"{threat_metrics['total_threats']:,}",
+                    f"{threat_metrics['active_threats']:,} still open")
+
 with metrics_col2:
-    st.markdown("""
-        <div class="analytics-card">
-            <h3>Resolution Rate</h3>
-            <h2 style="color: #90EE90;">94%</h2>
-            <p style="color: #90EE90;">↑ 3% improvement</p>
-        </div>
-    """, unsafe_allow_html=True)
+    if threat_metrics is None:
+        metric_card("Resolution Rate", *UNAVAILABLE, color="#90EE90")
+    else:
+        total = threat_metrics['total_threats']
+        resolved = threat_metrics['threats_by_status']['resolved']
+        metric_card("Resolution Rate", f"{resolved / total:.0%}" if total else "—",
+                    f"{resolved:,} resolved", color="#90EE90")
 
 with metrics_col3:
-    st.markdown("""
+    p50, p95, p99 = (sketch_summary[f'resolution_time_{p}'] for p in ('p50', 'p95', 'p99'))
+    median = f"{p50:.0f}min" if p50 is not None else "—"
+    tail = f"p95 {p95:.0f}min · p99 {p99:.0f}min" if p50 is not None else "No resolved incidents"
+    st.markdown(f"""
         <div class="analytics-card">
-            <h3>Avg Response Time</h3>
-            <h2 style="color: #FFD700;">45min</h2>
-            <p style="color: #90EE90;">↓ 15% faster</p>
+            <h3>Median Resolution Time</h3>
+            <h2 style="color: #FFD700;">{median}</h2>
+            <p style="color: #90EE90;">{tail}</p>
         </div>
     """, unsafe_allow_html=True)
 
 with metrics_col4:
-    st.markdown("""
-        <div class="analytics-card">
-            <h3>Security Score</h3>
-            <h2 style="color: #90EE90;">87/100</h2>
-            <p style="color: #90EE90;">↑ 5 points</p>
-        </div>
-    """, unsafe_allow_html=True)
+    if risk_metrics is None or risk_metrics['latest_score'] is None:
+        metric_card("Security Score", *UNAVAILABLE, color="#90EE90")
+    else:
+        change = risk_metrics['score_change']
+        metric_card("Security Score", f"{risk_metrics['latest_score'] * 100:.0f}/100",
+                    f"{change * 100:+.0f} points" if change is not None else "First assessment",
+                    color="#90EE90")
+
+st.caption(
+    f"Distinct affected systems: {sketch_summary['distinct_affected_systems']:,} · "
+    f"source IPs: {sketch_summary['distinct_source_ips']:,} · "
+    f"reporters: {sketch_summary['distinct_reporters']:,}"
+)
 
 # Threat Analysis Section
 st.markdown("<h2 class='section-header'>Threat Analysis</h2>", unsafe_allow_html=True)
 
-# Create sample data for threats over time
+# Threats per day and type, read from the daily rollups
 dates = pd.date_range(start=start_date, end=end_date, freq='D')
-threat_data = pd.DataFrame({
-    'Date': dates,
-    'Phishing': np.random.randint(5, 15, size=len(dates)),
-    'Malware': np.random.randint(3, 10, size=len(dates)),
-    'DDoS': np.random.randint(1, 5, size=len(dates)),
-    'Unauthorized_Access': np.random.randint(2, 8, size=len(dates))
-})
+rollups = get_database().fetch_all(*rollup_query(
+    start_date, end_date + timedelta(days=1), group_by=("day", "threat_type")
+))
+threat_data = (
+    pd.DataFrame([dict(row) for row in rollups], columns=['day', 'threat_type', 'threats'])
+    .pivot_table(index='day', columns='threat_type', values='threats', aggfunc='sum', fill_value=0)
+    .reindex(dates.strftime('%Y-%m-%d'), fill_value=0)
+)
 
 # Create stacked area chart with improved visibility
 fig = go.Figure()
 
-for column in ['Phishing', 'Malware', 'DDoS', 'Unauthorized_Access']:
+for column in threat_data.columns:
     fig.add_trace(go.Scatter(
-        x=threat_data['Date'],
+        x=dates,
         y=threat_data[column],
-        name=column,
+        name=column or 'Unclassified',
         stackgroup='one',
         fill='tonexty'
     ))
@@ -316,12 +372,18 @@ with col1:
     st.plotly_chart(fig_vuln, use_container_width=True)
 
 with col2:
-    # Incident Response Times with enhanced visibility
-    response_times = np.random.normal(45, 15, 100)
-    
-    fig_response = go.Figure(data=[go.Histogram(
-        x=response_times,
-        nbinsx=20,
+    # Incident Response Times, binned from the merged resolution-time digest
+    digest = sketches.get('resolution_time')
+    if digest is not None and digest.count:
+        edges = np.linspace(digest.minimum, digest.maximum, 21)
+        frequencies = np.diff(digest.cdf(edges)) * digest.count
+    else:
+        edges, frequencies = np.zeros(1), np.zeros(0)
+
+    fig_response = go.Figure(data=[go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=frequencies,
+        width=np.diff(edges),
         marker_color='#2E8B57'
     )])
     
@@ -340,9 +402,15 @@ with col2:
 # Compliance & Policy Metrics
 st.markdown("<h2 class='section-header'>Compliance & Policy Metrics</h2>", unsafe_allow_html=True)
 
+# Latest score per framework from the dashboard metrics
+frameworks = {
+    name: framework['score']
+    for name, framework in (compliance_metrics or {}).get('frameworks', {}).items()
+    if framework['score'] is not None
+}
 compliance_data = {
-    'Category': ['Data Protection', 'Access Control', 'Incident Response', 'Security Training', 'Network Security'],
-    'Score': [92, 88, 95, 78, 85]
+    'Category': list(frameworks),
+    'Score': [round(score * 100) for score in frameworks.values()]
 }
 
 fig_compliance = go.Figure(data=[
@@ -24,6 +24,9 @@ SECURITY_CONFIG = {
     "API_KEY_EXPIRY": timedelta(days=90),
     "RATE_LIMIT_REQUESTS": 100,
     "RATE_LIMIT_PERIOD": timedelta(minutes=1),
+    "RATE_LIMIT_BACKEND": "memory",  # "memory" or "sqlite" to share across workers
+    "RATE_LIMIT_DB": "rate_limits.db",
+    "RATE_LIMIT_SHARDS": 16,
     
     # Headers
     "SECURITY_HEADERS": {
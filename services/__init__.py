@@ -1,65 +0,0 @@
-from datetime import datetime
-from typing import List, Optional
-from models import ThreatIncident
-from utils.logger import Logger
-from utils.analytics import AnalyticsEngine
-from utils.notifications import NotificationManager
-
-logger = Logger()
-analytics = AnalyticsEngine()
-notifications = NotificationManager()
-
-class ThreatService:
-    @staticmethod
-    async def report_threat(threat_data: dict) -> ThreatIncident:
-        """Process and store new threat report"""
-        try:
-            # Create threat incident
-            threat = ThreatIncident(**threat_data)
-            
-            # Analyze threat severity
-            risk_score = analytics.calculate_threat_risk(threat_data)
-            threat.risk_score = risk_score
-            
-            # Store in database
-            # Implementation needed
-            
-            # Send notifications based on severity
-            if risk_score > 7:
-                notifications.send_alert(
-                    alert_type="high_risk_threat",
-                    message=f"High risk threat detected: {threat.title}",
-                    severity="critical"
-                )
-            
-            return threat
-        except Exception as e:
-            logger.log_error(str(e), "THREAT_SERVICE")
-            raise
-
-    @staticmethod
-    async def get_threats(
-        organization_id: str,
-        severity: Optional[str] = None,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
-    ) -> List[ThreatIncident]:
-        """Retrieve threats based on filters"""
-        try:
-            # Implement database query
-            # Return filtered threats
-            return []
-        except Exception as e:
-            logger.log_error(str(e), "THREAT_SERVICE")
-            raise
-
-    @staticmethod
-    async def update_threat_status(threat_id: str, status: str) -> bool:
-        """Update threat status"""
-        try:
-            # Update threat status in database
-            # Implement status update logic
-            return True
-        except Exception as e:
-            logger.log_error(str(e), "THREAT_SERVICE")
-            raise
@@ -1,10 +1,20 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 from models import SecurityAlert
+from database import async_db, row_to_model
+from utils.pagination import Pagination
 from utils.notifications import NotificationManager
 from utils.logger import Logger
 
 logger = Logger()
 notifications = NotificationManager()
+db = async_db
+
+# Alert status filters mapped onto the is_acknowledged column
+ALERT_STATUS_FILTERS = {
+    'acknowledged': True,
+    'unacknowledged': False,
+}
 
 class AlertService:
     @staticmethod
@@ -13,8 +23,8 @@ class AlertService:
         try:
             alert = SecurityAlert(**alert_data)
             
-            # Store alert
-            # Implementation needed
+            # Store alert, batched with concurrent writes
+            await db.write(alert)
             
             # Send notifications
             await AlertService._send_alert_notifications(alert)
@@ -24,6 +34,25 @@ class AlertService:
             logger.log_error(str(e), "ALERT_SERVICE")
             raise
 
+    @staticmethod
+    async def acknowledge_alert(alert_id: str, user_id: str) -> bool:
+        """Mark an alert as acknowledged by a user"""
+        try:
+            now = datetime.utcnow().isoformat()
+            rows = await db.execute_returning(
+                """
+                UPDATE alerts
+                SET is_acknowledged = 1, acknowledged_by = ?, acknowledged_at = ?, updated_at = ?
+                WHERE id = ? AND is_acknowledged = 0
+                RETURNING organization_id
+                """,
+                (user_id, now, now, alert_id)
+            )
+            return bool(rows)
+        except Exception as e:
+            logger.log_error(str(e), "ALERT_SERVICE")
+            raise
+
     @staticmethod
     async def get_alerts(
         organization_id: str,
@@ -31,27 +60,86 @@ class AlertService:
     ) -> List[SecurityAlert]:
         """Retrieve security alerts"""
         try:
-            # Implement alert retrieval logic
-            return []
+            query, params = AlertService._build_alerts_query(organization_id, status)
+            rows = await db.fetch_all(query, params)
+            return [row_to_model(SecurityAlert, row) for row in rows]
+        except Exception as e:
+            logger.log_error(str(e), "ALERT_SERVICE")
+            raise
+
+    @staticmethod
+    async def get_alerts_page(
+        organization_id: str,
+        status: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[SecurityAlert], Optional[str]]:
+        """Retrieve one page of alerts, newest first, and the next cursor"""
+        try:
+            after = Pagination.decode_cursor(cursor) if cursor else None
+            query, params = AlertService._build_alerts_query(
+                organization_id, status, after, limit + 1
+            )
+            rows = await db.fetch_all(query, params)
+            alerts = [row_to_model(SecurityAlert, row) for row in rows[:limit]]
+            return alerts, Pagination.next_cursor(rows, limit)
         except Exception as e:
             logger.log_error(str(e), "ALERT_SERVICE")
             raise
 
+    @staticmethod
+    async def iter_alerts(
+        organization_id: str,
+        status: Optional[str] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[List[SecurityAlert]]:
+        """Yield every matching alert in chunks, newest first"""
+        cursor = None
+        while True:
+            alerts, cursor = await AlertService.get_alerts_page(
+                organization_id, status, cursor, chunk_size
+            )
+            if alerts:
+                yield alerts
+            if cursor is None:
+                return
+
+    @staticmethod
+    def _build_alerts_query(
+        organization_id: str,
+        status: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[str, list]:
+        """Build the filtered alert query served by the alerts indexes"""
+        clauses = ["organization_id = ?"]
+        params = [organization_id]
+        if status:
+            if status not in ALERT_STATUS_FILTERS:
+                raise ValueError(f"Unknown alert status: {status}")
+            clauses.append("is_acknowledged = ?")
+            params.append(ALERT_STATUS_FILTERS[status])
+        if after:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+        query = (
+            f"SELECT * FROM alerts WHERE {' AND '.join(clauses)} "
+            "ORDER BY created_at DESC, id DESC"
+        )
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, params
+
     @staticmethod
     async def _send_alert_notifications(alert: SecurityAlert):
         """Send alert notifications through configured channels"""
         try:
-            notification_data = {
-                'title': alert.title,
-                'description': alert.description,
-                'severity': alert.threat_level,
-                'timestamp': alert.created_at
-            }
-            
-            await notifications.send_alert(
+            notifications.send_alert(
+                user_id="system",
                 alert_type="security_alert",
-                data=notification_data,
-                priority=alert.threat_level
+                message=f"{alert.title}: {alert.description}" if alert.description else alert.title,
+                priority=alert.threat_level.label if alert.threat_level else "low"
             )
         except Exception as e:
             logger.log_error(str(e), "ALERT_SERVICE")
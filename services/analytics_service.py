@@ -1,21 +1,158 @@
+import asyncio
+import sqlite3
+import time
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+from config import ANALYTICS_CONFIG
+from database import async_db, query_deadline, rollup_query, sketch_query
+from models import ThreatLevel, ThreatStatus
 from utils.analytics import AnalyticsEngine
+from utils.cache import AsyncTTLCache
 from utils.logger import Logger
+from utils.metrics import metrics_engine, sample_variance
+from utils.sketches import sketch_engine
+from utils.threat_store import ThreatStore
 
 logger = Logger()
+db = async_db
 analytics = AnalyticsEngine()
+dashboard_cache = AsyncTTLCache(
+    maxsize=ANALYTICS_CONFIG["dashboard_cache_size"],
+    ttl=ANALYTICS_CONFIG["dashboard_cache_ttl"],
+    stale_ttl=ANALYTICS_CONFIG["dashboard_stale_ttl"]
+)
+
+# Window functions (SQLite 3.25+) back the latest-per-group metrics; older
+# libraries fall back to aggregating the rows with AnalyticsEngine
+SQL_WINDOW_FUNCTIONS = sqlite3.sqlite_version_info >= (3, 25, 0)
 
 class AnalyticsService:
     @staticmethod
-    async def generate_dashboard_metrics(organization_id: str) -> Dict:
-        """Generate metrics for dashboard"""
+    async def generate_dashboard_metrics(
+        organization_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict:
+        """Generate metrics for dashboard, optionally over [start_date, end_date)
+
+        The database metrics are cached per organization and range, and
+        concurrent callers share one computation. Alert metrics are live.
+        """
+        try:
+            metrics = await dashboard_cache.get_or_load(
+                (organization_id, start_date, end_date),
+                lambda: AnalyticsService._compute_dashboard_metrics(
+                    organization_id, start_date, end_date, ANALYTICS_CONFIG["metric_timeout"]
+                ),
+                # A dashboard with a timed-out section is shown but not kept
+                cacheable=lambda metrics: None not in metrics.values()
+            )
+            alert_metrics = await db.run(metrics_engine.alert_metrics, organization_id)
+            return {**metrics, 'alert_metrics': alert_metrics}
+        except Exception as e:
+            logger.log_error(str(e), "ANALYTICS_SERVICE")
+            raise
+
+    @staticmethod
+    async def _compute_dashboard_metrics(
+        organization_id: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """Run the threat, risk and compliance queries concurrently
+
+        A query exceeding ``timeout`` leaves its section None; any other
+        failure is raised once all three have finished. Cancelling the wait
+        cannot stop a statement already running in a worker thread, so the
+        same deadline is set on the section's SQLite statements, which
+        abort once it passes and free their thread and connection.
+        """
+        sections = {
+            'threat_metrics': AnalyticsService._get_threat_metrics,
+            'risk_metrics': AnalyticsService._get_risk_metrics,
+            'compliance_metrics': AnalyticsService._get_compliance_metrics,
+        }
+
+        async def run_section(query):
+            if timeout is None:
+                return await query(organization_id, start_date, end_date)
+            deadline = time.monotonic() + timeout
+            # Each section runs in its own task, so this stays local to it
+            query_deadline.set(deadline)
+            result = await query(organization_id, start_date, end_date)
+            if time.monotonic() >= deadline:
+                # An interrupted statement reads as no rows; never report that as data
+                raise asyncio.TimeoutError
+            return result
+
+        results = await asyncio.gather(
+            *(asyncio.wait_for(run_section(query), timeout) for query in sections.values()),
+            return_exceptions=True
+        )
+        metrics = {}
+        for name, result in zip(sections, results):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.log_error(f"{name} timed out after {timeout}s", "ANALYTICS_SERVICE")
+                result = None
+            elif isinstance(result, BaseException):
+                raise result
+            metrics[name] = result
+        return metrics
+
+    @staticmethod
+    async def get_threat_metrics_by_organization(
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[str, Dict]:
+        """Calculate threat metrics for every organization in [start_date, end_date)"""
+        try:
+            rows = await db.fetch_all(
+                """
+                SELECT threat_level, created_at, organization_id, threat_type, resolution_time
+                FROM threats
+                WHERE created_at >= ? AND created_at < ?
+                ORDER BY created_at
+                """,
+                (start_date.isoformat(), end_date.isoformat())
+            )
+            store = ThreatStore(capacity=len(rows))
+            store.extend(dict(row) for row in rows)
+            return analytics.calculate_threat_metrics_by_organization(store.view())
+        except Exception as e:
+            logger.log_error(str(e), "ANALYTICS_SERVICE")
+            raise
+
+    @staticmethod
+    async def get_threat_rollups(
+        organization_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        group_by: Tuple[str, ...] = ("day",)
+    ) -> List[Dict]:
+        """Read daily threat rollup buckets over [start_date, end_date)"""
+        try:
+            rows = await db.fetch_all(*rollup_query(start_date, end_date, organization_id, group_by))
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.log_error(str(e), "ANALYTICS_SERVICE")
+            raise
+
+    @staticmethod
+    async def get_threat_sketches(
+        organization_id: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict:
+        """Approximate distinct counts and resolution percentiles over [start_date, end_date)
+
+        Merges one stored sketch per organization, day and metric, so a year
+        costs a few hundred small blobs however many incidents it holds.
+        """
         try:
-            return {
-                'threat_metrics': await AnalyticsService._get_threat_metrics(organization_id),
-                'risk_metrics': await AnalyticsService._get_risk_metrics(organization_id),
-                'compliance_metrics': await AnalyticsService._get_compliance_metrics(organization_id)
-            }
+            rows = await db.fetch_all(*sketch_query(start_date, end_date, organization_id))
+            sketches = sketch_engine.merged(rows, organization_id, start_date, end_date)
+            return sketch_engine.summarize(sketches)
         except Exception as e:
             logger.log_error(str(e), "ANALYTICS_SERVICE")
             raise
@@ -29,26 +166,223 @@ class AnalyticsService:
     ) -> Dict:
         """Generate analytical report"""
         try:
-            # Implement report generation logic
-            return {}
+            # Reports are computed fresh and without per-query timeouts
+            report = await AnalyticsService._compute_dashboard_metrics(
+                organization_id, start_date, end_date
+            )
+            report['alert_metrics'] = await db.run(metrics_engine.alert_metrics, organization_id)
+            # Percentiles and distinct counts come from the daily sketches,
+            # so the range is whole days and no threat rows are read
+            report['threat_metrics'].update(
+                await AnalyticsService.get_threat_sketches(organization_id, start_date, end_date)
+            )
+            report.update({
+                'report_type': report_type,
+                'organization_id': organization_id,
+                'start_date': start_date,
+                'end_date': end_date,
+                'generated_at': datetime.utcnow()
+            })
+            return report
         except Exception as e:
             logger.log_error(str(e), "ANALYTICS_SERVICE")
             raise
 
     @staticmethod
-    async def _get_threat_metrics(organization_id: str) -> Dict:
+    def _filtered(
+        select: str,
+        organization_id: str,
+        date_column: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        clauses: Optional[List[str]] = None,
+        params: Optional[list] = None,
+        suffix: str = ""
+    ) -> Tuple[str, list]:
+        """Append the organization and date range filters to a query"""
+        clauses = ["organization_id = ?"] + (clauses or [])
+        params = [organization_id] + (params or [])
+        if start_date:
+            clauses.append(f"{date_column} >= ?")
+            params.append(start_date.isoformat())
+        if end_date:
+            clauses.append(f"{date_column} < ?")
+            params.append(end_date.isoformat())
+        return f"{select} WHERE {' AND '.join(clauses)} {suffix}", params
+
+    @staticmethod
+    async def _get_threat_metrics(
+        organization_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict:
         """Calculate threat-related metrics"""
-        # Implement threat metrics calculation
-        return {}
+        if start_date is None and end_date is None:
+            # Read from the totals the triggers keep up to date on every write
+            return await db.run(metrics_engine.threat_metrics, organization_id)
+
+        # One pass; only the day x level x status buckets leave SQLite
+        buckets = await db.fetch_all(*AnalyticsService._filtered(
+            """
+            SELECT substr(created_at, 1, 10) AS day, threat_level, status,
+                   COUNT(*) AS threats,
+                   COUNT(resolution_time) AS resolved,
+                   SUM(resolution_time) AS resolution_total,
+                   SUM(resolution_time * resolution_time) AS resolution_squares
+            FROM threats
+            """,
+            organization_id, "created_at", start_date, end_date,
+            suffix="GROUP BY day, threat_level, status ORDER BY day"
+        ))
+
+        trend = {}
+        by_level = {level: 0 for level in ThreatLevel}
+        open_by_level = {level: 0 for level in ThreatLevel}
+        by_status = {status: 0 for status in ThreatStatus}
+        resolved = resolution_total = resolution_squares = 0
+        for row in buckets:
+            trend[row['day']] = trend.get(row['day'], 0) + row['threats']
+            level = ThreatLevel(row['threat_level']) if row['threat_level'] else None
+            status = ThreatStatus(row['status']) if row['status'] else ThreatStatus.ACTIVE
+            by_status[status] += row['threats']
+            if level is not None:
+                by_level[level] += row['threats']
+            if status == ThreatStatus.RESOLVED:
+                resolved += row['resolved']
+                resolution_total += row['resolution_total'] or 0
+                resolution_squares += row['resolution_squares'] or 0
+            elif level is not None:
+                open_by_level[level] += row['threats']
+
+        variance = sample_variance(resolved, resolution_total, resolution_squares)
+        return {
+            'total_threats': sum(by_status.values()),
+            'critical_threats': by_level[ThreatLevel.CRITICAL],
+            'high_threats': by_level[ThreatLevel.HIGH],
+            'medium_threats': by_level[ThreatLevel.MEDIUM],
+            'low_threats': by_level[ThreatLevel.LOW],
+            'active_threats': sum(by_status.values()) - by_status[ThreatStatus.RESOLVED],
+            'active_by_level': {level.label: count for level, count in open_by_level.items()},
+            'threats_by_status': {status.label: count for status, count in by_status.items()},
+            'average_resolution_time': resolution_total / resolved if resolved else None,
+            'resolution_time_stddev': variance ** 0.5 if variance is not None else None,
+            'threat_trend': trend
+        }
 
     @staticmethod
-    async def _get_risk_metrics(organization_id: str) -> Dict:
+    async def _get_threat_metrics_in_memory(
+        organization_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict:
+        """Calculate threat metrics by loading the rows into AnalyticsEngine"""
+        rows = await db.fetch_all(*AnalyticsService._filtered(
+            "SELECT threat_level, created_at, organization_id, threat_type, resolution_time FROM threats",
+            organization_id, "created_at", start_date, end_date,
+            suffix="ORDER BY created_at"
+        ))
+        store = ThreatStore(capacity=len(rows))
+        store.extend(dict(row) for row in rows)
+        return analytics.calculate_threat_metrics(store.view())
+
+    @staticmethod
+    async def _get_risk_metrics(
+        organization_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict:
         """Calculate risk-related metrics"""
-        # Implement risk metrics calculation
-        return {}
+        if not SQL_WINDOW_FUNCTIONS:
+            rows = await db.fetch_all(*AnalyticsService._filtered(
+                "SELECT assessment_date, overall_risk_score FROM risk_assessments",
+                organization_id, "assessment_date", start_date, end_date
+            ))
+            return analytics.calculate_risk_metrics([dict(row) for row in rows])
+
+        summary = await db.fetch_one(*AnalyticsService._filtered(
+            """
+            SELECT COUNT(*) AS assessments, AVG(overall_risk_score) AS average_score,
+                   MIN(overall_risk_score) AS min_score, MAX(overall_risk_score) AS max_score
+            FROM risk_assessments
+            """,
+            organization_id, "assessment_date", start_date, end_date
+        ))
+        latest = await db.fetch_one(*AnalyticsService._filtered(
+            """
+            SELECT overall_risk_score, assessment_date,
+                   overall_risk_score - LAG(overall_risk_score)
+                       OVER (ORDER BY assessment_date) AS score_change
+            FROM risk_assessments
+            """,
+            organization_id, "assessment_date", start_date, end_date,
+            suffix="ORDER BY assessment_date DESC LIMIT 1"
+        ))
+        trend = await db.fetch_all(*AnalyticsService._filtered(
+            """
+            SELECT substr(assessment_date, 1, 10) AS day, AVG(overall_risk_score) AS score
+            FROM risk_assessments
+            """,
+            organization_id, "assessment_date", start_date, end_date,
+            suffix="GROUP BY day ORDER BY day"
+        ))
+        return {
+            'assessments': summary['assessments'],
+            'latest_score': latest['overall_risk_score'] if latest else None,
+            'latest_assessment_date': latest['assessment_date'] if latest else None,
+            'score_change': latest['score_change'] if latest else None,
+            'average_score': summary['average_score'],
+            'min_score': summary['min_score'],
+            'max_score': summary['max_score'],
+            'score_trend': {row['day']: row['score'] for row in trend}
+        }
 
     @staticmethod
-    async def _get_compliance_metrics(organization_id: str) -> Dict:
+    async def _get_compliance_metrics(
+        organization_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict:
         """Calculate compliance-related metrics"""
-        # Implement compliance metrics calculation
-        return {}
+        if not SQL_WINDOW_FUNCTIONS:
+            rows = await db.fetch_all(*AnalyticsService._filtered(
+                """
+                SELECT id, framework, assessment_date, compliance_score,
+                       COALESCE(json_array_length(findings), 0) AS findings
+                FROM compliance_reports
+                """,
+                organization_id, "assessment_date", start_date, end_date
+            ))
+            return analytics.calculate_compliance_metrics([dict(row) for row in rows])
+
+        # Latest report per framework, picked inside SQLite
+        inner, params = AnalyticsService._filtered(
+            """
+            SELECT framework, assessment_date, compliance_score,
+                   COALESCE(json_array_length(findings), 0) AS findings,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY framework ORDER BY assessment_date DESC, id DESC
+                   ) AS position
+            FROM compliance_reports
+            """,
+            organization_id, "assessment_date", start_date, end_date
+        )
+        rows = await db.fetch_all(
+            f"""
+            SELECT framework, assessment_date, compliance_score, findings
+            FROM ({inner}) WHERE position = 1 ORDER BY framework
+            """,
+            params
+        )
+        scores = [row['compliance_score'] for row in rows if row['compliance_score'] is not None]
+        return {
+            'frameworks': {
+                row['framework']: {
+                    'score': row['compliance_score'],
+                    'assessment_date': row['assessment_date'],
+                    'findings': row['findings']
+                }
+                for row in rows
+            },
+            'average_score': sum(scores) / len(scores) if scores else None,
+            'open_findings': sum(row['findings'] for row in rows)
+        }
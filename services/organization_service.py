@@ -1,8 +1,11 @@
 from typing import List, Optional
+from datetime import datetime
 from models import Organization
+from database import async_db, model_fields, row_to_model, to_db_value
 from utils.logger import Logger
 
 logger = Logger()
+db = async_db
 
 class OrganizationService:
     @staticmethod
@@ -10,8 +13,7 @@ class OrganizationService:
         """Create new organization"""
         try:
             organization = Organization(**org_data)
-            # Store organization
-            # Implementation needed
+            await db.write(organization)
             return organization
         except Exception as e:
             logger.log_error(str(e), "ORGANIZATION_SERVICE")
@@ -21,8 +23,10 @@ class OrganizationService:
     async def get_organization(org_id: str) -> Optional[Organization]:
         """Retrieve organization details"""
         try:
-            # Implement organization retrieval logic
-            return None
+            row = await db.fetch_one(
+                "SELECT * FROM organizations WHERE id = ?", (org_id,)
+            )
+            return row_to_model(Organization, row) if row else None
         except Exception as e:
             logger.log_error(str(e), "ORGANIZATION_SERVICE")
             raise
@@ -31,8 +35,19 @@ class OrganizationService:
     async def update_organization(org_id: str, update_data: dict) -> bool:
         """Update organization details"""
         try:
-            # Implement update logic
-            return True
+            columns = model_fields(Organization)
+            updates = {
+                key: to_db_value(value) for key, value in update_data.items()
+                if key in columns and key not in ('id', 'created_at')
+            }
+            if not updates:
+                return False
+            updates['updated_at'] = datetime.utcnow().isoformat()
+            assignments = ", ".join(f"{key} = ?" for key in updates)
+            return await db.execute(
+                f"UPDATE organizations SET {assignments} WHERE id = ?",
+                (*updates.values(), org_id)
+            )
         except Exception as e:
             logger.log_error(str(e), "ORGANIZATION_SERVICE")
             raise
@@ -1,63 +1,198 @@
-from typing import Dict, List
-from models import RiskAssessment
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from config import ANALYTICS_CONFIG
+from models import RiskAssessment, ThreatLevel, ThreatStatus
+from database import async_db
 from utils.analytics import AnalyticsEngine
 from utils.logger import Logger
 
 logger = Logger()
 analytics = AnalyticsEngine()
+db = async_db
+
+# Weight of each open threat level in the threat landscape score
+THREAT_LEVEL_WEIGHTS = {
+    ThreatLevel.CRITICAL: 1.0,
+    ThreatLevel.HIGH: 0.6,
+    ThreatLevel.MEDIUM: 0.3,
+    ThreatLevel.LOW: 0.1,
+}
+
+def _init_worker(db_name: str):
+    """Point a batch worker process's shared database at the parent's file"""
+    db.database.db_name = db_name
+
+def _assess_shard(organization_ids: Sequence[str]) -> Tuple[List[RiskAssessment], List[str]]:
+    """Assess a shard of organizations inside a worker process
+
+    Returns the assessments and the ids that failed; one organization's
+    error never costs the rest of the shard.
+    """
+    async def assess_all():
+        results = await asyncio.gather(
+            *(RiskService._build_assessment(org) for org in organization_ids),
+            return_exceptions=True
+        )
+        assessments, failed = [], []
+        for organization_id, result in zip(organization_ids, results):
+            if isinstance(result, Exception):
+                logger.log_error(f"{organization_id}: {result}", "RISK_SERVICE")
+                failed.append(organization_id)
+            else:
+                assessments.append(result)
+        return assessments, failed
+
+    return asyncio.run(assess_all())
 
 class RiskService:
     @staticmethod
     async def perform_risk_assessment(organization_id: str) -> RiskAssessment:
         """Perform comprehensive risk assessment"""
         try:
-            # Collect assessment data
-            technical_score = await RiskService._assess_technical_controls(organization_id)
-            policy_score = await RiskService._assess_policy_compliance(organization_id)
-            threat_score = await RiskService._assess_threat_landscape(organization_id)
-            
-            # Calculate overall risk score
-            assessment_data = {
-                'technical_controls': technical_score,
-                'policy_compliance': policy_score,
-                'threat_landscape': threat_score
-            }
-            
-            overall_score = analytics.generate_risk_score(assessment_data)
-            
-            # Create assessment record
-            assessment = RiskAssessment(
-                organization_id=organization_id,
-                overall_risk_score=overall_score,
-                risk_factors=assessment_data,
-                recommendations=await RiskService._generate_recommendations(assessment_data)
-            )
+            assessment = await RiskService._build_assessment(organization_id)
             
             # Store assessment
-            # Implementation needed
+            await db.write(assessment)
             
             return assessment
         except Exception as e:
             logger.log_error(str(e), "RISK_SERVICE")
             raise
 
+    @staticmethod
+    async def assess_organizations(
+        organization_ids: Optional[Sequence[str]] = None,
+        workers: Optional[int] = None,
+        shard_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[RiskAssessment]:
+        """Assess many organizations across a pool of worker processes
+
+        Organizations (all of them by default) are split into shards; each
+        worker process opens its own connections and assesses a shard's
+        organizations concurrently. Every finished shard is bulk-written and
+        reported to ``progress`` as (organizations done, total). Organizations
+        whose assessment failed are logged and skipped.
+        """
+        try:
+            if organization_ids is None:
+                rows = await db.fetch_all("SELECT id FROM organizations ORDER BY id")
+                organization_ids = [row[0] for row in rows]
+            organization_ids = list(organization_ids)
+            total = len(organization_ids)
+            if not total:
+                return []
+            shard_size = shard_size or ANALYTICS_CONFIG["risk_batch_shard_size"]
+            shards = [
+                organization_ids[offset:offset + shard_size]
+                for offset in range(0, total, shard_size)
+            ]
+            workers = workers or ANALYTICS_CONFIG["risk_batch_workers"] or os.cpu_count() or 1
+
+            assessments, failed, done = [], [], 0
+            # Spawned workers never inherit the parent's pooled connections or threads
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(shards)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(db.database.db_name,)
+            ) as pool:
+                pending = [asyncio.wrap_future(pool.submit(_assess_shard, shard)) for shard in shards]
+                for finished in asyncio.as_completed(pending):
+                    shard_assessments, shard_failed = await finished
+                    if shard_assessments and not await db.bulk_insert(shard_assessments):
+                        raise RuntimeError("Risk assessment bulk write failed")
+                    assessments.extend(shard_assessments)
+                    failed.extend(shard_failed)
+                    done += len(shard_assessments) + len(shard_failed)
+                    if progress:
+                        progress(done, total)
+
+            logger.log_activity("system", "RISK_BATCH_ASSESSMENT", {
+                "organizations": total,
+                "assessed": len(assessments),
+                "failed": failed
+            })
+            return assessments
+        except Exception as e:
+            logger.log_error(str(e), "RISK_SERVICE")
+            raise
+
+    @staticmethod
+    async def _build_assessment(organization_id: str) -> RiskAssessment:
+        """Score an organization without storing the result"""
+        # Collect assessment data
+        technical_score, policy_score, threat_score = await asyncio.gather(
+            RiskService._assess_technical_controls(organization_id),
+            RiskService._assess_policy_compliance(organization_id),
+            RiskService._assess_threat_landscape(organization_id)
+        )
+        
+        # Calculate overall risk score
+        assessment_data = {
+            'technical_controls': technical_score,
+            'policy_compliance': policy_score,
+            'threat_landscape': threat_score
+        }
+        
+        overall_score = analytics.generate_risk_score(assessment_data)
+        
+        # Create assessment record
+        return RiskAssessment(
+            organization_id=organization_id,
+            assessment_date=datetime.utcnow(),
+            overall_risk_score=overall_score,
+            risk_factors=assessment_data,
+            recommendations=await RiskService._generate_recommendations(assessment_data)
+        )
+
     @staticmethod
     async def _assess_technical_controls(organization_id: str) -> float:
         """Assess technical security controls"""
-        # Implement technical assessment logic
-        return 0.0
+        # Share of inventoried assets with no open vulnerabilities
+        row = await db.fetch_one(
+            """
+            SELECT AVG(COALESCE(json_array_length(vulnerabilities), 0) = 0)
+            FROM assets WHERE organization_id = ?
+            """,
+            (organization_id,)
+        )
+        return float(row[0]) if row and row[0] is not None else 0.0
 
     @staticmethod
     async def _assess_policy_compliance(organization_id: str) -> float:
         """Assess policy compliance"""
-        # Implement compliance assessment logic
-        return 0.0
+        row = await db.fetch_one(
+            """
+            SELECT compliance_score FROM compliance_reports
+            WHERE organization_id = ?
+            ORDER BY assessment_date DESC LIMIT 1
+            """,
+            (organization_id,)
+        )
+        return float(row[0]) if row and row[0] is not None else 0.0
 
     @staticmethod
     async def _assess_threat_landscape(organization_id: str) -> float:
-        """Assess current threat landscape"""
-        # Implement threat assessment logic
-        return 0.0
+        """Assess current threat landscape
+
+        Like the other factors, higher is better: 1.0 means no open threats.
+        """
+        # IS NOT keeps threats with no status, which count as open
+        rows = await db.fetch_all(
+            """
+            SELECT threat_level, COUNT(*) FROM threats
+            WHERE organization_id = ? AND status IS NOT ?
+            GROUP BY threat_level
+            """,
+            (organization_id, ThreatStatus.RESOLVED.value)
+        )
+        exposure = sum(THREAT_LEVEL_WEIGHTS.get(level, 0.0) * count for level, count in rows)
+        return round(1.0 - min(exposure / 10, 1.0), 2)
 
     @staticmethod
     async def _generate_recommendations(assessment_data: Dict) -> List[str]:
@@ -0,0 +1,384 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+from models import ThreatIncident, ThreatLevel, ThreatStatus
+from database import ROLLUP_TABLE, async_db, row_to_model
+from utils.pagination import Pagination
+from utils.logger import Logger
+from utils.analytics import CLASSIFICATION_RISK, AnalyticsEngine
+from utils.anomaly import volume_detector
+from utils.notifications import NotificationManager
+from services.alert_service import AlertService
+from utils.sketches import sketch_engine
+
+logger = Logger()
+analytics = AnalyticsEngine()
+notifications = NotificationManager()
+db = async_db
+
+# Window of an organization's high and critical threats that raises new scores
+RISK_HISTORY_DAYS = 30
+
+class ThreatService:
+    @staticmethod
+    async def report_threat(threat_data: dict) -> ThreatIncident:
+        """Process and store new threat report"""
+        try:
+            # Create threat incident
+            threat = ThreatIncident(**threat_data)
+            
+            # Analyze threat severity
+            classifications, history = await ThreatService._risk_context([threat])
+            risk_score = analytics.calculate_threat_risk(
+                threat.threat_level, len(threat.affected_systems), classifications[0], history[0]
+            )
+            threat.risk_score = risk_score
+            
+            # Store in database, batched with concurrent reports
+            await db.write(threat)
+            sketch_engine.record_threat(
+                threat.organization_id, threat.created_at, threat.affected_systems,
+                threat.source_ip, threat.reported_by
+            )
+            await ThreatService._flush_sketches()
+            await ThreatService._detect_volume_anomalies([threat])
+            
+            # Send notifications based on severity
+            if risk_score > 7:
+                notifications.send_alert(
+                    user_id="system",
+                    alert_type="high_risk_threat",
+                    message=f"High risk threat detected: {threat.title}",
+                    priority="critical"
+                )
+            
+            return threat
+        except Exception as e:
+            logger.log_error(str(e), "THREAT_SERVICE")
+            raise
+
+    @staticmethod
+    async def report_threats(threat_batch: List[dict]) -> List[ThreatIncident]:
+        """Score and store a batch of threat reports in one transaction"""
+        try:
+            threats = [
+                ThreatIncident(
+                    title=data['title'],
+                    description=data['description'],
+                    organization_id=data['organization_id'],
+                    reported_by=data['reported_by'],
+                    source_ip=data.get('source_ip'),
+                    threat_type=data.get('threat_type'),
+                    affected_systems=data['affected_systems'],
+                    threat_level=ThreatLevel(data['severity']),
+                    status=ThreatStatus.ACTIVE
+                )
+                for data in threat_batch
+            ]
+            if not threats:
+                return []
+
+            # Score the whole batch in one vectorized pass
+            classifications, history = await ThreatService._risk_context(threats)
+            scores = analytics.calculate_threat_risk_batch(
+                [threat.threat_level.value for threat in threats],
+                [len(threat.affected_systems) for threat in threats],
+                classifications,
+                history
+            )
+            for threat, score in zip(threats, scores):
+                threat.risk_score = float(score)
+
+            if not await db.bulk_insert(threats):
+                raise RuntimeError("Failed to store threat batch")
+            for threat in threats:
+                sketch_engine.record_threat(
+                    threat.organization_id, threat.created_at, threat.affected_systems,
+                    threat.source_ip, threat.reported_by
+                )
+            await ThreatService._flush_sketches()
+            await ThreatService._detect_volume_anomalies(threats)
+
+            high_risk = [threat for threat in threats if threat.risk_score > 7]
+            if high_risk:
+                notifications.send_alert(
+                    user_id="system",
+                    alert_type="high_risk_threat",
+                    message=f"{len(high_risk)} high risk threats detected in batch",
+                    priority="critical"
+                )
+
+            return threats
+        except Exception as e:
+            logger.log_error(str(e), "THREAT_SERVICE")
+            raise
+
+    @staticmethod
+    async def _risk_context(
+        threats: List[ThreatIncident]
+    ) -> Tuple[List[Optional[str]], List[float]]:
+        """Look up the risk inputs that live outside the reports
+
+        Returns, per threat, the classification of its most sensitive
+        affected asset and its organization's high and critical threat count
+        over the last RISK_HISTORY_DAYS days, read from the daily rollups.
+        """
+        organizations = sorted({
+            threat.organization_id for threat in threats if threat.organization_id
+        })
+        if not organizations:
+            return [None] * len(threats), [0.0] * len(threats)
+        placeholders = ", ".join("?" * len(organizations))
+        since = (datetime.utcnow() - timedelta(days=RISK_HISTORY_DAYS)).date().isoformat()
+        assets, history = await asyncio.gather(
+            db.fetch_all(
+                f"""
+                SELECT organization_id, asset_name, security_classification FROM assets
+                WHERE organization_id IN ({placeholders}) AND security_classification IS NOT NULL
+                """,
+                organizations
+            ),
+            db.fetch_all(
+                f"""
+                SELECT organization_id, SUM(threats) AS threats FROM {ROLLUP_TABLE}
+                WHERE organization_id IN ({placeholders}) AND day >= ? AND threat_level >= ?
+                GROUP BY organization_id
+                """,
+                organizations + [since, ThreatLevel.HIGH.value]
+            )
+        )
+        asset_classes = {
+            (row['organization_id'], row['asset_name']): row['security_classification']
+            for row in assets
+        }
+        recent = {row['organization_id']: row['threats'] for row in history}
+
+        def most_sensitive(threat: ThreatIncident) -> Optional[str]:
+            labels = [
+                asset_classes[key] for key in
+                ((threat.organization_id, system) for system in threat.affected_systems)
+                if key in asset_classes
+            ]
+            return max(labels, key=lambda label: CLASSIFICATION_RISK.get(label.lower(), 0.0),
+                       default=None)
+
+        return (
+            [most_sensitive(threat) for threat in threats],
+            [float(recent.get(threat.organization_id, 0)) for threat in threats]
+        )
+
+    @staticmethod
+    async def _flush_sketches():
+        """Merge this process's sketch deltas once the flush interval has passed
+
+        Every process that writes threats flushes its own deltas here, so the
+        stored sketches do not depend on the API's periodic flusher.
+        """
+        if sketch_engine.flush_due():
+            await db.run(sketch_engine.flush)
+
+    @staticmethod
+    async def _detect_volume_anomalies(threats: List[ThreatIncident]):
+        """Feed stored threats to the volume detector and alert on spikes
+
+        Each hour is judged on its count in the database, not on what this
+        process reported, so workers sharing the traffic see the same spike.
+        The threats are already stored, so a failed alert is logged rather
+        than failing the report.
+        """
+        hours = {
+            (threat.organization_id, threat.threat_type,
+             threat.created_at.replace(minute=0, second=0, microsecond=0))
+            for threat in threats
+        }
+        for organization_id, threat_type, hour in sorted(hours, key=lambda key: key[2]):
+            row = await db.fetch_one(
+                """
+                SELECT COUNT(*) FROM threats
+                WHERE organization_id IS ? AND created_at >= ? AND created_at < ?
+                  AND COALESCE(threat_type, '') = ?
+                """,
+                (organization_id, hour.isoformat(), (hour + timedelta(hours=1)).isoformat(),
+                 threat_type or '')
+            )
+            if row is None:
+                continue
+            anomaly = volume_detector.observe(organization_id, threat_type, hour, total=row[0])
+            if anomaly is None:
+                continue
+            threat_type = anomaly.threat_type or "threat"
+            title = f"Unusual {threat_type} volume"
+            # Another worker may have raised this hour's alert already
+            raised = await db.fetch_one(
+                """
+                SELECT 1 FROM alerts
+                WHERE organization_id = ? AND created_at >= ? AND source = ? AND title = ?
+                """,
+                (anomaly.organization_id, anomaly.hour.isoformat(), "volume_anomaly", title)
+            )
+            if raised:
+                continue
+            try:
+                await AlertService.create_alert({
+                    "title": title,
+                    "description": (
+                        f"{anomaly.count} {threat_type} reports in the hour from "
+                        f"{anomaly.hour:%Y-%m-%d %H:00} UTC, against about "
+                        f"{anomaly.expected:.1f} expected for that hour of the week"
+                    ),
+                    "organization_id": anomaly.organization_id,
+                    "threat_level": ThreatLevel.HIGH,
+                    "source": "volume_anomaly",
+                    "requires_action": True
+                })
+            except Exception as e:
+                logger.log_error(str(e), "THREAT_SERVICE")
+
+    @staticmethod
+    async def get_threats(
+        organization_id: str,
+        severity: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[ThreatIncident]:
+        """Retrieve threats based on filters"""
+        try:
+            query, params = ThreatService._build_threats_query(
+                organization_id, severity, start_date, end_date
+            )
+            rows = await db.fetch_all(query, params)
+            return [row_to_model(ThreatIncident, row) for row in rows]
+        except Exception as e:
+            logger.log_error(str(e), "THREAT_SERVICE")
+            raise
+
+    @staticmethod
+    async def get_threats_page(
+        organization_id: str,
+        severity: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[ThreatIncident], Optional[str]]:
+        """Retrieve one page of threats, newest first, and the next cursor"""
+        try:
+            after = Pagination.decode_cursor(cursor) if cursor else None
+            query, params = ThreatService._build_threats_query(
+                organization_id, severity, start_date, end_date, after, limit + 1
+            )
+            rows = await db.fetch_all(query, params)
+            threats = [row_to_model(ThreatIncident, row) for row in rows[:limit]]
+            return threats, Pagination.next_cursor(rows, limit)
+        except Exception as e:
+            logger.log_error(str(e), "THREAT_SERVICE")
+            raise
+
+    @staticmethod
+    async def iter_threats(
+        organization_id: str,
+        severity: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[List[ThreatIncident]]:
+        """Yield every matching threat in chunks, newest first"""
+        cursor = None
+        while True:
+            threats, cursor = await ThreatService.get_threats_page(
+                organization_id, severity, start_date, end_date, cursor, chunk_size
+            )
+            if threats:
+                yield threats
+            if cursor is None:
+                return
+
+    @staticmethod
+    async def update_threat_status(threat_id: str, status: str) -> bool:
+        """Update threat status"""
+        try:
+            status = ThreatStatus(status)
+            while True:
+                current = await db.fetch_one(
+                    """
+                    SELECT organization_id, threat_level, status, created_at, resolution_time
+                    FROM threats WHERE id = ?
+                    """,
+                    (threat_id,)
+                )
+                if current is None:
+                    return False
+                if current['status'] == status:
+                    return True
+
+                now = datetime.utcnow()
+                resolution_time = current['resolution_time']
+                if status == ThreatStatus.RESOLVED:
+                    elapsed = now - datetime.fromisoformat(current['created_at'])
+                    resolution_time = int(elapsed.total_seconds() // 60)
+
+                # Only apply the change if nobody moved the threat since the read,
+                # so every resolution is recorded exactly once
+                rows = await db.execute_returning(
+                    """
+                    UPDATE threats
+                    SET status = ?1, updated_at = ?2,
+                        resolved_at = CASE WHEN ?1 = ?5 THEN ?2 ELSE resolved_at END,
+                        resolution_time = ?3
+                    WHERE id = ?4 AND status IS ?6
+                    RETURNING id
+                    """,
+                    (status.value, now.isoformat(), resolution_time, threat_id,
+                     ThreatStatus.RESOLVED.value, current['status'])
+                )
+                if rows is None:
+                    return False
+                if rows:
+                    break
+
+            if status == ThreatStatus.RESOLVED:
+                sketch_engine.record_resolution(
+                    current['organization_id'], current['created_at'], resolution_time
+                )
+                await ThreatService._flush_sketches()
+            return True
+        except Exception as e:
+            logger.log_error(str(e), "THREAT_SERVICE")
+            raise
+
+    @staticmethod
+    def _build_threats_query(
+        organization_id: str,
+        severity: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[str, list]:
+        """Build the filtered threat query served by the threats indexes
+
+        ``after`` is the (created_at, id) key of the last row already seen;
+        seeking past it keeps every page an index range scan.
+        """
+        clauses = ["organization_id = ?"]
+        params = [organization_id]
+        if severity:
+            clauses.append("threat_level = ?")
+            params.append(ThreatLevel(severity).value)
+        if start_date:
+            clauses.append("created_at >= ?")
+            params.append(start_date.isoformat())
+        if end_date:
+            clauses.append("created_at <= ?")
+            params.append(end_date.isoformat())
+        if after:
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+        query = (
+            f"SELECT * FROM threats WHERE {' AND '.join(clauses)} "
+            "ORDER BY created_at DESC, id DESC"
+        )
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, params
@@ -1,6 +1,11 @@
+import asyncio
+import sys
 from datetime import datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
+from database import Database, db
 from utils.logger import Logger
 from services.analytics_service import AnalyticsService
+from utils.sketches import sketch_engine
 
 logger = Logger()
 
@@ -42,3 +47,57 @@ class MaintenanceTasks:
         except Exception as e:
             logger.log_error(str(e), "SYSTEM_BACKUP")
             raise
+
+    @staticmethod
+    async def rebuild_rollups(database: Database = None) -> bool:
+        """Recompute the daily threat rollups from the threats table"""
+        try:
+            database = database or db
+            rebuilt = await run_in_threadpool(database.rebuild_rollups)
+            if not rebuilt:
+                raise RuntimeError("Rollup rebuild failed")
+            logger.log_activity("system", "ROLLUP_REBUILD", {"status": "success"})
+            return True
+        except Exception as e:
+            logger.log_error(str(e), "ROLLUP_REBUILD")
+            raise
+
+    @staticmethod
+    async def rebuild_totals(database: Database = None) -> bool:
+        """Recompute the dashboard totals from the threats and alerts tables"""
+        try:
+            database = database or db
+            rebuilt = await run_in_threadpool(database.rebuild_totals)
+            if not rebuilt:
+                raise RuntimeError("Totals rebuild failed")
+            logger.log_activity("system", "TOTALS_REBUILD", {"status": "success"})
+            return True
+        except Exception as e:
+            logger.log_error(str(e), "TOTALS_REBUILD")
+            raise
+
+    @staticmethod
+    async def rebuild_sketches(database: Database = None) -> bool:
+        """Recompute the daily threat sketches from the threats table"""
+        try:
+            database = database or db
+            rebuilt = await run_in_threadpool(sketch_engine.rebuild, database)
+            if not rebuilt:
+                raise RuntimeError("Sketch rebuild failed")
+            logger.log_activity("system", "SKETCH_REBUILD", {"status": "success"})
+            return True
+        except Exception as e:
+            logger.log_error(str(e), "SKETCH_REBUILD")
+            raise
+
+COMMANDS = {
+    "rebuild-rollups": MaintenanceTasks.rebuild_rollups,
+    "rebuild-sketches": MaintenanceTasks.rebuild_sketches,
+    "rebuild-totals": MaintenanceTasks.rebuild_totals,
+}
+
+if __name__ == "__main__":
+    # python -m tasks.maintenance_tasks rebuild-rollups
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(f"usage: python -m tasks.maintenance_tasks {{{'|'.join(COMMANDS)}}}")
+    asyncio.run(COMMANDS[sys.argv[1]]())
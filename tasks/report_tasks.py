@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from utils.logger import Logger
 from services.analytics_service import AnalyticsService
 from utils.notifications import NotificationManager
@@ -33,6 +33,22 @@ class ReportTasks:
             logger.log_error(str(e), "REPORT_GENERATION")
             raise
 
+    @staticmethod
+    async def generate_weekly_threat_metrics(end_date: datetime = None) -> dict:
+        """Compute the past week's threat metrics for every organization at once"""
+        try:
+            end_date = end_date or datetime.utcnow()
+            metrics = await analytics.get_threat_metrics_by_organization(
+                end_date - timedelta(days=7), end_date
+            )
+            logger.log_activity("system", "WEEKLY_THREAT_METRICS", {
+                "organizations": len(metrics)
+            })
+            return metrics
+        except Exception as e:
+            logger.log_error(str(e), "REPORT_GENERATION")
+            raise
+
     @staticmethod
     async def _format_report(metrics: dict):
         """Format report content"""
@@ -1,11 +1,33 @@
+import asyncio
+import functools
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
+from database import db
 from utils.logger import Logger
+from utils.sketches import sketch_engine
+from tasks.report_tasks import ReportTasks
+from tasks.security_tasks import SecurityTasks
 
 logger = Logger()
 scheduler = BackgroundScheduler()
 
+def run_async(job):
+    """Wrap a coroutine function so a scheduler worker thread runs it to completion
+
+    BackgroundScheduler calls jobs synchronously; handing it a coroutine
+    function would create the coroutine and never await it. Sketch deltas
+    the job recorded are flushed when it ends, as this process has no
+    periodic flusher.
+    """
+    @functools.wraps(job)
+    def run():
+        try:
+            return asyncio.run(job())
+        finally:
+            sketch_engine.flush(db)
+    return run
+
 class TaskScheduler:
     @staticmethod
     def initialize():
@@ -13,19 +35,24 @@ class TaskScheduler:
         try:
             # Daily tasks
             scheduler.add_job(
-                TaskScheduler.daily_security_scan,
+                run_async(TaskScheduler.daily_security_scan),
                 trigger=CronTrigger(hour=0, minute=0)
             )
             
+            scheduler.add_job(
+                run_async(TaskScheduler.nightly_risk_reassessment),
+                trigger=CronTrigger(hour=2, minute=0)
+            )
+            
             # Hourly tasks
             scheduler.add_job(
-                TaskScheduler.update_threat_intelligence,
+                run_async(TaskScheduler.update_threat_intelligence),
                 trigger=CronTrigger(minute=0)
             )
             
             # Weekly tasks
             scheduler.add_job(
-                TaskScheduler.generate_weekly_reports,
+                run_async(TaskScheduler.generate_weekly_reports),
                 trigger=CronTrigger(day_of_week='mon', hour=1, minute=0)
             )
             
@@ -45,6 +72,14 @@ class TaskScheduler:
         except Exception as e:
             logger.log_error(str(e), "DAILY_SCAN")
 
+    @staticmethod
+    async def nightly_risk_reassessment():
+        """Reassess every organization's risk"""
+        try:
+            await SecurityTasks.reassess_all_organizations()
+        except Exception as e:
+            logger.log_error(str(e), "RISK_REASSESSMENT")
+
     @staticmethod
     async def update_threat_intelligence():
         """Update threat intelligence data"""
@@ -58,7 +93,7 @@ class TaskScheduler:
     async def generate_weekly_reports():
         """Generate weekly reports"""
         try:
-            # Implement report generation logic
-            pass
+            # Metrics for every organization come from one grouped pass
+            await ReportTasks.generate_weekly_threat_metrics()
         except Exception as e:
             logger.log_error(str(e), "REPORT_GENERATION")
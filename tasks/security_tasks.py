@@ -45,6 +45,21 @@ class SecurityTasks:
             logger.log_error(str(e), "SECURITY_SCAN")
             raise
 
+    @staticmethod
+    async def reassess_all_organizations():
+        """Re-run the risk assessment for every organization in parallel"""
+        try:
+            def report(done: int, total: int):
+                logger.log_activity("system", "RISK_REASSESSMENT_PROGRESS", {
+                    "completed": done,
+                    "total": total
+                })
+
+            return await RiskService.assess_organizations(progress=report)
+        except Exception as e:
+            logger.log_error(str(e), "RISK_REASSESSMENT")
+            raise
+
     @staticmethod
     async def _scan_network(organization_id: str):
         """Scan network security"""
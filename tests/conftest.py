@@ -1,5 +1,6 @@
 import pytest
 from datetime import datetime
+from database import async_db, db
 
 @pytest.fixture
 def test_organization():
@@ -34,3 +35,12 @@ def test_threat():
         "organization_id": "test_org_123",
         "created_at": datetime.utcnow()
     }
+
+@pytest.fixture
+def shared_database(tmp_path, monkeypatch):
+    """Fixture that points the process-wide database at a fresh file"""
+    async_db.close()
+    monkeypatch.setattr(db, "db_name", str(tmp_path / "shared.db"))
+    assert db.connect()
+    yield db
+    async_db.close()
@@ -0,0 +1,298 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+import services.analytics_service as analytics_service
+import services.threat_service as threat_service
+from models import (
+    AssetInventory, ComplianceReport, RiskAssessment, ThreatIncident, ThreatLevel, ThreatStatus
+)
+from services.analytics_service import AnalyticsService
+from services.threat_service import ThreatService
+from utils.analytics import AnalyticsEngine
+from utils.cache import AsyncTTLCache
+from utils.sketches import sketch_engine
+
+START = datetime(2024, 4, 1)
+END = START + timedelta(days=10)
+
+@pytest.fixture
+def analytics_db(shared_database, monkeypatch):
+    """Fixture with threats, risk assessments and compliance reports for one org"""
+    database = shared_database
+    levels = list(ThreatLevel)
+    records = [
+        ThreatIncident(
+            organization_id="org-1",
+            threat_level=levels[i % 4],
+            status=ThreatStatus.RESOLVED if i % 3 == 0 else ThreatStatus.ACTIVE,
+            resolution_time=15 * (i + 1) if i % 3 == 0 else None,
+            created_at=START + timedelta(hours=7 * i)
+        )
+        for i in range(40)
+    ]
+    records.append(ThreatIncident(organization_id="org-2", threat_level=ThreatLevel.LOW, created_at=START))
+    records += [
+        RiskAssessment(
+            organization_id="org-1",
+            assessment_date=START + timedelta(days=day),
+            overall_risk_score=0.4 + day / 100
+        )
+        for day in (1, 3, 3, 8)
+    ]
+    records += [
+        ComplianceReport(
+            organization_id="org-1",
+            framework=framework,
+            assessment_date=START + timedelta(days=day),
+            compliance_score=score,
+            findings=["finding"] * day
+        )
+        for framework, day, score in (("ISO27001", 2, 0.7), ("ISO27001", 6, 0.8), ("NIST", 4, 0.65))
+    ]
+    assert database.bulk_insert(records)
+    assert sketch_engine.rebuild(database)
+    monkeypatch.setattr(analytics_service, "dashboard_cache", AsyncTTLCache(16, ttl=60, stale_ttl=60))
+
+class TestSQLAggregation:
+    @pytest.mark.asyncio
+    async def test_threat_metrics_match_engine(self, analytics_db):
+        """Test that SQL buckets agree with aggregating the rows in memory"""
+        sql = await AnalyticsService._get_threat_metrics("org-1", START, END)
+        memory = await AnalyticsService._get_threat_metrics_in_memory("org-1", START, END)
+        for key in ('total_threats', 'critical_threats', 'high_threats',
+                    'medium_threats', 'low_threats', 'threat_trend'):
+            assert sql[key] == memory[key]
+        assert sql['average_resolution_time'] == pytest.approx(memory['average_resolution_time'])
+        assert sql['active_threats'] == 23
+        assert sql['threats_by_status']['resolved'] == 12
+
+    @pytest.mark.asyncio
+    async def test_fallback_matches_window_functions(self, analytics_db, monkeypatch):
+        """Test that the pandas fallback computes the same risk and compliance metrics"""
+        sql_risk = await AnalyticsService._get_risk_metrics("org-1", START, END)
+        sql_compliance = await AnalyticsService._get_compliance_metrics("org-1", START, END)
+        monkeypatch.setattr(analytics_service, "SQL_WINDOW_FUNCTIONS", False)
+        fallback_risk = await AnalyticsService._get_risk_metrics("org-1", START, END)
+        assert fallback_risk.pop('score_trend') == pytest.approx(sql_risk.pop('score_trend'))
+        assert fallback_risk == pytest.approx(sql_risk)
+        assert await AnalyticsService._get_compliance_metrics("org-1", START, END) == sql_compliance
+
+        assert sql_risk['assessments'] == 4
+        assert sql_risk['latest_assessment_date'] == '2024-04-09T00:00:00'
+        assert sql_risk['score_change'] == pytest.approx(0.05)
+        assert sql_compliance['frameworks']['ISO27001']['score'] == 0.8
+        assert sql_compliance['open_findings'] == 10
+
+    @pytest.mark.asyncio
+    async def test_report_includes_percentiles(self, analytics_db):
+        """Test that reports add percentiles and distinct counts from the sketches"""
+        report = await AnalyticsService.generate_report("org-1", "weekly", START, END)
+        assert report['threat_metrics']['resolution_count'] == 12
+        assert report['threat_metrics']['resolution_time_p50'] == pytest.approx(262.5, abs=15)
+        assert report['threat_metrics']['distinct_affected_systems'] == 0
+        assert report['risk_metrics']['latest_score'] == pytest.approx(0.48)
+
+class Counter:
+    """Async load that counts its calls and returns the call number"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.calls
+
+class TestAsyncTTLCache:
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self):
+        """Test that concurrent callers for one key trigger a single load"""
+        cache, load = AsyncTTLCache(16, ttl=60), Counter(delay=0.05)
+        results = await asyncio.gather(*(cache.get_or_load("org-1", load) for _ in range(50)))
+        assert results == [1] * 50
+        assert load.calls == 1
+        assert await cache.get_or_load("org-1", load) == 1
+
+    def test_single_flight_across_event_loops(self):
+        """Test that callers on separate threads and loops share a load"""
+        cache, load = AsyncTTLCache(16, ttl=60), Counter(delay=0.1)
+        barrier, results = threading.Barrier(8), []
+
+        def worker():
+            barrier.wait()
+            results.append(asyncio.run(cache.get_or_load("org-1", load)))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [1] * 8
+        assert load.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_value_served_while_refreshing(self):
+        """Test that a stale entry is returned at once and refreshed in the background"""
+        cache, load = AsyncTTLCache(16, ttl=0.05, stale_ttl=60), Counter()
+        assert await cache.get_or_load("org-1", load) == 1
+        await asyncio.sleep(0.06)
+        assert await cache.get_or_load("org-1", load) == 1
+        await asyncio.sleep(0.01)
+        assert await cache.get_or_load("org-1", load) == 2
+        assert cache.stats()['stale_hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_are_shared_but_not_cached(self):
+        """Test that a failed load reaches every waiter and is retried next time"""
+        cache, calls = AsyncTTLCache(16, ttl=60), []
+
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(cache.get_or_load("org-1", failing) for _ in range(5)), return_exceptions=True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(calls) == 1
+        assert await cache.get_or_load("org-1", Counter()) == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_the_load(self):
+        """Test that cancelling the first caller leaves the others their value"""
+        cache, load = AsyncTTLCache(16, ttl=60), Counter(delay=0.05)
+        leader = asyncio.ensure_future(cache.get_or_load("org-1", load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_load("org-1", load))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == 1
+        assert leader.cancelled()
+        assert cache.stats()['inflight'] == 0
+
+    def test_refresh_outlives_short_lived_loops(self):
+        """Test that a refresh started from asyncio.run completes after that loop closes"""
+        cache, load = AsyncTTLCache(16, ttl=0.01, stale_ttl=60), Counter(delay=0.05)
+        assert asyncio.run(cache.get_or_load("org-1", load)) == 1
+        time.sleep(0.02)
+        assert asyncio.run(cache.get_or_load("org-1", load)) == 1
+        time.sleep(0.1)
+        assert cache.stats()['inflight'] == 0
+        assert asyncio.run(asyncio.wait_for(cache.get_or_load("org-1", load), 1)) == 2
+
+class TestDashboardMetrics:
+    @pytest.mark.asyncio
+    async def test_dashboard_computed_once(self, analytics_db, monkeypatch):
+        """Test that a burst of dashboard requests runs the queries once"""
+        compute = AnalyticsService._compute_dashboard_metrics
+        calls = []
+
+        async def counted(*args):
+            calls.append(args)
+            return await compute(*args)
+
+        monkeypatch.setattr(AnalyticsService, "_compute_dashboard_metrics", staticmethod(counted))
+        results = await asyncio.gather(*(
+            AnalyticsService.generate_dashboard_metrics("org-1", START, END) for _ in range(50)
+        ))
+        assert len(calls) == 1
+        assert all(result == results[0] for result in results)
+        assert results[0]['threat_metrics']['total_threats'] == 35
+        assert set(results[0]) == {
+            'threat_metrics', 'risk_metrics', 'compliance_metrics', 'alert_metrics'
+        }
+
+    @pytest.mark.asyncio
+    async def test_timed_out_section_is_empty_and_uncached(self, analytics_db, monkeypatch):
+        """Test that a slow query leaves its section None without blocking the rest"""
+        async def slow(*args):
+            await asyncio.sleep(5)
+
+        monkeypatch.setitem(analytics_service.ANALYTICS_CONFIG, "metric_timeout", 0.05)
+        monkeypatch.setattr(AnalyticsService, "_get_risk_metrics", staticmethod(slow))
+        result = await AnalyticsService.generate_dashboard_metrics("org-1", START, END)
+        assert result['risk_metrics'] is None
+        assert result['compliance_metrics']['open_findings'] == 10
+        assert len(analytics_service.dashboard_cache) == 0
+
+    @pytest.mark.asyncio
+    async def test_timed_out_query_stops_running(self, analytics_db, monkeypatch):
+        """Test that a section's SQLite statement is interrupted at its deadline"""
+        finished = threading.Event()
+
+        def endless(database):
+            try:
+                return database.fetch_one(
+                    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                    "SELECT COUNT(*) FROM n"
+                )
+            finally:
+                finished.set()
+
+        async def slow(*args):
+            return await analytics_service.db.run(endless)
+
+        monkeypatch.setitem(analytics_service.ANALYTICS_CONFIG, "metric_timeout", 0.05)
+        monkeypatch.setattr(AnalyticsService, "_get_risk_metrics", staticmethod(slow))
+        result = await AnalyticsService.generate_dashboard_metrics("org-1", START, END)
+        assert result['risk_metrics'] is None
+        assert finished.wait(timeout=2)
+
+class TestThreatRiskScoring:
+    def test_batch_matches_single_threat_scores(self):
+        """Test that the scalar wrapper, labels and codes all score alike"""
+        levels = [ThreatLevel.CRITICAL, ThreatLevel.LOW, ThreatLevel.HIGH, ThreatLevel.MEDIUM]
+        counts = [1, 0, 12, 3]
+        classifications = ["Top Secret", None, "internal", "unknown"]
+        history = [60, 0, 3, 0]
+        scores = AnalyticsEngine.calculate_threat_risk_batch(
+            np.array([level.value for level in levels]), counts, classifications, history
+        )
+        assert list(scores) == list(AnalyticsEngine.calculate_threat_risk_batch(
+            [level.label for level in levels], counts, classifications, history
+        ))
+        assert list(scores) == [
+            AnalyticsEngine.calculate_threat_risk(*threat)
+            for threat in zip(levels, counts, classifications, history)
+        ]
+        assert scores[0] == 10.0
+        assert scores[1] == 2.0
+        assert scores[2] == pytest.approx(6.0 + 2.0 + 0.5 + np.log1p(3) / 4, abs=0.01)
+
+    def test_context_is_optional(self):
+        """Test that level and spread alone score as before"""
+        scores = AnalyticsEngine.calculate_threat_risk_batch(["critical", "medium"], [1, 3])
+        assert list(scores) == [round(8 + np.log1p(1), 2), round(4 + np.log1p(3), 2)]
+
+    @pytest.mark.asyncio
+    async def test_report_threat_uses_assets_and_history(self, shared_database, monkeypatch):
+        """Test that single reports are scored with asset classification and org history"""
+        database = shared_database
+        now = datetime.utcnow()
+        assert database.bulk_insert([
+            AssetInventory(organization_id="org-1", asset_name="cables-db",
+                           security_classification="Secret"),
+            AssetInventory(organization_id="org-1", asset_name="intranet",
+                           security_classification="Internal"),
+        ] + [
+            ThreatIncident(organization_id="org-1", threat_level=ThreatLevel.CRITICAL,
+                           created_at=now - timedelta(days=day))
+            for day in range(1, 8)
+        ])
+        sent = []
+        monkeypatch.setattr(threat_service.notifications, "send_alert",
+                            lambda **kwargs: sent.append(kwargs))
+
+        threat = await ThreatService.report_threat({
+            "title": "Exfiltration attempt",
+            "organization_id": "org-1",
+            "threat_level": ThreatLevel.HIGH,
+            "affected_systems": ["cables-db", "intranet"],
+        })
+        assert threat.risk_score == pytest.approx(6.0 + np.log1p(2) + 1.5 + np.log1p(7) / 4, abs=0.01)
+        assert sent and sent[0]["priority"] == "critical" and sent[0]["user_id"] == "system"
@@ -0,0 +1,137 @@
+import pytest
+from datetime import datetime, timedelta
+import services.threat_service as threat_service
+from database import Database
+from models import ThreatIncident
+from services.threat_service import ThreatService
+from utils.anomaly import HOURS_PER_WEEK, VolumeAnomalyDetector
+
+# A Monday, so the first hours of each week are overnight
+START = datetime(2024, 1, 1)
+
+def hourly_volume(hour: datetime) -> int:
+    """Ten reports an hour during office hours, two overnight"""
+    return 10 if 9 <= hour.hour < 17 else 2
+
+def train(detector: VolumeAnomalyDetector, weeks: int = 3) -> datetime:
+    """Feed weeks of seasonal volume and return the first hour after them"""
+    for offset in range(weeks * HOURS_PER_WEEK):
+        hour = START + timedelta(hours=offset)
+        assert detector.observe("org-1", "Phishing", hour, hourly_volume(hour)) is None
+    return START + timedelta(weeks=weeks)
+
+class TestVolumeAnomalyDetector:
+    def test_spike_alerts_once_per_hour(self):
+        """Test that a spike is reported once and ordinary volume is not"""
+        detector = VolumeAnomalyDetector()
+        monday = train(detector)
+        office_hour = monday + timedelta(hours=10)
+        assert detector.observe("org-1", "Phishing", office_hour, 12) is None
+
+        anomaly = detector.observe("org-1", "Phishing", office_hour + timedelta(minutes=30), 40)
+        assert anomaly is not None
+        assert anomaly.count == 52
+        assert anomaly.hour == office_hour
+        assert anomaly.expected == pytest.approx(10, rel=0.05)
+        assert detector.observe("org-1", "Phishing", office_hour + timedelta(minutes=40)) is None
+
+    def test_baseline_is_seasonal(self):
+        """Test that the same count is normal by day and anomalous at night"""
+        detector = VolumeAnomalyDetector()
+        monday = train(detector)
+        assert detector.observe("org-1", "Phishing", monday + timedelta(hours=11), 14) is None
+        night = detector.observe("org-1", "Phishing", monday + timedelta(hours=26), 14)
+        assert night is not None and night.expected == pytest.approx(2, rel=0.05)
+
+    def test_new_series_warms_up(self):
+        """Test that series without enough history never alert"""
+        detector = VolumeAnomalyDetector(warmup_weeks=2)
+        train(detector, weeks=1)
+        assert detector.observe("org-1", "Phishing", START + timedelta(weeks=1, hours=3), 500) is None
+        assert detector.observe("org-2", "Malware", START, 500) is None
+
+    def test_series_growth_and_silence(self):
+        """Test that capacity grows with series and silent weeks decay the baseline"""
+        detector = VolumeAnomalyDetector(capacity=2)
+        for index in range(5):
+            detector.observe(f"org-{index}", "DDoS", START, 3)
+        train(detector)
+        detector.observe("org-1", "Phishing", START + timedelta(weeks=30))
+        mean, _ = detector.baseline("org-1", "Phishing", START + timedelta(hours=10))
+        assert mean < 0.01
+        assert detector.baseline("org-4", "DDoS", START) is not None
+
+    def test_rebuild_from_hourly_counts(self, tmp_path):
+        """Test that startup seeding replays the stored hourly volumes"""
+        database = Database(str(tmp_path / "anomaly.db"))
+        assert database.connect()
+        assert database.bulk_insert([
+            ThreatIncident(
+                organization_id="org-1",
+                threat_type="Phishing",
+                created_at=START + timedelta(weeks=week, hours=10, minutes=minute)
+            )
+            for week in range(3) for minute in range(0, 60, 6)
+        ])
+        detector = VolumeAnomalyDetector()
+        assert detector.rebuild(database, weeks=4, now=START + timedelta(weeks=3))
+        mean, _ = detector.baseline("org-1", "Phishing", START + timedelta(hours=10))
+        assert mean == pytest.approx(10)
+        database.disconnect()
+
+class TestServiceIntegration:
+    @pytest.mark.asyncio
+    async def test_batch_spike_raises_alert(self, shared_database, monkeypatch):
+        """Test that a burst of reports stores one volume alert"""
+        database = shared_database
+        detector = VolumeAnomalyDetector()
+        monkeypatch.setattr(threat_service, "volume_detector", detector)
+
+        now = datetime.utcnow()
+        for weeks in (3, 2, 1):
+            detector.observe("org-1", "Phishing", now - timedelta(weeks=weeks))
+        await ThreatService.report_threats([
+            {
+                "title": f"Phish {i}",
+                "description": "Credential harvesting",
+                "organization_id": "org-1",
+                "reported_by": "mail-gateway",
+                "threat_type": "Phishing",
+                "affected_systems": ["mail"],
+                "severity": "medium",
+            }
+            for i in range(12)
+        ])
+        alerts = database.fetch_all("SELECT title, source FROM alerts")
+        assert [tuple(alert) for alert in alerts] == [("Unusual Phishing volume", "volume_anomaly")]
+
+    @pytest.mark.asyncio
+    async def test_split_ingestion_seen_as_one_hour(self, shared_database, monkeypatch):
+        """Test that two workers each reporting half a spike raise exactly one alert"""
+        workers = [VolumeAnomalyDetector(), VolumeAnomalyDetector()]
+        now = datetime.utcnow()
+        for detector in workers:
+            for weeks in (3, 2, 1):
+                detector.observe("org-1", "Phishing", now - timedelta(weeks=weeks), count=3)
+
+        def report(count):
+            return ThreatService.report_threats([
+                {
+                    "title": f"Phish {i}",
+                    "description": "Credential harvesting",
+                    "organization_id": "org-1",
+                    "reported_by": "mail-gateway",
+                    "threat_type": "Phishing",
+                    "affected_systems": ["mail"],
+                    "severity": "medium",
+                }
+                for i in range(count)
+            ])
+
+        # Six reports an hour is within either worker's baseline on its own
+        for detector, count in zip(workers + workers[:1], (6, 6, 1)):
+            monkeypatch.setattr(threat_service, "volume_detector", detector)
+            await report(count)
+        alerts = shared_database.fetch_all("SELECT title, description FROM alerts")
+        assert [alert["title"] for alert in alerts] == ["Unusual Phishing volume"]
+        assert alerts[0]["description"].startswith("12 Phishing reports")
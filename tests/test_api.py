@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from api.routes import api
+from api.routes import api, verify_api_key
 from datetime import datetime
 
 client = TestClient(api)
@@ -52,3 +52,33 @@ class TestAPIEndpoints:
             headers={"X-API-Key": "invalid_key"}
         )
         assert response.status_code == 403
+
+class TestExportValidation:
+    @pytest.fixture(autouse=True)
+    def authorized(self):
+        """Accept any API key so only the filters are under test"""
+        api.dependency_overrides[verify_api_key] = lambda: "test_api_key"
+        yield
+        api.dependency_overrides.pop(verify_api_key)
+
+    @pytest.mark.parametrize("export_format", ["json", "csv", "ndjson"])
+    def test_unknown_severity_rejected(self, export_format):
+        """Test that a bad severity is a 400 before any export starts streaming"""
+        response = client.get(
+            "/api/v1/threats",
+            params={"organization_id": "org-1", "severity": "severe", "format": export_format},
+            headers={"X-API-Key": "test_api_key"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid severity: severe"
+
+    @pytest.mark.parametrize("export_format", ["json", "csv", "ndjson"])
+    def test_unknown_alert_status_rejected(self, export_format):
+        """Test that a bad alert status is a 400 before any export starts streaming"""
+        response = client.get(
+            "/api/v1/alerts",
+            params={"organization_id": "org-1", "status": "pending", "format": export_format},
+            headers={"X-API-Key": "test_api_key"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid status: pending"
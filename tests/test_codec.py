@@ -0,0 +1,60 @@
+import pytest
+from datetime import datetime
+import utils.codec as codec
+from models import ThreatIncident, ThreatLevel, ThreatStatus
+from utils.codec import Codec
+
+@pytest.fixture(params=["fast", "stdlib"])
+def backend(request, monkeypatch):
+    """Fixture that runs each test with and without the optional encoders"""
+    if request.param == "stdlib":
+        monkeypatch.setattr(codec, "orjson", None)
+        monkeypatch.setattr(codec, "msgpack", None)
+    return request.param
+
+def make_threat() -> ThreatIncident:
+    return ThreatIncident(
+        title="Phishing campaign",
+        organization_id="org-1",
+        threat_level=ThreatLevel.HIGH,
+        status=ThreatStatus.ACTIVE,
+        affected_systems=["mail", "vpn"],
+        impact_assessment={"users": 12},
+        risk_score=6.5
+    )
+
+class TestCodec:
+    def test_enum_and_datetime_encoding(self, backend):
+        """Test that enums encode as values and datetimes as ISO 8601"""
+        value = {"level": ThreatLevel.CRITICAL, "at": datetime(2024, 5, 1, 12, 30, 15, 250)}
+        assert Codec.loads(Codec.dumps(value)) == {
+            "level": 4,
+            "at": "2024-05-01T12:30:15.000250"
+        }
+
+    def test_model_roundtrip(self, backend):
+        """Test that a model survives encoding with its enums and timestamps intact"""
+        threat = make_threat()
+        decoded = Codec.decode_models(ThreatIncident, Codec.encode_many([threat]))
+        assert decoded == [threat]
+        assert Codec.loads(Codec.dumps(threat))["threat_level"] == "high"
+
+    def test_ndjson_batch(self, backend):
+        """Test that NDJSON batches produce one decodable line per record"""
+        threats = [make_threat() for _ in range(3)]
+        body = Codec.encode_ndjson(threats)
+        assert body.count(b"\n") == 3
+        assert [item["id"] for item in Codec.decode_ndjson(body)] == [t.id for t in threats]
+        assert Codec.encode_ndjson([]) == b""
+
+    def test_binary_roundtrip(self, backend):
+        """Test that the binary format decodes to the same payload as JSON"""
+        payload = {"threats": [make_threat()], "count": 1}
+        assert Codec.unpack(Codec.pack(payload)) == Codec.loads(Codec.dumps(payload))
+
+    def test_backends_agree(self, monkeypatch):
+        """Test that the optional encoder and the fallback produce the same JSON"""
+        payload = {"threat": make_threat(), "tags": ("a", "b"), "name": "Ünïcode"}
+        fast = Codec.dumps(payload)
+        monkeypatch.setattr(codec, "orjson", None)
+        assert Codec.dumps(payload) == fast
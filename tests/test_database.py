@@ -0,0 +1,280 @@
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import sqlite3
+import time
+from config import DB_CONFIG
+from database import (ACCOUNTS_TABLE, Database, GroupCommitWriter, MODELS, ROLLUP_TABLE,
+                      async_db, query_deadline, rollup_query)
+from models import ThreatIncident, SecurityAlert, ThreatLevel, ThreatStatus
+from services.threat_service import ThreatService
+from services.alert_service import AlertService
+
+@pytest.fixture
+def database(shared_database):
+    """Fixture for the shared database on a fresh file with the full schema"""
+    return shared_database
+
+@pytest.fixture
+def async_database(shared_database):
+    """Fixture for the async handle every service shares, on a fresh file"""
+    return async_db
+
+def make_threat(index=0):
+    """Build a threat incident for write tests"""
+    return ThreatIncident(
+        title=f"Threat {index}",
+        organization_id="test_org",
+        threat_level=ThreatLevel.HIGH,
+        status=ThreatStatus.ACTIVE,
+        affected_systems=["mail"]
+    )
+
+def query_plan(database, query, params):
+    """Return the EXPLAIN QUERY PLAN details for a query"""
+    rows = database.fetch_all(f"EXPLAIN QUERY PLAN {query}", params)
+    return [row["detail"] for row in rows]
+
+class TestSchema:
+    def test_tables_created_for_every_model(self, database):
+        """Test that every model gets a table"""
+        rows = database.fetch_all("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row["name"] for row in rows}
+        for model in MODELS:
+            assert model.__tablename__ in tables
+
+    def test_wal_mode_enabled(self, database):
+        """Test that connections run in WAL journal mode"""
+        assert database.fetch_one("PRAGMA journal_mode")[0] == "wal"
+
+    def test_legacy_login_table_moved_aside(self, tmp_path):
+        """Test that an old five-column users table becomes the accounts table"""
+        path = str(tmp_path / "legacy.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute(
+                "CREATE TABLE users (username TEXT PRIMARY KEY, password TEXT, "
+                "organization TEXT, email TEXT, created_date TEXT)"
+            )
+            connection.execute("INSERT INTO users VALUES ('ana', 'hash', 'UNEP', 'a@un.org', '')")
+        database = Database(path)
+        assert database.connect()
+        assert database.fetch_one(f"SELECT username FROM {ACCOUNTS_TABLE}")[0] == "ana"
+        assert database.fetch_one("SELECT COUNT(*) FROM users")[0] == 0
+        database.disconnect()
+
+    def test_connect_fails_on_schema_error(self, tmp_path):
+        """Test that connect reports a schema that could not be created"""
+        path = str(tmp_path / "broken.db")
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE threats (id TEXT PRIMARY KEY)")
+        database = Database(path)
+        assert not database.connect()
+        assert database.fetch_all("SELECT * FROM threats") == []
+
+class TestQueryPlans:
+    @pytest.mark.parametrize("severity", [None, "high"])
+    @pytest.mark.parametrize("start_date", [None, datetime.utcnow() - timedelta(days=90)])
+    @pytest.mark.parametrize("end_date", [None, datetime.utcnow()])
+    def test_threat_filters_use_index(self, database, severity, start_date, end_date):
+        """Test that threat filters never scan the whole table"""
+        query, params = ThreatService._build_threats_query(
+            "test_org", severity, start_date, end_date
+        )
+        plan = query_plan(database, query, params)
+        assert any("USING" in detail and "INDEX" in detail for detail in plan)
+        assert not any(detail.startswith("SCAN") for detail in plan)
+
+    @pytest.mark.parametrize("status", [None, "acknowledged", "unacknowledged"])
+    def test_alert_filters_use_index(self, database, status):
+        """Test that alert filters never scan the whole table"""
+        query, params = AlertService._build_alerts_query("test_org", status)
+        plan = query_plan(database, query, params)
+        assert any("USING" in detail and "INDEX" in detail for detail in plan)
+        assert not any(detail.startswith("SCAN") for detail in plan)
+
+class TestBulkWrites:
+    def test_bulk_insert_mixed_models(self, database):
+        """Test that bulk_insert writes several model types at once"""
+        threats = [make_threat(i) for i in range(100)]
+        alert = SecurityAlert(title="Alert", organization_id="test_org")
+        assert database.bulk_insert(threats + [alert])
+        assert database.fetch_one("SELECT COUNT(*) FROM threats")[0] == 100
+        assert database.fetch_one("SELECT COUNT(*) FROM alerts")[0] == 1
+
+    def test_execute_many(self, database):
+        """Test that execute_many applies every parameter set"""
+        database.bulk_insert([make_threat(i) for i in range(10)])
+        assert database.execute_many(
+            "UPDATE threats SET status = ? WHERE title = ?",
+            [(ThreatStatus.RESOLVED.value, f"Threat {i}") for i in range(5)]
+        )
+        row = database.fetch_one(
+            "SELECT COUNT(*) FROM threats WHERE status = ?", (ThreatStatus.RESOLVED.value,)
+        )
+        assert row[0] == 5
+
+    def test_group_commit_concurrent_writes(self, database):
+        """Test that concurrent submissions are all committed"""
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = list(executor.map(
+                lambda i: database.submit_write(make_threat(i)), range(500)
+            ))
+        for future in futures:
+            assert future.result(timeout=5) is not None
+        assert database.fetch_one("SELECT COUNT(*) FROM threats")[0] == 500
+
+    def test_group_commit_isolates_failures(self, database):
+        """Test that one failing row does not fail its batch"""
+        first = make_threat(1)
+        duplicate = make_threat(2)
+        duplicate.id = first.id
+        futures = [database.submit_write(first), database.submit_write(duplicate)]
+        assert futures[0].result(timeout=5) is first
+        with pytest.raises(Exception):
+            futures[1].result(timeout=5)
+
+class TestAsyncDatabase:
+    @pytest.mark.asyncio
+    async def test_concurrent_queries(self, async_database):
+        """Test that concurrent awaits are served by the thread pool"""
+        await async_database.bulk_insert([make_threat(i) for i in range(20)])
+        results = await asyncio.gather(*[
+            async_database.fetch_one("SELECT COUNT(*) FROM threats") for _ in range(50)
+        ])
+        assert all(row[0] == 20 for row in results)
+
+    @pytest.mark.asyncio
+    async def test_threat_status_round_trip(self, async_database):
+        """Test that services read and update through the async layer"""
+        threat = make_threat()
+        await async_database.write(threat)
+        assert await ThreatService.update_threat_status(threat.id, "resolved")
+        threats = await ThreatService.get_threats("test_org")
+        assert [t.id for t in threats] == [threat.id]
+        assert threats[0].status == ThreatStatus.RESOLVED
+        assert threats[0].resolution_time is not None
+
+    @pytest.mark.asyncio
+    async def test_services_share_one_writer(self, async_database, monkeypatch):
+        """Test that concurrent threat and alert writes commit together in one batch"""
+        monkeypatch.setitem(DB_CONFIG, "group_commit_interval", 0.5)
+        batches = []
+        commit = GroupCommitWriter._commit
+        def record(writer, batch):
+            batches.append((writer, sorted(type(instance).__name__ for instance, _ in batch)))
+            commit(writer, batch)
+        monkeypatch.setattr(GroupCommitWriter, "_commit", record)
+
+        await asyncio.gather(
+            ThreatService.report_threat({
+                "title": "Threat", "organization_id": "test_org", "threat_level": ThreatLevel.LOW
+            }),
+            AlertService.create_alert({"title": "Alert", "organization_id": "test_org"})
+        )
+        assert [names for _, names in batches] == [["SecurityAlert", "ThreatIncident"]]
+        assert batches[0][0] is async_database.database.writer
+
+    def test_deadline_interrupts_running_query(self, database):
+        """Test that a statement past the query deadline is aborted, and only that one"""
+        token = query_deadline.set(time.monotonic() + 0.05)
+        try:
+            assert database.fetch_one(
+                "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                "SELECT COUNT(*) FROM n"
+            ) is None
+        finally:
+            query_deadline.reset(token)
+        assert database.fetch_one("SELECT 1")[0] == 1
+
+    def test_cancelled_write_keeps_writer_running(self, database):
+        """Test that a caller cancelling its write does not stop the writer"""
+        database.writer = GroupCommitWriter(database.pool, interval=0.2)
+        abandoned = database.submit_write(make_threat(1))
+        assert abandoned.cancel()
+        assert database.submit_write(make_threat(2)).result(timeout=5) is not None
+        assert database.submit_write(make_threat(3)).result(timeout=5) is not None
+        assert database.fetch_one("SELECT COUNT(*) FROM threats")[0] == 3
+
+class TestKeysetPagination:
+    @pytest.mark.asyncio
+    async def test_pages_cover_all_threats(self, async_database):
+        """Test that following next_cursor visits every threat once"""
+        await async_database.bulk_insert([make_threat(i) for i in range(25)])
+        seen, cursor = [], None
+        while True:
+            threats, cursor = await ThreatService.get_threats_page(
+                "test_org", cursor=cursor, limit=10
+            )
+            seen.extend(threats)
+            if cursor is None:
+                break
+        assert len(seen) == 25
+        assert len({threat.id for threat in seen}) == 25
+        keys = [(threat.created_at, threat.id) for threat in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_rejected(self, async_database):
+        """Test that a malformed cursor raises ValueError"""
+        with pytest.raises(ValueError):
+            await AlertService.get_alerts_page("test_org", cursor="not-a-cursor")
+
+    def test_deep_page_uses_index_without_sort(self, database):
+        """Test that a cursor page seeks the index instead of sorting"""
+        query, params = ThreatService._build_threats_query(
+            "test_org", "high", after=("2024-01-01T00:00:00", "id"), limit=101
+        )
+        plan = query_plan(database, query, params)
+        assert not any(detail.startswith("SCAN") for detail in plan)
+        assert not any("TEMP B-TREE" in detail for detail in plan)
+
+def rollup_rows(database):
+    """Return every rollup bucket as a plain tuple"""
+    return [tuple(row) for row in database.fetch_all(f"SELECT * FROM {ROLLUP_TABLE} ORDER BY 1, 2, 3, 4")]
+
+class TestThreatRollups:
+    @pytest.mark.asyncio
+    async def test_triggers_track_inserts_and_status_changes(self, async_database, database):
+        """Test that rollups follow inserts, resolutions and deletes"""
+        day = datetime(2024, 5, 1, 9, 0)
+        threats = [make_threat(i) for i in range(6)]
+        for index, threat in enumerate(threats):
+            threat.threat_type = "Phishing" if index % 2 else "Malware"
+            threat.created_at = day + timedelta(days=index % 3)
+        await async_database.bulk_insert(threats)
+        assert await ThreatService.update_threat_status(threats[0].id, "resolved")
+        assert await ThreatService.update_threat_status(threats[1].id, "investigating")
+        database.execute_query("DELETE FROM threats WHERE id = ?", (threats[5].id,))
+
+        rows = database.fetch_all(*rollup_query(
+            day, day + timedelta(days=3), "test_org", group_by=("day", "threat_type")
+        ))
+        totals = {(row["day"], row["threat_type"]): row["threats"] for row in rows}
+        assert totals == {
+            ("2024-05-01", "Malware"): 1, ("2024-05-01", "Phishing"): 1,
+            ("2024-05-02", "Malware"): 1, ("2024-05-02", "Phishing"): 1,
+            ("2024-05-03", "Malware"): 1,
+        }
+        summary = database.fetch_one(*rollup_query(organization_id="test_org", group_by=()))
+        assert summary["threats"] == 5
+        assert summary["closed_threats"] == 1
+        assert summary["open_threats"] == 4
+        assert summary["resolution_count"] == 1
+
+        live = rollup_rows(database)
+        assert database.rebuild_rollups()
+        assert rollup_rows(database) == live
+
+    def test_rollup_read_uses_primary_key(self, database):
+        """Test that an organization's range read seeks the rollup key"""
+        query, params = rollup_query(
+            datetime(2024, 1, 1), datetime(2024, 2, 1), "test_org", group_by=("day",)
+        )
+        plan = query_plan(database, query, params)
+        assert not any(detail.startswith("SCAN") for detail in plan)
+
+    def test_unknown_group_rejected(self):
+        """Test that only rollup key columns can be grouped on"""
+        with pytest.raises(ValueError):
+            rollup_query(group_by=("title",))
@@ -0,0 +1,45 @@
+import threading
+from datetime import datetime, timedelta
+from models import ThreatIncident
+from utils.ids import IdGenerator, decode_ulid, encode_ulid
+
+class TestIdGenerator:
+    def test_ids_sort_in_creation_order(self):
+        """Test that ids generated in the same millisecond stay ordered"""
+        generator = IdGenerator()
+        ids = [generator.new_id() for _ in range(10000)]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+        assert all(len(value) == 26 for value in ids)
+
+    def test_unique_across_threads(self):
+        """Test that concurrent callers never receive the same id"""
+        generator = IdGenerator()
+        results = []
+
+        def worker():
+            results.extend(generator.new_id() for _ in range(2000))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(results)) == len(results) == 16000
+
+    def test_encode_roundtrip(self):
+        """Test that encoding preserves the value and its ordering"""
+        values = [0, 1, 12345678901234567890, (1 << 128) - 1]
+        encoded = [encode_ulid(value) for value in values]
+        assert [decode_ulid(value) for value in encoded] == values
+        assert encoded == sorted(encoded)
+
+    def test_timestamp_and_bounds(self):
+        """Test that an id's embedded time falls inside the bounds for its window"""
+        start = datetime.utcnow() - timedelta(seconds=1)
+        threat = ThreatIncident(title="Probe", organization_id="org-1")
+        end = datetime.utcnow() + timedelta(seconds=1)
+
+        low, high = IdGenerator.bounds(start, end)
+        assert low <= threat.id <= high
+        assert abs(IdGenerator.timestamp(threat.id) - threat.created_at) < timedelta(seconds=1)
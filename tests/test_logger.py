@@ -0,0 +1,135 @@
+import json
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+import api.middleware as middleware
+from utils.logger import Logger, LazyQueueHandler, LogSampler, configure_logging, shutdown_logging
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Fixture that redirects the application log to a temp file"""
+    path = tmp_path / "test.log"
+    configure_logging(str(path))
+    yield path
+    shutdown_logging()
+    configure_logging()
+
+def read_entries(path):
+    """Flush the writer and parse the JSON log lines"""
+    shutdown_logging()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+class TestLogger:
+    def test_entries_written_as_json_lines(self, log_file):
+        """Test that activity is written as one JSON object per line"""
+        Logger().log_activity("test_user", "LOGIN", {"ip": "10.0.0.1"})
+        Logger().log_error("boom", "TEST_ERROR")
+        entries = read_entries(log_file)
+        assert entries[0]["action"] == "LOGIN"
+        assert entries[0]["details"] == {"ip": "10.0.0.1"}
+        assert entries[1]["level"] == "ERROR"
+        assert entries[1]["error_type"] == "TEST_ERROR"
+
+    def test_instances_share_one_handler(self, log_file):
+        """Test that creating loggers does not stack handlers"""
+        first, second = Logger(), Logger()
+        assert first.logger is second.logger
+        queue_handlers = [h for h in first.logger.handlers if isinstance(h, LazyQueueHandler)]
+        assert len(queue_handlers) == 1
+
+class TestLogSampler:
+    def make_sampler(self, **overrides):
+        config = {
+            "default_rate": 0.0,
+            "routes": {"/always": 1.0},
+            "slow_request_ms": 1000,
+            "max_per_interval": 2,
+            "summary_interval": 60,
+        }
+        config.update(overrides)
+        return LogSampler(config)
+
+    def test_route_rates(self):
+        """Test that sampling follows the per-route rate"""
+        sampler = self.make_sampler()
+        assert sampler.should_sample("/always")
+        assert not sampler.should_sample("/api/v1/threats")
+
+    def test_per_action_cap(self):
+        """Test that each action is capped per interval"""
+        sampler = self.make_sampler()
+        assert [sampler.allow("API_REQUEST", "/always") for _ in range(3)] == [True, True, False]
+        assert sampler.allow("API_RESPONSE", "/always")
+
+    def test_summary_counts_suppressed_entries(self, log_file):
+        """Test that suppressed entries collapse into one summary"""
+        sampler = self.make_sampler()
+        for _ in range(5):
+            sampler.suppress("API_REQUEST", "/api/v1/threats")
+        sampler.flush_summary(Logger(), force=True)
+        entries = read_entries(log_file)
+        assert len(entries) == 1
+        assert entries[0]["action"] == "LOG_SUMMARY"
+        assert entries[0]["details"]["suppressed"] == [
+            {"action": "API_REQUEST", "route": "/api/v1/threats", "count": 5}
+        ]
+
+class TestRequestLogging:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        """A small app behind the logging middleware, sampling nothing by default"""
+        app = FastAPI()
+        app.middleware("http")(middleware.log_requests)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: str):
+            return {"id": item_id}
+
+        @app.get("/broken")
+        async def broken():
+            raise RuntimeError("boom")
+
+        @app.get("/denied/{status_code}")
+        async def denied(status_code: int):
+            raise HTTPException(status_code=status_code)
+
+        sampler = LogSampler({
+            "default_rate": 0.0,
+            "routes": {"/broken": 1.0},
+            "slow_request_ms": 1000,
+            "max_per_interval": 100,
+            "summary_interval": 60,
+        })
+        monkeypatch.setattr(middleware, "log_sampler", sampler)
+        return TestClient(app), sampler
+
+    def test_summaries_keyed_by_route_template(self, client):
+        """Test that suppressed requests are counted per route template, not per path"""
+        client, sampler = client
+        for path in ("/items/1", "/items/2", "/scan/a", "/scan/b"):
+            client.get(path)
+        # The unmatched paths answer 404, so only their request entries are dropped
+        assert dict(sampler._suppressed) == {
+            ("API_REQUEST", "/items/{item_id}"): 2, ("API_RESPONSE", "/items/{item_id}"): 2,
+            ("API_REQUEST", "<unmatched>"): 2,
+        }
+
+    def test_unhandled_error_logged_and_raised(self, client, log_file):
+        """Test that an exception from the app is logged as a 500 and re-raised"""
+        client, _ = client
+        with pytest.raises(RuntimeError):
+            client.get("/broken")
+        responses = [e for e in read_entries(log_file) if e.get("action") == "API_RESPONSE"]
+        assert responses[0]["details"]["status_code"] == 500
+        assert "boom" in responses[0]["details"]["error"]
+
+    def test_client_errors_kept_on_sampled_out_routes(self, client, log_file):
+        """Test that 403 and 429 responses are logged although their route is sampled out"""
+        client, sampler = client
+        for status_code in (403, 429):
+            assert client.get(f"/denied/{status_code}").status_code == status_code
+        client.get("/items/1")
+        responses = [e for e in read_entries(log_file) if e.get("action") == "API_RESPONSE"]
+        assert [e["details"]["status_code"] for e in responses] == [403, 429]
+        assert responses[0]["details"]["url"].endswith("/denied/403")
+        assert sampler._suppressed[("API_RESPONSE", "/denied/{status_code}")] == 0
@@ -0,0 +1,136 @@
+import pytest
+import statistics
+from datetime import date, datetime
+from database import ALERT_TOTALS_TABLE, TOTALS_DDL, TOTALS_TABLE, Database
+from models import ThreatIncident, ThreatLevel, ThreatStatus
+from services.alert_service import AlertService
+from services.threat_service import ThreatService
+from utils.metrics import MetricsEngine
+
+TODAY = date(2024, 6, 10)
+CREATED = datetime(2024, 6, 9, 8, 0)
+
+@pytest.fixture
+def database(shared_database):
+    """Fixture for the database the services share, on a fresh file"""
+    return shared_database
+
+def insert_threat(database, organization_id, level, resolution_time=None):
+    threat = ThreatIncident(
+        organization_id=organization_id,
+        threat_level=level,
+        status=ThreatStatus.RESOLVED if resolution_time is not None else ThreatStatus.ACTIVE,
+        resolution_time=resolution_time,
+        created_at=CREATED
+    )
+    assert database.bulk_insert([threat])
+    return threat
+
+class TestMetricsEngine:
+    def test_counts_and_status_changes(self, database):
+        """Test that the stored totals follow threats through their lifecycle"""
+        engine = MetricsEngine()
+        critical = insert_threat(database, "org-1", ThreatLevel.CRITICAL)
+        insert_threat(database, "org-1", ThreatLevel.LOW)
+        insert_threat(database, "org-2", ThreatLevel.HIGH)
+        assert database.execute_query(
+            "UPDATE threats SET status = ?, resolution_time = 90 WHERE id = ?",
+            (ThreatStatus.RESOLVED.value, critical.id)
+        )
+
+        result = engine.threat_metrics(database, "org-1", today=TODAY)
+        assert result['total_threats'] == 2
+        assert result['critical_threats'] == 1
+        assert result['active_threats'] == 1
+        assert result['active_by_level']['critical'] == 0
+        assert result['threats_by_status']['resolved'] == 1
+        assert result['average_resolution_time'] == 90
+        assert result['threat_trend'] == {'2024-06-09': 2}
+        assert engine.totals(database)['active_threats'] == 2
+
+        assert database.execute_query(
+            "UPDATE threats SET status = ?, resolution_time = NULL WHERE id = ?",
+            (ThreatStatus.ACTIVE.value, critical.id)
+        )
+        result = engine.threat_metrics(database, "org-1", today=TODAY)
+        assert result['active_by_level']['critical'] == 1
+        assert result['average_resolution_time'] is None
+
+    def test_resolution_spread(self, database):
+        """Test that the stored sums give the sample mean and deviation"""
+        values = [12, 45, 7, 300, 61, 18]
+        for value in values:
+            insert_threat(database, "org-1", ThreatLevel.MEDIUM, value)
+        result = MetricsEngine().threat_metrics(database, "org-1", today=TODAY)
+        assert result['average_resolution_time'] == pytest.approx(statistics.mean(values))
+        assert result['resolution_time_stddev'] == pytest.approx(statistics.stdev(values))
+
+    def test_spread_of_large_times_is_exact(self, database):
+        """Test that a small spread survives resolution times far larger than it"""
+        values = [10 ** 8 + offset for offset in (0, 1, 2, 3, 4, 5)]
+        for value in values:
+            insert_threat(database, "org-1", ThreatLevel.MEDIUM, value)
+        result = MetricsEngine().threat_metrics(database, "org-1", today=TODAY)
+        assert result['resolution_time_stddev'] == pytest.approx(statistics.stdev(values), rel=1e-12)
+
+    def test_unknown_organization(self, database):
+        """Test that an organization with no records reads as zeros"""
+        result = MetricsEngine().threat_metrics(database, "missing", today=TODAY)
+        assert result['total_threats'] == 0
+        assert result['threat_trend'] == {}
+
+    def test_existing_database_is_backfilled(self, database):
+        """Test that a database created before the totals gets them on connect"""
+        insert_threat(database, "org-1", ThreatLevel.HIGH)
+        with database.pool.connection() as connection:
+            for statement in TOTALS_DDL:
+                kind = "TABLE" if statement.startswith("CREATE TABLE") else "TRIGGER"
+                name = statement.split("EXISTS ")[1].split()[0]
+                connection.execute(f"DROP {kind} {name}")
+            connection.commit()
+        insert_threat(database, "org-1", ThreatLevel.LOW)
+
+        upgraded = Database(database.db_name)
+        assert upgraded.connect()
+        assert MetricsEngine().totals(upgraded)['active_threats'] == 2
+        upgraded.disconnect()
+
+class TestServiceIntegration:
+    @pytest.mark.asyncio
+    async def test_services_update_metrics(self, database):
+        """Test that service writes are visible to other processes and match a rebuild"""
+        engine = MetricsEngine()
+        threats = await ThreatService.report_threats([
+            {
+                "title": f"Threat {i}",
+                "description": "Test",
+                "organization_id": "org-1",
+                "reported_by": "sensor",
+                "affected_systems": ["mail"],
+                "severity": "critical" if i % 2 else "medium",
+            }
+            for i in range(4)
+        ])
+        assert await ThreatService.update_threat_status(threats[0].id, "resolved")
+        assert await ThreatService.update_threat_status(threats[0].id, "resolved")
+        alert = await AlertService.create_alert({"title": "Alert", "organization_id": "org-1"})
+        assert await AlertService.acknowledge_alert(alert.id, "analyst")
+        assert not await AlertService.acknowledge_alert(alert.id, "analyst")
+
+        # A separate handle stands in for the Streamlit process
+        reader = Database(database.db_name)
+        assert reader.connect()
+        live = engine.threat_metrics(reader, "org-1")
+        assert live['total_threats'] == 4
+        assert live['active_threats'] == 3
+        assert live['threats_by_status']['resolved'] == 1
+        alerts = engine.alert_metrics(reader, "org-1")
+        assert alerts['total_alerts'] == 1
+        assert alerts['unacknowledged_alerts'] == 0
+
+        assert engine.rebuild(database)
+        assert engine.threat_metrics(reader, "org-1") == live
+        assert engine.alert_metrics(reader, "org-1") == alerts
+        assert database.fetch_one(f"SELECT COUNT(*) FROM {TOTALS_TABLE}")[0] == 3
+        assert database.fetch_one(f"SELECT COUNT(*) FROM {ALERT_TOTALS_TABLE}")[0] == 1
+        reader.disconnect()
@@ -0,0 +1,96 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import api.middleware as middleware
+import utils.security as security
+from security.security_config import SECURITY_CONFIG
+from utils.rate_limiter import TokenBucketLimiter, SQLiteRateLimitBackend
+from utils.security import SecurityUtils
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    """Fixture for each rate limit backend"""
+    if request.param == "sqlite":
+        return SQLiteRateLimitBackend(str(tmp_path / "rate_limits.db"))
+    return TokenBucketLimiter(shards=4)
+
+class TestTokenBucket:
+    def test_limit_enforced(self, limiter):
+        """Test that requests beyond the bucket size are refused"""
+        results = [limiter.acquire("key", 5, 60) for _ in range(6)]
+        assert [allowed for allowed, _, _ in results] == [True] * 5 + [False]
+        allowed, retry_after, remaining = results[-1]
+        assert 0 < retry_after <= 12
+        assert remaining == 0
+
+    def test_keys_are_independent(self, limiter):
+        """Test that one key exhausting its bucket does not affect another"""
+        for _ in range(3):
+            limiter.acquire("noisy", 3, 60)
+        assert not limiter.acquire("noisy", 3, 60)[0]
+        assert limiter.acquire("quiet", 3, 60)[0]
+
+    def test_sqlite_limits_shared_across_instances(self, tmp_path):
+        """Test that separate workers draw from the same bucket"""
+        path = str(tmp_path / "shared.db")
+        first = SQLiteRateLimitBackend(path)
+        second = SQLiteRateLimitBackend(path)
+        assert first.acquire("key", 2, 60)[0]
+        assert second.acquire("key", 2, 60)[0]
+        assert not first.acquire("key", 2, 60)[0]
+
+    def test_sqlite_prunes_idle_buckets(self, tmp_path):
+        """Test that buckets idle for a full period are deleted"""
+        limiter = SQLiteRateLimitBackend(str(tmp_path / "prune.db"), prune_interval=0)
+        assert limiter.acquire("idle", 5, 60)[0]
+        with limiter.pool.connection() as connection:
+            connection.execute("UPDATE rate_limit_buckets SET updated_at = updated_at - 61")
+            connection.commit()
+        assert limiter.acquire("busy", 5, 60)[0]
+        with limiter.pool.connection() as connection:
+            keys = [row[0] for row in connection.execute("SELECT key FROM rate_limit_buckets")]
+        assert keys == ["busy"]
+
+class TestRateLimitMiddleware:
+    @pytest.fixture
+    def client(self, shared_database, monkeypatch):
+        """A small app behind the rate limiter, with API keys from a fresh database"""
+        monkeypatch.setattr(middleware, "rate_limiter", TokenBucketLimiter())
+        monkeypatch.setitem(SECURITY_CONFIG, "RATE_LIMIT_REQUESTS", 2)
+        security.api_key_cache.clear()
+        security.invalid_api_key_cache.clear()
+        app = FastAPI()
+        app.middleware("http")(middleware.rate_limit_requests)
+
+        @app.get("/ping")
+        async def ping():
+            return {"status": "success"}
+
+        yield TestClient(app)
+        security.api_key_cache.clear()
+        security.invalid_api_key_cache.clear()
+
+    def test_returns_429_with_retry_after(self, client):
+        """Test that the middleware rejects over-limit requests"""
+        headers = {"X-API-Key": "test_api_key"}
+        assert client.get("/ping", headers=headers).status_code == 200
+        assert client.get("/ping", headers=headers).status_code == 200
+        response = client.get("/ping", headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+
+    def test_uncached_key_gets_its_own_limit(self, client):
+        """Test that a key not yet cached is looked up and limited at its own rate"""
+        api_key, _ = SecurityUtils.issue_api_key("test_org", "sensor", [], 3, "test_user")
+        headers = {"X-API-Key": api_key}
+        responses = [client.get("/ping", headers=headers) for _ in range(4)]
+        assert [r.status_code for r in responses] == [200, 200, 200, 429]
+        assert responses[0].headers["X-RateLimit-Limit"] == "3"
+
+    def test_invalid_keys_share_client_bucket(self, client):
+        """Test that guessing a new key per request does not get a fresh bucket"""
+        codes = [
+            client.get("/ping", headers={"X-API-Key": f"guess-{i}"}).status_code
+            for i in range(3)
+        ]
+        assert codes == [200, 200, 429]
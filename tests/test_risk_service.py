@@ -0,0 +1,74 @@
+import pytest
+from datetime import datetime
+from models import (AssetInventory, ComplianceReport, Organization, ThreatIncident, ThreatLevel,
+                    ThreatStatus)
+from services.risk_service import RiskService
+
+@pytest.fixture
+def database(shared_database):
+    """The shared database holding six organizations"""
+    database = shared_database
+    assert database.bulk_insert(
+        [Organization(id=f"org-{i}", name=f"Agency {i}", type="UN Agency") for i in range(6)]
+        + [AssetInventory(organization_id=f"org-{i}", asset_name="mail") for i in range(6)]
+        + [
+            ComplianceReport(organization_id=f"org-{i}", compliance_score=0.5 + i / 20,
+                             assessment_date=datetime(2024, 1, 1))
+            for i in range(6)
+        ]
+        + [
+            ThreatIncident(organization_id="org-2", threat_level=ThreatLevel.CRITICAL,
+                           status=ThreatStatus.ACTIVE)
+            for _ in range(5)
+        ]
+    )
+    return database
+
+class TestRiskService:
+    @pytest.mark.asyncio
+    async def test_single_assessment(self, database):
+        """Test that one organization is scored from its assets, compliance and threats"""
+        assessment = await RiskService.perform_risk_assessment("org-2")
+        assert assessment.risk_factors == {
+            'technical_controls': 1.0,
+            'policy_compliance': 0.6,
+            'threat_landscape': 0.5
+        }
+        stored = database.fetch_all("SELECT organization_id FROM risk_assessments")
+        assert [row[0] for row in stored] == ["org-2"]
+
+    @pytest.mark.asyncio
+    async def test_threat_landscape_points_the_same_way(self, database):
+        """Test that open threats, with or without a status, lower the landscape score"""
+        assert database.bulk_insert([
+            ThreatIncident(organization_id="org-3", threat_level=ThreatLevel.HIGH),
+            ThreatIncident(organization_id="org-3", threat_level=ThreatLevel.HIGH,
+                           status=ThreatStatus.RESOLVED),
+        ])
+        assert await RiskService._assess_threat_landscape("org-1") == 1.0
+        assert await RiskService._assess_threat_landscape("org-3") == pytest.approx(0.94)
+        calm = await RiskService._build_assessment("org-1")
+        exposed = await RiskService._build_assessment("org-2")
+        assert calm.overall_risk_score > exposed.overall_risk_score
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_single_assessments(self, database):
+        """Test that the process pool scores, stores and reports every organization"""
+        progress = []
+        assessments = await RiskService.assess_organizations(
+            workers=2, shard_size=2, progress=lambda done, total: progress.append((done, total))
+        )
+        expected = {
+            org: (await RiskService._build_assessment(org)).overall_risk_score
+            for org in (f"org-{i}" for i in range(6))
+        }
+        assert {a.organization_id: a.overall_risk_score for a in assessments} == expected
+        assert progress == [(2, 6), (4, 6), (6, 6)]
+        count = database.fetch_one("SELECT COUNT(*) FROM risk_assessments")[0]
+        assert count == 6
+
+    @pytest.mark.asyncio
+    async def test_batch_without_organizations(self, database):
+        """Test that an empty batch starts no workers and writes nothing"""
+        assert await RiskService.assess_organizations([]) == []
+        assert database.fetch_one("SELECT COUNT(*) FROM risk_assessments")[0] == 0
@@ -0,0 +1,43 @@
+import time
+import pytest
+from utils.risk_simulation import simulate_risk
+
+STANDARD = (
+    ("technical", 2, 5), ("technical", 2, 5), ("technical", 2, 5),
+    ("policy", 2, 5), ("policy", 2, 5),
+    ("human", 2, 5), ("human", 2, 5),
+)
+POSSIBLE = (2, 5)
+
+class TestRiskSimulation:
+    def test_centred_on_deterministic_score(self):
+        """Test that the simulated score centres on the slider-based score with a band around it"""
+        result = simulate_risk(STANDARD, POSSIBLE)
+        assert result.score.mean == pytest.approx(0.6, abs=0.005)
+        assert result.score.p5 < result.score.p50 < result.score.p95
+        assert result.residual_risk.mean == pytest.approx(0.5 * 0.4, abs=0.01)
+        assert sum(result.risk_levels.values()) == pytest.approx(1.0)
+        assert sum(result.histogram[0]) == result.scenarios == 100_000
+        assert set(result.categories) == {"technical", "policy", "human"}
+
+    def test_better_controls_lower_risk(self):
+        """Test that stronger ratings raise the score and cut residual risk"""
+        weak = simulate_risk(tuple((c, 0, 5) for c, _, _ in STANDARD), (4, 5))
+        strong = simulate_risk(tuple((c, 4, 5) for c, _, _ in STANDARD), (0, 5))
+        assert strong.score.p5 > weak.score.p95
+        assert strong.residual_risk.p95 < weak.residual_risk.p5
+        assert strong.risk_levels['low'] > 0.99
+        assert weak.risk_levels['high'] > 0.99
+
+    def test_fast_and_cached(self):
+        """Test that 100k scenarios stay interactive and repeats come from the cache"""
+        controls = STANDARD[:-1] + (("human", 3, 5),)
+        started = time.perf_counter()
+        first = simulate_risk(controls, POSSIBLE)
+        assert time.perf_counter() - started < 1.0
+        assert simulate_risk(controls, POSSIBLE) is first
+
+    def test_requires_controls(self):
+        """Test that an empty assessment is rejected"""
+        with pytest.raises(ValueError):
+            simulate_risk((), POSSIBLE)
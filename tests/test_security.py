@@ -0,0 +1,118 @@
+import pytest
+from datetime import timedelta
+import utils.security as security
+from config import SECURITY_CONFIG
+from utils.cache import TTLCache
+from utils.security import SecurityUtils
+
+@pytest.fixture
+def key_database(shared_database):
+    """Fixture for API key verification against a fresh shared database"""
+    security.api_key_cache.clear()
+    security.invalid_api_key_cache.clear()
+    SecurityUtils.sync_key_version()
+    yield shared_database
+    security.api_key_cache.clear()
+    security.invalid_api_key_cache.clear()
+
+class TestTTLCache:
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_expiry(self):
+        """Test that expired entries are treated as misses"""
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1, ttl=0)
+        assert cache.get("a") is None
+        assert cache.stats()["misses"] == 1
+
+class TestAPIKeyVerification:
+    def test_verified_key_is_cached(self, key_database):
+        """Test that a second verification is served from cache"""
+        api_key, key = SecurityUtils.issue_api_key(
+            "test_org", "sensor", ["threats:write"], 100, "test_user"
+        )
+        record = SecurityUtils.verify_api_key(api_key)
+        assert record["organization_id"] == "test_org"
+        assert record["rate_limit"] == 100
+
+        hits = SecurityUtils.api_key_cache_stats()["hits"]
+        key_database.disconnect()  # a cache hit must not need the database
+        assert SecurityUtils.verify_api_key(api_key) == record
+        assert SecurityUtils.api_key_cache_stats()["hits"] - hits == 1
+
+    def test_unknown_key_rejected(self, key_database):
+        """Test that unknown keys are not verified"""
+        assert SecurityUtils.verify_api_key("invalid_key") is None
+
+    def test_revoke_invalidates_cache(self, key_database):
+        """Test that revoked keys stop verifying immediately"""
+        api_key, key = SecurityUtils.issue_api_key(
+            "test_org", "sensor", [], 100, "test_user"
+        )
+        assert SecurityUtils.verify_api_key(api_key)
+        assert SecurityUtils.revoke_api_key(key.key_hash)
+        assert SecurityUtils.verify_api_key(api_key) is None
+
+    def test_rotate_replaces_key(self, key_database):
+        """Test that rotation retires the old key and issues a new one"""
+        api_key, key = SecurityUtils.issue_api_key(
+            "test_org", "sensor", [], 100, "test_user", expires_in=timedelta(days=1)
+        )
+        assert SecurityUtils.verify_api_key(api_key)
+        new_key = SecurityUtils.rotate_api_key(key.key_hash)
+        assert SecurityUtils.verify_api_key(api_key) is None
+        assert SecurityUtils.verify_api_key(new_key)["organization_id"] == "test_org"
+
+    def test_unknown_or_revoked_keys_not_changed(self, key_database):
+        """Test that revoking or rotating a missing or revoked key reports failure"""
+        assert not SecurityUtils.revoke_api_key("unknown")
+        assert SecurityUtils.rotate_api_key("unknown") is None
+
+        api_key, key = SecurityUtils.issue_api_key("test_org", "sensor", [], 100, "test_user")
+        assert SecurityUtils.revoke_api_key(key.key_hash)
+        assert not SecurityUtils.revoke_api_key(key.key_hash)
+        assert SecurityUtils.rotate_api_key(key.key_hash) is None
+
+    def test_miss_counted_once(self, key_database):
+        """Test that a cache miss followed by a load reads the cache once"""
+        api_key, _ = SecurityUtils.issue_api_key("test_org", "sensor", [], 100, "test_user")
+        before = SecurityUtils.api_key_cache_stats()
+        assert SecurityUtils.lookup_cached_api_key(api_key) is None
+        assert SecurityUtils.load_api_key(api_key)
+        assert SecurityUtils.verify_api_key(api_key)
+        after = SecurityUtils.api_key_cache_stats()
+        assert after["hits"] - before["hits"] == 1
+        assert after["misses"] - before["misses"] == 1
+
+    def test_invalid_key_cached_negatively(self, key_database, monkeypatch):
+        """Test that repeated unknown keys are rejected without another database read"""
+        reads = []
+        fetch_one = key_database.fetch_one
+        monkeypatch.setattr(key_database, "fetch_one",
+                            lambda *args: reads.append(args) or fetch_one(*args))
+        assert SecurityUtils.verify_api_key("invalid_key") is None
+        assert SecurityUtils.lookup_cached_api_key("invalid_key") is False
+        assert SecurityUtils.verify_api_key("invalid_key") is None
+        assert len(reads) == 1
+
+    def test_revocation_by_another_worker(self, key_database, monkeypatch):
+        """Test that a key revoked elsewhere stops verifying after the version check"""
+        api_key, key = SecurityUtils.issue_api_key("test_org", "sensor", [], 100, "test_user")
+        assert SecurityUtils.verify_api_key(api_key)
+        # Another worker revokes the key; this process's cache never hears of it
+        assert key_database.execute_query(
+            "UPDATE api_keys SET is_active = 0 WHERE key_hash = ?", (key.key_hash,)
+        )
+        assert SecurityUtils.verify_api_key(api_key)
+
+        monkeypatch.setitem(SECURITY_CONFIG, "api_key_version_check", 0)
+        assert SecurityUtils.verify_api_key(api_key) is None
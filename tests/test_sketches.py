@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from database import Database, sketch_query
+from models import ThreatIncident, ThreatLevel, ThreatStatus
+from services.threat_service import ThreatService
+from utils.sketches import HyperLogLog, SketchEngine, TDigest, sketch_engine, sketch_from_bytes
+
+START = datetime(2024, 3, 1)
+
+class TestHyperLogLog:
+    def test_estimate_and_merge(self):
+        """Test that counts are within a few percent and merging counts the union"""
+        first, second = HyperLogLog(), HyperLogLog()
+        first.update(f"host-{i}" for i in range(60_000))
+        second.update(f"host-{i}" for i in range(40_000, 100_000))
+        assert first.count() == pytest.approx(60_000, rel=0.04)
+        assert first.merge(second).count() == pytest.approx(100_000, rel=0.04)
+
+    def test_small_counts_and_round_trip(self):
+        """Test that small sets are near exact and survive serialization"""
+        sketch = HyperLogLog()
+        sketch.update(["10.0.0.1", "10.0.0.2", "10.0.0.1", "10.0.0.3"])
+        blob = sketch.to_bytes()
+        assert len(blob) < 100
+        assert sketch_from_bytes(blob).count() == 3
+
+class TestTDigest:
+    def test_quantiles_track_exact_percentiles(self):
+        """Test that p50/p95/p99 of a skewed sample are close to the exact values"""
+        values = np.random.default_rng(7).lognormal(4, 1, 200_000)
+        digest = TDigest()
+        digest.update(values)
+        for q in (0.5, 0.95, 0.99):
+            assert digest.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.03)
+
+    def test_merged_digests_match_one_digest(self):
+        """Test that merging per-day digests agrees with digesting every value"""
+        rng = np.random.default_rng(11)
+        days = [rng.exponential(60 * (1 + day % 3), 2_000) for day in range(30)]
+        merged = TDigest()
+        for values in days:
+            daily = TDigest()
+            for value in values:
+                daily.add(value)
+            merged.merge(sketch_from_bytes(daily.to_bytes()))
+        everything = np.concatenate(days)
+        assert merged.count == everything.size
+        for q in (0.5, 0.95, 0.99):
+            assert merged.quantile(q) == pytest.approx(np.quantile(everything, q), rel=0.05)
+        assert merged.cdf([merged.maximum])[0] == pytest.approx(1.0)
+
+    def test_empty_digest(self):
+        """Test that an empty digest reports no quantiles"""
+        assert TDigest().quantiles((0.5, 0.99)) == [None, None]
+
+class TestSketchEngine:
+    @pytest.fixture
+    def database(self, tmp_path):
+        database = Database(str(tmp_path / "sketches.db"))
+        assert database.connect()
+        yield database
+        database.disconnect()
+
+    def test_flush_merges_deltas_across_ranges(self, database):
+        """Test that flushed deltas merge in storage and combine across days"""
+        engine = SketchEngine()
+        for flush in range(2):
+            for day in range(10):
+                engine.record_threat(
+                    "org-1", START + timedelta(days=day), [f"system-{day}", "mail"],
+                    f"192.0.2.{day + flush * 10}", f"analyst-{day % 3}"
+                )
+                engine.record_resolution("org-1", START + timedelta(days=day), 10 * (day + 1))
+            assert engine.flush(database)
+            assert engine.pending() == 0
+        engine.record_threat("org-1", START, ["late-system"], "198.51.100.1", "analyst-0")
+
+        end = START + timedelta(days=10)
+        rows = database.fetch_all(*sketch_query(START, end, "org-1"))
+        summary = engine.summarize(engine.merged(rows, "org-1", START, end))
+        assert summary['distinct_affected_systems'] == 12
+        assert summary['distinct_source_ips'] == 21
+        assert summary['distinct_reporters'] == 3
+        assert summary['resolution_count'] == 20
+        assert summary['resolution_time_p50'] == pytest.approx(55, abs=5)
+
+        first_week = START + timedelta(days=7)
+        rows = database.fetch_all(*sketch_query(START, first_week, "org-1"))
+        assert engine.summarize(engine.merged(rows, "org-1", START, first_week))[
+            'distinct_affected_systems'
+        ] == 9
+
+    def test_rebuild_matches_recorded_writes(self, database):
+        """Test that rebuilding from the threats table reproduces the sketches"""
+        threats = [
+            ThreatIncident(
+                organization_id="org-1",
+                affected_systems=[f"system-{i % 7}"],
+                source_ip=f"203.0.113.{i % 50}",
+                reported_by=f"analyst-{i % 4}",
+                status=ThreatStatus.RESOLVED if i % 2 else ThreatStatus.ACTIVE,
+                resolution_time=i if i % 2 else None,
+                created_at=START + timedelta(hours=6 * i)
+            )
+            for i in range(200)
+        ]
+        assert database.bulk_insert(threats)
+        engine = SketchEngine()
+        assert engine.rebuild(database)
+        summary = engine.summarize(engine.merged(database.fetch_all(*sketch_query())))
+        assert summary['distinct_affected_systems'] == 7
+        assert summary['distinct_source_ips'] == pytest.approx(50, abs=1)
+        assert summary['distinct_reporters'] == 4
+        assert summary['resolution_count'] == 100
+        assert summary['resolution_time_p99'] == pytest.approx(197, abs=3)
+
+    def test_flush_due_after_interval(self):
+        """Test that a flush is due only with pending deltas and the interval passed"""
+        engine = SketchEngine(flush_interval=0)
+        assert not engine.flush_due()
+        engine.record_threat("org-1", START, ["mail"])
+        assert engine.flush_due()
+        assert not SketchEngine(flush_interval=3600).flush_due()
+
+class TestWritePathFlush:
+    @pytest.mark.asyncio
+    async def test_service_writes_reach_storage(self, shared_database, monkeypatch):
+        """Test that a process without the API flusher still stores its sketches"""
+        monkeypatch.setattr(sketch_engine, "flush_interval", 0)
+        threat = await ThreatService.report_threat({
+            "title": "Intrusion", "organization_id": "org-flush", "threat_level": ThreatLevel.LOW,
+            "affected_systems": ["mail", "vpn"]
+        })
+        assert await ThreatService.update_threat_status(threat.id, "resolved")
+        assert sketch_engine.pending() == 0
+
+        rows = shared_database.fetch_all(*sketch_query(organization_id="org-flush"))
+        summary = SketchEngine().summarize(SketchEngine().merged(rows))
+        assert summary['distinct_affected_systems'] == 2
+        assert summary['resolution_count'] == 1
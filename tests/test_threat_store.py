@@ -0,0 +1,98 @@
+import numpy as np
+from datetime import datetime, timedelta
+from models import ThreatIncident, ThreatLevel
+from utils.analytics import AnalyticsEngine
+from utils.threat_store import ThreatStore
+
+START = datetime(2024, 3, 1, 9, 0)
+
+def make_threats(count: int, organization_id: str = "org-1") -> list:
+    levels = [ThreatLevel.CRITICAL, ThreatLevel.HIGH, ThreatLevel.MEDIUM, ThreatLevel.LOW]
+    return [
+        ThreatIncident(
+            organization_id=organization_id,
+            threat_type="Phishing" if i % 2 else "Malware",
+            threat_level=levels[i % 4],
+            created_at=START + timedelta(hours=6 * i),
+            resolution_time=30 * (i + 1) if i % 3 == 0 else None
+        )
+        for i in range(count)
+    ]
+
+class TestThreatStore:
+    def test_append_grows_and_interns(self):
+        """Test that appends grow the columns and intern ids to codes"""
+        store = ThreatStore(capacity=2)
+        store.extend(make_threats(5))
+        store.append(make_threats(1, "org-2")[0])
+        view = store.view()
+        assert len(store) == 6
+        assert view.severity.dtype == np.int8
+        assert view.timestamp.dtype == np.int64
+        assert store.organizations == ["org-1", "org-2"]
+        assert sorted(store.threat_types) == ["Malware", "Phishing"]
+        assert view.organization.tolist() == [0, 0, 0, 0, 0, 1]
+
+    def test_window_is_zero_copy_slice(self):
+        """Test that time windows over ordered rows share memory with the store"""
+        store = ThreatStore.from_records(make_threats(8))
+        window = store.window(START + timedelta(hours=6), START + timedelta(hours=18))
+        assert len(window) == 2
+        assert np.shares_memory(window.timestamp, store.view().timestamp)
+
+    def test_window_unordered_rows(self):
+        """Test that windows stay correct once rows arrive out of order"""
+        threats = make_threats(8)
+        store = ThreatStore.from_records(threats[4:] + threats[:4])
+        window = store.window(START + timedelta(hours=6), START + timedelta(hours=18))
+        assert sorted(window.timestamp.tolist()) == [
+            int((START + timedelta(hours=h) - datetime(1970, 1, 1)).total_seconds() * 1000)
+            for h in (6, 12)
+        ]
+
+    def test_metrics_from_view(self):
+        """Test that metrics over a view match the incidents it holds"""
+        store = ThreatStore.from_records(make_threats(8) + make_threats(3, "org-2"))
+        metrics = AnalyticsEngine.calculate_threat_metrics(store.view().for_organization("org-1"))
+        assert metrics['total_threats'] == 8
+        assert metrics['critical_threats'] == 2
+        assert metrics['low_threats'] == 2
+        assert metrics['average_resolution_time'] == (30 + 120 + 210) / 3
+        assert metrics['threat_trend'] == {'2024-03-01': 3, '2024-03-02': 4, '2024-03-03': 1}
+
+    def test_metrics_from_records(self):
+        """Test that a plain list of threats is still accepted"""
+        threats = [threat.to_dict() for threat in make_threats(4)]
+        assert AnalyticsEngine.calculate_threat_metrics(threats)['high_threats'] == 1
+
+class TestOrganizationMetricsKernel:
+    def test_matches_single_organization_metrics(self):
+        """Test that the grouped kernel agrees with per-organization metrics"""
+        threats = make_threats(40, "org-1") + make_threats(7, "org-2") + make_threats(1, "org-3")
+        view = ThreatStore.from_records(threats).view()
+        results = AnalyticsEngine.calculate_threat_metrics_by_organization(view)
+        assert sorted(results) == ["org-1", "org-2", "org-3"]
+        for organization_id, metrics in results.items():
+            expected = AnalyticsEngine.calculate_threat_metrics(view.for_organization(organization_id))
+            assert metrics == expected
+
+    def test_sparse_span_and_unknown_organization(self):
+        """Test long date spans and rows without an organization"""
+        threats = make_threats(3) + [
+            ThreatIncident(threat_level=ThreatLevel.HIGH, created_at=START),
+            ThreatIncident(
+                organization_id="org-1",
+                threat_level=ThreatLevel.LOW,
+                created_at=START + timedelta(days=3650)
+            ),
+        ]
+        results = AnalyticsEngine.calculate_threat_metrics_by_organization(
+            ThreatStore.from_records(threats).view()
+        )
+        assert list(results) == ["org-1"]
+        assert results["org-1"]["total_threats"] == 4
+        assert results["org-1"]["threat_trend"]["2034-02-27"] == 1
+
+    def test_empty_view(self):
+        """Test that an empty store produces no results"""
+        assert AnalyticsEngine.calculate_threat_metrics_by_organization(ThreatStore().view()) == {}
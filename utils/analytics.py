@@ -1,40 +1,245 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from typing import Dict, Optional
+from models import ThreatLevel
+from utils.threat_store import MS_PER_DAY, SEVERITY_CODES, ThreatStore, ThreatView
+
+# Base risk (0-10 scale) contributed by each threat level
+THREAT_LEVEL_RISK = {
+    'critical': 8.0,
+    'high': 6.0,
+    'medium': 4.0,
+    'low': 2.0,
+}
+
+# Base risk indexed by ThreatLevel code; 0 (unknown) adds nothing
+LEVEL_RISK = np.zeros(SEVERITY_CODES)
+for _level in ThreatLevel:
+    LEVEL_RISK[_level] = THREAT_LEVEL_RISK[_level.label]
+
+# Extra risk from the most sensitive asset a threat affects
+CLASSIFICATION_RISK = {
+    'public': 0.0,
+    'unclassified': 0.0,
+    'internal': 0.5,
+    'restricted': 1.0,
+    'confidential': 1.0,
+    'secret': 1.5,
+    'top secret': 2.0,
+}
+
+def _lookup(values, table: Dict[str, float]) -> np.ndarray:
+    """Map labels to table values, case-insensitively; unknown and None map to 0"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    risks = np.array(
+        [table.get(str(getattr(label, 'label', label)).lower(), 0.0) for label in uniques] + [0.0]
+    )
+    return risks[codes]  # code -1 (missing) picks the trailing 0
 
 class AnalyticsEngine:
     @staticmethod
-    def calculate_threat_metrics(threats: list) -> dict:
-        """Calculate threat-related metrics"""
-        df = pd.DataFrame(threats)
-        
-        metrics = {
-            'total_threats': len(threats),
-            'critical_threats': len(df[df['severity'] == 'critical']),
-            'high_threats': len(df[df['severity'] == 'high']),
-            'medium_threats': len(df[df['severity'] == 'medium']),
-            'low_threats': len(df[df['severity'] == 'low']),
-            'average_resolution_time': df['resolution_time'].mean(),
-            'threat_trend': df.groupby('date').size().to_dict()
+    def calculate_threat_metrics(threats) -> dict:
+        """Calculate threat-related metrics
+
+        Takes a ThreatView, or a list of threats which is loaded into a
+        ThreatStore first; the metrics are computed over its columns.
+        """
+        if not isinstance(threats, ThreatView):
+            threats = ThreatStore.from_records(threats).view()
+
+        counts = np.bincount(threats.severity, minlength=SEVERITY_CODES)
+        resolved = threats.resolution_time[~np.isnan(threats.resolution_time)]
+        days, per_day = np.unique(threats.timestamp // MS_PER_DAY, return_counts=True)
+
+        return AnalyticsEngine._threat_metrics(
+            counts,
+            float(resolved.mean()) if len(resolved) else None,
+            days,
+            per_day
+        )
+
+    @staticmethod
+    def calculate_threat_metrics_by_organization(threats: ThreatView) -> Dict[str, dict]:
+        """Calculate threat metrics for every organization in one grouped pass
+
+        Rows are bucketed on organization x severity and organization x day
+        with np.bincount, so the cost is a few linear passes over the
+        columns however many organizations there are. Returns the same
+        metrics as calculate_threat_metrics, keyed by organization id.
+        """
+        known = threats.organization >= 0
+        if not known.all():
+            threats = threats.select(known)
+        organization_count = len(threats.organizations)
+        if not len(threats) or not organization_count:
+            return {}
+        organization = threats.organization.astype(np.int64)
+
+        severity_counts = np.bincount(
+            organization * SEVERITY_CODES + threats.severity,
+            minlength=organization_count * SEVERITY_CODES
+        ).reshape(organization_count, SEVERITY_CODES)
+
+        resolved = ~np.isnan(threats.resolution_time)
+        resolved_counts = np.bincount(organization[resolved], minlength=organization_count)
+        resolution_totals = np.bincount(
+            organization[resolved],
+            weights=threats.resolution_time[resolved],
+            minlength=organization_count
+        )
+
+        day = threats.timestamp // MS_PER_DAY
+        first_day = int(day.min())
+        day_count = int(day.max()) - first_day + 1
+        cells = organization * day_count + (day - first_day)
+        if organization_count * day_count <= 4 * len(threats):
+            # Dense grid: one bincount, then read each organization's row
+            per_cell = np.bincount(cells, minlength=organization_count * day_count)
+            occupied = np.flatnonzero(per_cell)
+            cell_counts = per_cell[occupied]
+        else:
+            # Long, sparse spans: only materialise the cells that occur
+            occupied, cell_counts = np.unique(cells, return_counts=True)
+        cell_organization = occupied // day_count
+        cell_day = occupied % day_count + first_day
+        # Cells are ordered by organization, so each one owns a contiguous run
+        bounds = np.searchsorted(cell_organization, np.arange(organization_count + 1))
+
+        results = {}
+        for code, organization_id in enumerate(threats.organizations):
+            total = severity_counts[code].sum()
+            if not total:
+                continue
+            start, stop = bounds[code], bounds[code + 1]
+            results[organization_id] = AnalyticsEngine._threat_metrics(
+                severity_counts[code],
+                float(resolution_totals[code] / resolved_counts[code]) if resolved_counts[code] else None,
+                cell_day[start:stop],
+                cell_counts[start:stop]
+            )
+        return results
+
+    @staticmethod
+    def _threat_metrics(severity_counts: np.ndarray, average_resolution_time: Optional[float],
+                        days: np.ndarray, per_day: np.ndarray) -> dict:
+        """Shape aggregated counts into the threat metrics dict"""
+        return {
+            'total_threats': int(severity_counts.sum()),
+            'critical_threats': int(severity_counts[ThreatLevel.CRITICAL]),
+            'high_threats': int(severity_counts[ThreatLevel.HIGH]),
+            'medium_threats': int(severity_counts[ThreatLevel.MEDIUM]),
+            'low_threats': int(severity_counts[ThreatLevel.LOW]),
+            'average_resolution_time': average_resolution_time,
+            'threat_trend': dict(zip(
+                np.datetime_as_string(days.astype('datetime64[D]')).tolist(),
+                per_day.tolist()
+            ))
+        }
+
+    @staticmethod
+    def calculate_risk_metrics(assessments: list) -> dict:
+        """Calculate risk metrics from assessment_date/overall_risk_score rows"""
+        df = pd.DataFrame(assessments, columns=['assessment_date', 'overall_risk_score'])
+        df = df.sort_values('assessment_date')
+        scores = df['overall_risk_score']
+        latest = df.iloc[-1] if len(df) else None
+        change = scores.diff().iloc[-1] if len(df) else None
+
+        return {
+            'assessments': len(df),
+            'latest_score': latest['overall_risk_score'] if latest is not None else None,
+            'latest_assessment_date': latest['assessment_date'] if latest is not None else None,
+            'score_change': None if change is None or pd.isna(change) else float(change),
+            'average_score': float(scores.mean()) if len(df) else None,
+            'min_score': float(scores.min()) if len(df) else None,
+            'max_score': float(scores.max()) if len(df) else None,
+            'score_trend': df.groupby(df['assessment_date'].str[:10])['overall_risk_score']
+                             .mean().to_dict()
+        }
+
+    @staticmethod
+    def calculate_compliance_metrics(reports: list) -> dict:
+        """Calculate compliance metrics from the latest report per framework"""
+        df = pd.DataFrame(
+            reports, columns=['id', 'framework', 'assessment_date', 'compliance_score', 'findings']
+        )
+        latest = (
+            df.sort_values(['assessment_date', 'id'])
+              .groupby('framework')
+              .tail(1)
+              .sort_values('framework')
+        )
+        scores = latest['compliance_score'].dropna()
+
+        return {
+            'frameworks': {
+                row.framework: {
+                    'score': row.compliance_score,
+                    'assessment_date': row.assessment_date,
+                    'findings': int(row.findings)
+                }
+                for row in latest.itertuples()
+            },
+            'average_score': float(scores.mean()) if len(scores) else None,
+            'open_findings': int(latest['findings'].sum())
         }
-        
-        return metrics
 
     @staticmethod
     def generate_risk_score(assessment_data: dict) -> float:
-        """Generate risk score based on assessment data"""
+        """Generate risk score based on assessment data
+
+        A weighted average of the factors present, each of which is higher
+        when the organization is better protected.
+        """
         weights = {
             'technical_controls': 0.3,
             'policy_compliance': 0.2,
             'user_awareness': 0.2,
-            'incident_history': 0.3
+            'incident_history': 0.3,
+            'threat_landscape': 0.3
         }
         
-        score = sum(assessment_data[key] * weights[key] 
-                   for key in weights if key in assessment_data)
+        present = [key for key in weights if key in assessment_data]
+        total_weight = sum(weights[key] for key in present)
+        if not total_weight:
+            return 0.0
+        score = sum(assessment_data[key] * weights[key] for key in present) / total_weight
         
         return round(score, 2)
 
+    @staticmethod
+    def calculate_threat_risk_batch(threat_levels, affected_counts, classifications=None,
+                                    org_history=None) -> np.ndarray:
+        """Score many threats at once on a 0-10 scale
+
+        Takes parallel columns: threat levels (ThreatLevel codes or labels),
+        affected system counts, optionally the classification of the most
+        sensitive affected asset and the organization's recent high and
+        critical threat count. Returns one score per threat.
+        """
+        levels = np.asarray(threat_levels)
+        if levels.dtype.kind in 'iu':
+            score = LEVEL_RISK[np.clip(levels, 0, SEVERITY_CODES - 1)]
+        else:
+            score = _lookup(levels, THREAT_LEVEL_RISK)
+        score = score + np.minimum(np.log1p(np.asarray(affected_counts, dtype=np.float64)), 2.0)
+        if classifications is not None:
+            score += _lookup(classifications, CLASSIFICATION_RISK)
+        if org_history is not None:
+            # Saturates at +1 around fifty recent serious threats
+            score += np.minimum(np.log1p(np.asarray(org_history, dtype=np.float64)) / 4, 1.0)
+        return np.clip(score, 0.0, 10.0).round(2)
+
+    @staticmethod
+    def calculate_threat_risk(threat_level, affected_count: int = 0,
+                              classification: Optional[str] = None,
+                              org_history: float = 0) -> float:
+        """Score a single threat; see calculate_threat_risk_batch"""
+        return float(AnalyticsEngine.calculate_threat_risk_batch(
+            [threat_level], [affected_count], [classification], [org_history]
+        )[0])
+
     @staticmethod
     def analyze_incident_patterns(incidents: list) -> dict:
         """Analyze patterns in security incidents"""
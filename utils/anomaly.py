@@ -0,0 +1,210 @@
+import math
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import ANALYTICS_CONFIG
+from utils.threat_store import EPOCH
+
+HOURS_PER_WEEK = 168
+ONE_HOUR = timedelta(hours=1)
+# Zero-count weeks folded into a slot after a silence; older history has
+# decayed to nothing by then
+MAX_SILENT_WEEKS = 52
+
+def epoch_hour(value) -> int:
+    """Whole hours since the epoch for a naive UTC datetime or ISO string"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - EPOCH) // ONE_HOUR
+
+@dataclass(slots=True)
+class VolumeAnomaly:
+    """An hour whose threat count broke its seasonal baseline"""
+    organization_id: str
+    threat_type: str
+    hour: datetime      # start of the hour, UTC
+    count: int
+    expected: float
+    threshold: float
+
+class VolumeAnomalyDetector:
+    """Streaming spike detector on hourly threat volume per organization and type
+
+    Every (organization, threat type) series keeps an EWMA mean and variance
+    of its hourly count for each hour of the week, in fixed arrays that grow
+    only with new series. ``observe`` is O(1): it bumps the open hour's count
+    and compares it with that slot's threshold, reporting at most one anomaly
+    per series and hour. Closing an hour folds its count, and any silent
+    hours since, into the baselines.
+    """
+
+    def __init__(self, alpha: float = 0.3, threshold: float = 4.0, min_count: int = 5,
+                 warmup_weeks: int = 2, capacity: int = 64):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_count = min_count
+        self.warmup_weeks = warmup_weeks
+        self._index: Dict[Tuple[str, str], int] = {}
+        self._series: List[Tuple[str, str]] = []
+        self._allocate(capacity)
+        self._lock = threading.Lock()
+
+    def _allocate(self, capacity: int):
+        self._mean = np.zeros((capacity, HOURS_PER_WEEK))
+        self._var = np.zeros((capacity, HOURS_PER_WEEK))
+        self._seen = np.zeros((capacity, HOURS_PER_WEEK), dtype=np.int32)
+        self._hour = np.full(capacity, -1, dtype=np.int64)  # open hour, -1 before the first event
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._alerted = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        """Double the series capacity, keeping every baseline"""
+        old = (self._mean, self._var, self._seen, self._hour, self._count, self._alerted)
+        self._allocate(2 * len(self._hour))
+        for new, values in zip(
+            (self._mean, self._var, self._seen, self._hour, self._count, self._alerted), old
+        ):
+            new[:len(values)] = values
+
+    def _series_index(self, organization_id: Optional[str], threat_type: Optional[str]) -> int:
+        key = (organization_id or '', threat_type or '')
+        series = self._index.get(key)
+        if series is None:
+            if len(self._series) == len(self._hour):
+                self._grow()
+            series = self._index[key] = len(self._series)
+            self._series.append(key)
+        return series
+
+    def observe(self, organization_id: Optional[str], threat_type: Optional[str],
+                created_at, count: int = 1, total: Optional[int] = None) -> Optional[VolumeAnomaly]:
+        """Count threats for a series and report the hour if it is anomalous
+
+        ``total`` is the hour's count so far in the shared store; it replaces
+        this process's own count, so workers that each see part of the
+        traffic still judge the whole hour. Events for an hour already
+        closed are ignored: that hour has been folded into the baseline.
+        """
+        hour = epoch_hour(created_at)
+        with self._lock:
+            series = self._series_index(organization_id, threat_type)
+            current = self._hour[series]
+            if hour < current:
+                return None
+            if hour > current:
+                if current >= 0:
+                    self._close(series, int(current), hour)
+                self._hour[series] = hour
+                self._count[series] = 0
+                self._alerted[series] = False
+            if total is not None:
+                self._count[series] = max(int(self._count[series]), total)
+            else:
+                self._count[series] += count
+            return self._check(series, hour)
+
+    def _check(self, series: int, hour: int) -> Optional[VolumeAnomaly]:
+        observed = int(self._count[series])
+        slot = hour % HOURS_PER_WEEK
+        if (self._alerted[series] or observed < self.min_count
+                or self._seen[series, slot] < self.warmup_weeks):
+            return None
+        mean = self._mean[series, slot]
+        # Counts are at least Poisson-noisy, so the spread never drops below sqrt(mean)
+        spread = math.sqrt(max(self._var[series, slot], mean, 1.0))
+        limit = mean + self.threshold * spread
+        if observed <= limit:
+            return None
+        self._alerted[series] = True
+        organization_id, threat_type = self._series[series]
+        return VolumeAnomaly(
+            organization_id=organization_id,
+            threat_type=threat_type,
+            hour=EPOCH + hour * ONE_HOUR,
+            count=observed,
+            expected=float(mean),
+            threshold=float(limit)
+        )
+
+    def _close(self, series: int, hour: int, next_hour: int):
+        """Fold a finished hour and the silent hours up to next_hour into the baselines"""
+        self._fold(series, np.array([hour % HOURS_PER_WEEK]), float(self._count[series]))
+        silent = next_hour - hour - 1
+        if silent <= 0:
+            return
+        weeks, rest = divmod(silent, HOURS_PER_WEEK)
+        repeats = np.full(HOURS_PER_WEEK, min(weeks, MAX_SILENT_WEEKS))
+        first = (hour + 1) % HOURS_PER_WEEK
+        repeats[(first + np.arange(rest)) % HOURS_PER_WEEK] += 1
+        for round_ in range(int(repeats.max())):
+            self._fold(series, np.flatnonzero(repeats > round_), 0.0)
+
+    def _fold(self, series: int, slots: np.ndarray, value: float):
+        """One EWMA step of the mean and variance for the given slots
+
+        A slot's first observation seeds its mean, so young baselines are
+        not biased towards zero.
+        """
+        mean = self._mean[series, slots]
+        delta = value - mean
+        alpha = np.where(self._seen[series, slots] == 0, 1.0, self.alpha)
+        self._mean[series, slots] = mean + alpha * delta
+        self._var[series, slots] = (1 - alpha) * (self._var[series, slots] + alpha * delta ** 2)
+        self._seen[series, slots] += 1
+
+    def baseline(self, organization_id: str, threat_type: str, at) -> Optional[Tuple[float, float]]:
+        """Expected hourly count and its standard deviation at a time, if tracked"""
+        with self._lock:
+            series = self._index.get((organization_id or '', threat_type or ''))
+            if series is None:
+                return None
+            slot = epoch_hour(at) % HOURS_PER_WEEK
+            return float(self._mean[series, slot]), math.sqrt(self._var[series, slot])
+
+    def clear(self):
+        with self._lock:
+            self._index, self._series = {}, []
+            self._allocate(len(self._hour))
+
+    def rebuild(self, database, weeks: int = 8, now: Optional[datetime] = None) -> bool:
+        """Seed the baselines from the hourly counts of the last few weeks
+
+        Built off to the side and swapped in, like the dashboard metrics.
+        """
+        now = now or datetime.utcnow()
+        rows = database.fetch_all(
+            """
+            SELECT organization_id, threat_type, substr(created_at, 1, 13) AS hour, COUNT(*) AS threats
+            FROM threats
+            WHERE created_at >= ?
+            GROUP BY hour, organization_id, threat_type
+            ORDER BY hour
+            """,
+            ((now - timedelta(weeks=weeks)).isoformat(),)
+        )
+        fresh = VolumeAnomalyDetector(
+            self.alpha, self.threshold, self.min_count, self.warmup_weeks, len(self._hour)
+        )
+        for row in rows:
+            fresh.observe(
+                row['organization_id'], row['threat_type'],
+                row['hour'] + ':00', row['threats']
+            )
+        # Seeded hours are history: never report them again
+        fresh._alerted[:] = True
+        with self._lock:
+            (self._index, self._series, self._mean, self._var, self._seen,
+             self._hour, self._count, self._alerted) = (
+                fresh._index, fresh._series, fresh._mean, fresh._var, fresh._seen,
+                fresh._hour, fresh._count, fresh._alerted
+            )
+        return True
+
+volume_detector = VolumeAnomalyDetector(
+    alpha=ANALYTICS_CONFIG["anomaly_alpha"],
+    threshold=ANALYTICS_CONFIG["anomaly_threshold"],
+    min_count=ANALYTICS_CONFIG["anomaly_min_count"],
+    warmup_weeks=ANALYTICS_CONFIG["anomaly_warmup_weeks"]
+)
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None when missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop a single entry; returns whether it was cached"""
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class AsyncTTLCache(TTLCache):
+    """TTLCache for coroutine results with stale-while-revalidate and single-flight loads
+
+    Concurrent misses for one key share a single load, across threads and
+    event loops alike. An entry older than ``ttl`` is still served for
+    ``stale_ttl`` more seconds while one background load replaces it.
+
+    Loads run on an event loop the cache owns, so a caller being cancelled
+    or its loop closing never strands the callers sharing that load.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0.0):
+        super().__init__(maxsize, ttl)
+        self.stale_ttl = stale_ttl
+        self.stale_hits = 0
+        self._inflight: Dict[Hashable, Future] = {}
+        self._loads = set()
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value; it is dropped stale_ttl seconds after going stale"""
+        super().set(key, value, (self.ttl if ttl is None else ttl) + self.stale_ttl)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        load: Callable[[], Awaitable[Any]],
+        cacheable: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        """Return the cached value, awaiting load() on a miss
+
+        Values rejected by ``cacheable`` are handed to every caller waiting
+        on that load but not stored.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] - self.stale_ttl > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+            stale = entry is not None and entry[0] > now
+            if stale:
+                self.stale_hits += 1
+            else:
+                self._data.pop(key, None)
+                self.misses += 1
+        if leader:
+            self._start_load(key, load, flight, cacheable)
+        if stale:
+            return entry[1]
+        # Shielded, so a cancelled caller stops waiting without cancelling the load
+        return await asyncio.shield(asyncio.wrap_future(flight))
+
+    def _load_loop(self) -> asyncio.AbstractEventLoop:
+        """The cache's own event loop, started on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="cache-loads", daemon=True
+                ).start()
+            return self._loop
+
+    def _start_load(self, key: Hashable, load: Callable[[], Awaitable[Any]],
+                    flight: Future, cacheable: Optional[Callable[[Any], bool]]):
+        running = asyncio.run_coroutine_threadsafe(
+            self._load(key, load, flight, cacheable), self._load_loop()
+        )
+        self._loads.add(running)
+        running.add_done_callback(self._loads.discard)
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]],
+                    flight: Future, cacheable: Optional[Callable[[Any], bool]]):
+        """Run one load and publish its outcome to everyone waiting on flight"""
+        try:
+            value = await load()
+        except asyncio.CancelledError:
+            # Waiters asked for a value, not a cancellation
+            flight.set_exception(RuntimeError(f"Load for {key!r} was cancelled"))
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+        else:
+            if cacheable is None or cacheable(value):
+                self.set(key, value)
+            flight.set_result(value)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+
+    def stats(self) -> dict:
+        """Return hit/miss counters, stale hits and loads in flight"""
+        stats = super().stats()
+        with self._lock:
+            stats.update({'stale_hits': self.stale_hits, 'inflight': len(self._inflight)})
+        return stats
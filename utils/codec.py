@@ -0,0 +1,146 @@
+import dataclasses
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Iterable, List, Type, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional speedup
+    msgpack = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = (
+        orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+def _default(value):
+    """Encode values the JSON and msgpack encoders do not handle natively
+
+    Models render through ``to_dict`` so enum fields appear as their labels,
+    bare enums as their value and datetimes as ISO 8601 strings.
+    """
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, 'tolist'):
+        # NumPy arrays and scalars
+        return value.tolist()
+    return str(value)
+
+_field_types = {}
+
+def _model_field_types(model: type) -> dict:
+    """Return and cache the name -> type mapping of a model's fields"""
+    types = _field_types.get(model)
+    if types is None:
+        types = _field_types[model] = {f.name: f.type for f in dataclasses.fields(model)}
+    return types
+
+def _from_value(annotation, value):
+    """Convert a decoded JSON value back to its annotated type"""
+    if value is None:
+        return None
+    if isinstance(annotation, type):
+        if issubclass(annotation, Enum):
+            return annotation(value)
+        if annotation is datetime and isinstance(value, str):
+            return datetime.fromisoformat(value)
+    return value
+
+class Codec:
+    """One place for JSON and binary serialization of models and payloads
+
+    JSON uses orjson when it is installed and the standard library
+    otherwise; the binary format is msgpack when installed and falls back
+    to JSON bytes. Both paths produce the same output for the same input.
+    """
+
+    @staticmethod
+    def dumps(value: Any) -> bytes:
+        """Encode a value as compact UTF-8 JSON"""
+        if orjson is not None:
+            return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+        return json.dumps(
+            value, default=_default, separators=(',', ':'), ensure_ascii=False
+        ).encode()
+
+    @staticmethod
+    def dumps_text(value: Any) -> str:
+        """Encode a value as a JSON string, e.g. for TEXT columns and log lines"""
+        if orjson is not None:
+            return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS).decode()
+        return json.dumps(value, default=_default, separators=(',', ':'), ensure_ascii=False)
+
+    @staticmethod
+    def loads(data: Union[bytes, str]) -> Any:
+        """Decode JSON bytes or text"""
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    @staticmethod
+    def pack(value: Any) -> bytes:
+        """Encode a value in the binary format"""
+        if msgpack is not None:
+            return msgpack.packb(value, default=_default, use_bin_type=True, datetime=False)
+        return Codec.dumps(value)
+
+    @staticmethod
+    def unpack(data: bytes) -> Any:
+        """Decode a value produced by ``pack``"""
+        if msgpack is not None:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        return Codec.loads(data)
+
+    @staticmethod
+    def encode_many(records: Iterable) -> bytes:
+        """Encode a batch of models or dicts as one JSON array"""
+        return Codec.dumps(list(records))
+
+    @staticmethod
+    def encode_ndjson(records: Iterable) -> bytes:
+        """Encode a batch of models or dicts as newline-delimited JSON"""
+        records = list(records)
+        if not records:
+            return b""
+        if orjson is not None:
+            dumps, option = orjson.dumps, _ORJSON_OPTIONS
+            return b"\n".join(dumps(r, default=_default, option=option) for r in records) + b"\n"
+        return "".join(Codec.dumps_text(r) + "\n" for r in records).encode()
+
+    @staticmethod
+    def decode_ndjson(data: Union[bytes, str]) -> List[Any]:
+        """Decode newline-delimited JSON, skipping blank lines"""
+        loads = Codec.loads
+        return [loads(line) for line in data.splitlines() if line.strip()]
+
+    @staticmethod
+    def to_model(model: Type, data: dict):
+        """Build a model from a decoded dict, restoring enums and datetimes"""
+        types = _model_field_types(model)
+        return model(**{
+            name: _from_value(types[name], value)
+            for name, value in data.items()
+            if name in types
+        })
+
+    @staticmethod
+    def decode_models(model: Type, data: Union[bytes, str]) -> list:
+        """Decode a JSON array produced by ``encode_many`` back into models"""
+        to_model = Codec.to_model
+        return [to_model(model, item) for item in Codec.loads(data)]
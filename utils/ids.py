@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Tuple
+
+# Crockford base32 keeps encoded ids in the same order as their values
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# Every 10-bit value as two characters, so encoding is 13 table lookups
+_PAIRS = [a + b for a in CROCKFORD_ALPHABET for b in CROCKFORD_ALPHABET]
+
+RANDOM_BITS = 80
+MAX_RANDOM = (1 << RANDOM_BITS) - 1
+
+def encode_ulid(value: int) -> str:
+    """Encode a 128-bit integer as a 26 character ULID string"""
+    pairs = _PAIRS
+    return "".join([pairs[(value >> shift) & 0x3FF] for shift in range(120, -1, -10)])
+
+def decode_ulid(ulid: str) -> int:
+    """Decode a ULID string back into its 128-bit integer"""
+    value = 0
+    for char in ulid.upper():
+        value = (value << 5) | CROCKFORD_ALPHABET.index(char)
+    return value
+
+class IdGenerator:
+    """Monotonic, time-ordered ULID generator
+
+    The first 48 bits are the millisecond timestamp and the remaining 80
+    are random. Ids generated within the same millisecond increment the
+    random part instead of redrawing it, so ids always sort in creation
+    order and new rows land on the right edge of the primary key index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_id(self) -> str:
+        """Return a new ULID"""
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), 'big')
+            elif self._last_random < MAX_RANDOM:
+                # Same millisecond, or the clock stepped back: stay ordered
+                self._last_random += 1
+            else:
+                self._last_ms += 1
+                self._last_random = int.from_bytes(os.urandom(10), 'big') >> 1
+            value = (self._last_ms << RANDOM_BITS) | self._last_random
+        return encode_ulid(value)
+
+    @staticmethod
+    def timestamp(ulid: str) -> datetime:
+        """Return the creation time embedded in a ULID, as naive UTC"""
+        ms = decode_ulid(ulid[:10]) if len(ulid) >= 10 else 0
+        return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+    @staticmethod
+    def bounds(start: datetime, end: datetime) -> Tuple[str, str]:
+        """Return the smallest and largest ids created in [start, end]
+
+        ``start`` and ``end`` are naive UTC, like the model timestamps.
+        """
+        def to_ms(value: datetime) -> int:
+            return int(value.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+        return (
+            encode_ulid(to_ms(start) << RANDOM_BITS),
+            encode_ulid((to_ms(end) << RANDOM_BITS) | MAX_RANDOM),
+        )
+
+_generator = IdGenerator()
+
+def new_id() -> str:
+    """Return a new monotonic ULID from the shared generator"""
+    return _generator.new_id()
@@ -1,43 +1,182 @@
+import atexit
 import logging
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
 from datetime import datetime
-from config import MONITORING_CONFIG
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from config import LOG_CONFIG
+from utils.codec import Codec
+
+_log_queue = queue.SimpleQueue()
+_listener = None
+_configure_lock = threading.Lock()
+
+class JsonLineFormatter(logging.Formatter):
+    """Render each record as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.utcfromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        if isinstance(record.msg, dict):
+            entry.update(record.msg)
+        else:
+            entry['message'] = record.getMessage()
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return Codec.dumps_text(entry)
+
+class LazyQueueHandler(QueueHandler):
+    """Queue records untouched so formatting happens on the writer thread
+
+    The stock QueueHandler formats the message on the calling thread. Log
+    entries here are freshly built dicts that are never mutated after the
+    call, so the record can cross the queue as-is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def configure_logging(log_file: str = None):
+    """Route the application logger through a background file writer"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            if log_file is None:
+                return
+            _listener.stop()
+
+        path = Path(log_file or LOG_CONFIG['file'])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            path,
+            maxBytes=LOG_CONFIG['max_size'],
+            backupCount=LOG_CONFIG['backup_count'],
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonLineFormatter())
+
+        app_logger = logging.getLogger('DiploCyberHub')
+        app_logger.setLevel(LOG_CONFIG['level'])
+        app_logger.propagate = False
+        if not any(isinstance(h, LazyQueueHandler) for h in app_logger.handlers):
+            app_logger.addHandler(LazyQueueHandler(_log_queue))
+
+        _listener = QueueListener(_log_queue, file_handler)
+        _listener.start()
+
+def shutdown_logging():
+    """Flush queued records to disk and stop the writer thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+atexit.register(shutdown_logging)
+
+class LogSampler:
+    """Head-based sampling with per-action caps for high-volume log entries
+
+    Routes are sampled at their configured rate and each action may log at
+    most ``max_per_interval`` entries per interval. Everything dropped is
+    counted and reported as a single summary entry once the interval ends.
+    """
+
+    def __init__(self, config: dict = None):
+        config = config or LOG_CONFIG['sampling']
+        self.default_rate = config['default_rate']
+        self.route_rates = config.get('routes', {})
+        self.slow_request_ms = config['slow_request_ms']
+        self.always_log_status = config.get('always_log_status', 400)
+        self.max_per_interval = config['max_per_interval']
+        self.summary_interval = config['summary_interval']
+        self._lock = threading.Lock()
+        self._logged = defaultdict(int)
+        self._suppressed = defaultdict(int)
+        self._interval_end = time.monotonic() + self.summary_interval
+
+    def should_sample(self, route: str) -> bool:
+        """Decide at the start of a request whether it is logged"""
+        rate = self.route_rates.get(route, self.default_rate)
+        return rate >= 1 or random.random() < rate
+
+    def allow(self, action: str, route: str) -> bool:
+        """Apply the per-action cap; counts the entry as suppressed if over it"""
+        with self._lock:
+            if self._logged[action] < self.max_per_interval:
+                self._logged[action] += 1
+                return True
+            self._suppressed[(action, route)] += 1
+            return False
+
+    def suppress(self, action: str, route: str):
+        """Count an entry dropped by sampling"""
+        with self._lock:
+            self._suppressed[(action, route)] += 1
+
+    def flush_summary(self, logger: 'Logger', force: bool = False):
+        """Log one summary of suppressed entries once the interval has ended"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now < self._interval_end:
+                return
+            suppressed = self._suppressed
+            self._suppressed = defaultdict(int)
+            self._logged = defaultdict(int)
+            self._interval_end = now + self.summary_interval
+        if suppressed:
+            logger.log_activity(
+                user_id="system",
+                action="LOG_SUMMARY",
+                details={
+                    'interval_seconds': self.summary_interval,
+                    'suppressed': [
+                        {'action': action, 'route': route, 'count': count}
+                        for (action, route), count in suppressed.items()
+                    ],
+                    'message': f"{sum(suppressed.values())} similar events suppressed"
+                }
+            )
 
 class Logger:
     def __init__(self):
-        # Configure logging
-        logging.basicConfig(
-            level=MONITORING_CONFIG['log_level'],
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            filename='logs/diplocyber.log'
-        )
+        # Every instance shares the one queue-backed application logger
+        configure_logging()
         self.logger = logging.getLogger('DiploCyberHub')
 
     def log_activity(self, user_id: str, action: str, details: dict):
         """Log user activity"""
-        log_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        self.logger.info({
             'user_id': user_id,
             'action': action,
             'details': details
-        }
-        self.logger.info(str(log_entry))
+        })
 
     def log_error(self, error_message: str, error_type: str, stack_trace: str = None):
         """Log error information"""
-        log_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
+        self.logger.error({
             'error_type': error_type,
             'message': error_message,
             'stack_trace': stack_trace
-        }
-        self.logger.error(str(log_entry))
+        })
 
     def log_security_event(self, event_type: str, severity: str, details: dict):
         """Log security-related events"""
-        log_entry = {
-            'timestamp': datetime.utcnow().isoformat(),
+        if not self.logger.isEnabledFor(logging.WARNING):
+            return
+        self.logger.warning({
             'event_type': event_type,
             'severity': severity,
             'details': details
-        }
-        self.logger.warning(str(log_entry))
+        })
@@ -0,0 +1,123 @@
+from datetime import date, datetime, timedelta
+from fractions import Fraction
+from math import sqrt
+from typing import Optional
+from database import ALERT_TOTALS_TABLE, TOTALS_TABLE, rollup_query
+from models import ThreatLevel, ThreatStatus
+from utils.threat_store import SEVERITY_CODES
+
+def sample_variance(count: int, total, squares) -> Optional[float]:
+    """Sample variance from a count, sum and sum of squares, or None below two values
+
+    n * sum(x^2) - sum(x)^2 is formed exactly before dividing, so large
+    times with a small spread do not cancel into noise.
+    """
+    if count < 2:
+        return None
+    total, squares = Fraction(total), Fraction(squares)
+    return float((count * squares - total * total) / (count * (count - 1)))
+
+class MetricsEngine:
+    """Per-organization dashboard metrics read from the persisted totals
+
+    Triggers keep threat totals per (organization, level, status) and alert
+    totals per organization current inside every writing transaction, and
+    the daily rollups hold the threat trend. A read touches a handful of
+    rows, and every process sees the same numbers whoever wrote them.
+    """
+
+    def __init__(self, trend_days: int = 30):
+        self.trend_days = trend_days
+
+    def _window(self, today: date):
+        """First day of the trend window and the day after today"""
+        return today - timedelta(days=self.trend_days - 1), today + timedelta(days=1)
+
+    def threat_metrics(self, database, organization_id: str, today: date = None) -> dict:
+        """Return the threat metrics for one organization"""
+        today = today or datetime.utcnow().date()
+        rows = database.fetch_all(
+            f"""
+            SELECT threat_level, status, threats, resolution_count,
+                   resolution_minutes, resolution_squares
+            FROM {TOTALS_TABLE} WHERE organization_id = ?
+            """,
+            (organization_id,)
+        )
+        by_level = [0] * SEVERITY_CODES
+        open_by_level = [0] * SEVERITY_CODES
+        by_status = {status: 0 for status in ThreatStatus}
+        resolved = resolution_total = resolution_squares = 0
+        for row in rows:
+            status = ThreatStatus(row['status'])
+            by_level[row['threat_level']] += row['threats']
+            by_status[status] += row['threats']
+            if status != ThreatStatus.RESOLVED:
+                open_by_level[row['threat_level']] += row['threats']
+            else:
+                resolved += row['resolution_count']
+                resolution_total += row['resolution_minutes']
+                resolution_squares += row['resolution_squares']
+
+        variance = sample_variance(resolved, resolution_total, resolution_squares)
+        trend = database.fetch_all(*rollup_query(*self._window(today), organization_id))
+        return {
+            'total_threats': sum(by_level),
+            'critical_threats': by_level[ThreatLevel.CRITICAL],
+            'high_threats': by_level[ThreatLevel.HIGH],
+            'medium_threats': by_level[ThreatLevel.MEDIUM],
+            'low_threats': by_level[ThreatLevel.LOW],
+            'active_threats': sum(open_by_level),
+            'active_by_level': {level.label: open_by_level[level] for level in ThreatLevel},
+            'threats_by_status': {status.label: count for status, count in by_status.items()},
+            'average_resolution_time': resolution_total / resolved if resolved else None,
+            'resolution_time_stddev': sqrt(variance) if variance is not None else None,
+            'threat_trend': {row['day']: row['threats'] for row in trend if row['threats']}
+        }
+
+    def alert_metrics(self, database, organization_id: str, today: date = None) -> dict:
+        """Return the alert metrics for one organization"""
+        today = today or datetime.utcnow().date()
+        totals = database.fetch_one(
+            f"SELECT alerts, unacknowledged_alerts FROM {ALERT_TOTALS_TABLE} WHERE organization_id = ?",
+            (organization_id,)
+        )
+        start, end = self._window(today)
+        trend = database.fetch_all(
+            """
+            SELECT substr(created_at, 1, 10) AS day, COUNT(*) AS alerts
+            FROM alerts
+            WHERE organization_id = ? AND created_at >= ? AND created_at < ?
+            GROUP BY day ORDER BY day
+            """,
+            (organization_id, start.isoformat(), end.isoformat())
+        )
+        return {
+            'total_alerts': totals['alerts'] if totals else 0,
+            'unacknowledged_alerts': totals['unacknowledged_alerts'] if totals else 0,
+            'alert_trend': {row['day']: row['alerts'] for row in trend}
+        }
+
+    def totals(self, database) -> dict:
+        """Return platform-wide open threat counts by level"""
+        open_by_level = [0] * SEVERITY_CODES
+        for row in database.fetch_all(
+            f"SELECT threat_level, SUM(threats) AS threats FROM {TOTALS_TABLE} "
+            "WHERE status != ? GROUP BY threat_level",
+            (ThreatStatus.RESOLVED.value,)
+        ):
+            open_by_level[row['threat_level']] = row['threats']
+        alerts = database.fetch_one(
+            f"SELECT COALESCE(SUM(unacknowledged_alerts), 0) FROM {ALERT_TOTALS_TABLE}"
+        )
+        return {
+            'active_threats': sum(open_by_level),
+            'active_by_level': {level.label: open_by_level[level] for level in ThreatLevel},
+            'unacknowledged_alerts': alerts[0] if alerts else 0
+        }
+
+    def rebuild(self, database) -> bool:
+        """Recompute the stored totals from the threats and alerts tables"""
+        return database.rebuild_totals()
+
+metrics_engine = MetricsEngine()
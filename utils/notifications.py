@@ -34,7 +34,7 @@ class NotificationManager:
             # Send email alert
             pass
         
-        if priority in channels['sms']['priority']:
+        if priority in channels.get('sms', {}).get('priority', []):
             # Send SMS alert
             pass
         
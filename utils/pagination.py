@@ -0,0 +1,30 @@
+import base64
+import json
+from typing import Optional, Tuple
+
+class Pagination:
+    @staticmethod
+    def encode_cursor(created_at: str, record_id: str) -> str:
+        """Encode the (created_at, id) key of the last row into an opaque cursor"""
+        payload = json.dumps([created_at, record_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, str]:
+        """Decode a cursor back into its (created_at, id) key"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        except Exception:
+            raise ValueError("Invalid pagination cursor")
+        if not isinstance(created_at, str) or not isinstance(record_id, str):
+            raise ValueError("Invalid pagination cursor")
+        return created_at, record_id
+
+    @staticmethod
+    def next_cursor(rows: list, limit: int) -> Optional[str]:
+        """Return the cursor for the page after rows, fetched with limit + 1"""
+        if len(rows) <= limit:
+            return None
+        last = rows[limit - 1]
+        return Pagination.encode_cursor(last['created_at'], last['id'])
@@ -0,0 +1,107 @@
+import sqlite3
+import threading
+import time
+from typing import Tuple
+from database import ConnectionPool
+
+class TokenBucketLimiter:
+    """In-process token buckets, sharded so concurrent keys rarely contend.
+
+    Each key holds up to ``limit`` tokens that refill continuously over
+    ``period`` seconds; a request spends one token.
+    """
+
+    blocking = False
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10000):
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+
+    def acquire(self, key: str, limit: int, period: float) -> Tuple[bool, float, int]:
+        """Spend a token for key; returns (allowed, retry_after, remaining)"""
+        buckets, lock = self._shards[hash(key) % len(self._shards)]
+        refill = limit / period
+        now = time.monotonic()
+        with lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                if len(buckets) >= self.max_keys_per_shard:
+                    self._prune(buckets, now, period)
+                bucket = buckets[key] = [float(limit), now]
+            tokens = min(float(limit), bucket[0] + (now - bucket[1]) * refill)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return True, 0.0, int(tokens - 1)
+            bucket[0] = tokens
+            return False, (1 - tokens) / refill, 0
+
+    @staticmethod
+    def _prune(buckets: dict, now: float, period: float):
+        """Drop buckets idle for a full period; they would be full again anyway"""
+        for key in [key for key, (_, updated) in buckets.items() if now - updated >= period]:
+            del buckets[key]
+
+
+class SQLiteRateLimitBackend:
+    """Token buckets kept in a shared SQLite file so limits hold across workers
+
+    Buckets idle for a full period are deleted every ``prune_interval``
+    seconds, so keys seen once do not stay in the table forever.
+    """
+
+    blocking = True
+
+    def __init__(self, db_name: str, prune_interval: float = 60.0):
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+        self._prune_lock = threading.Lock()
+        self.pool = ConnectionPool(db_name)
+        with self.pool.connection() as connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+            connection.commit()
+
+    def acquire(self, key: str, limit: int, period: float) -> Tuple[bool, float, int]:
+        """Spend a token for key; returns (allowed, retry_after, remaining)"""
+        refill = limit / period
+        now = time.time()
+        self._prune_if_due(now, period)
+        with self.pool.connection() as connection:
+            # Refill and spend in one atomic upsert; no row means no token
+            row = connection.execute('''
+                INSERT INTO rate_limit_buckets (key, tokens, updated_at)
+                VALUES (?1, ?2 - 1, ?3)
+                ON CONFLICT (key) DO UPDATE SET
+                    tokens = min(?2, tokens + (?3 - updated_at) * ?4) - 1,
+                    updated_at = ?3
+                WHERE min(?2, tokens + (?3 - updated_at) * ?4) >= 1
+                RETURNING tokens
+            ''', (key, float(limit), now, refill)).fetchone()
+            if row is not None:
+                connection.commit()
+                return True, 0.0, int(row[0])
+            connection.rollback()
+            current = connection.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?",
+                (key,)
+            ).fetchone()
+        tokens = min(float(limit), current[0] + (now - current[1]) * refill)
+        return False, max(0.0, (1 - tokens) / refill), 0
+
+    def _prune_if_due(self, now: float, period: float):
+        """Drop buckets idle for a full period; they would be full again anyway"""
+        with self._prune_lock:
+            if now < self._next_prune:
+                return
+            self._next_prune = now + self.prune_interval
+        with self.pool.connection() as connection:
+            connection.execute(
+                "DELETE FROM rate_limit_buckets WHERE updated_at <= ?", (now - period,)
+            )
+            connection.commit()
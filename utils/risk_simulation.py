@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Tuple
+import numpy as np
+
+DEFAULT_SCENARIOS = 100_000
+# Beta concentration: higher means a control's rating is trusted more
+MATURITY_CONCENTRATION = 20.0
+LIKELIHOOD_CONCENTRATION = 10.0
+# Score thresholds used by the Risk Assessment page
+LOW_RISK_SCORE = 0.8
+MEDIUM_RISK_SCORE = 0.6
+HISTOGRAM_BINS = 40
+
+@dataclass(frozen=True, slots=True)
+class Distribution:
+    """Summary of one simulated quantity"""
+    mean: float
+    std: float
+    p5: float
+    p50: float
+    p95: float
+
+    @staticmethod
+    def of(samples: np.ndarray) -> 'Distribution':
+        p5, p50, p95 = np.percentile(samples, [5, 50, 95])
+        return Distribution(float(samples.mean()), float(samples.std()),
+                            float(p5), float(p50), float(p95))
+
+@dataclass(frozen=True, slots=True)
+class RiskSimulation:
+    """Outcome of a Monte Carlo risk assessment
+
+    ``score`` is the control effectiveness (higher is better) and
+    ``residual_risk`` the threat likelihood times the ineffective share.
+    """
+    scenarios: int
+    score: Distribution
+    residual_risk: Distribution
+    categories: Dict[str, Distribution]
+    risk_levels: Dict[str, float]        # probability of each page risk level
+    histogram: Tuple[Tuple[int, ...], Tuple[float, ...]]  # score counts, bin edges
+
+def rating_mean(position: int, levels: int) -> float:
+    """Expected value of a rating, matching the page's deterministic score"""
+    return min((position + 1) / levels, 0.97)
+
+def _beta_parameters(means: np.ndarray, concentration: float) -> Tuple[np.ndarray, np.ndarray]:
+    means = np.clip(means, 0.03, 0.97)
+    return means * concentration, (1 - means) * concentration
+
+@lru_cache(maxsize=256)
+def simulate_risk(
+    controls: Tuple[Tuple[str, int, int], ...],
+    likelihood: Tuple[int, int],
+    scenarios: int = DEFAULT_SCENARIOS,
+    seed: int = 0
+) -> RiskSimulation:
+    """Sample control maturity and threat likelihood over many scenarios
+
+    ``controls`` holds (category, position, levels) for every rated control
+    and ``likelihood`` the (position, levels) of the threat likelihood
+    rating. Each rating becomes a Beta distribution around its
+    deterministic value; all scenarios are drawn as one array, categories
+    are averaged equally, and the result is cached per input combination.
+    """
+    if not controls:
+        raise ValueError("At least one control rating is required")
+    rng = np.random.default_rng(seed)
+    categories = list(dict.fromkeys(category for category, _, _ in controls))
+    means = np.array([rating_mean(position, levels) for _, position, levels in controls])
+    alpha, beta = _beta_parameters(means, MATURITY_CONCENTRATION)
+    maturity = rng.beta(alpha, beta, size=(scenarios, len(controls)))
+
+    # Average the controls within each category, then the categories equally
+    weights = np.zeros((len(controls), len(categories)))
+    for row, (category, _, _) in enumerate(controls):
+        weights[row, categories.index(category)] = 1.0
+    weights /= weights.sum(axis=0)
+    by_category = maturity @ weights
+    score = by_category.mean(axis=1)
+
+    alpha, beta = _beta_parameters(
+        np.array([(likelihood[0] + 0.5) / likelihood[1]]), LIKELIHOOD_CONCENTRATION
+    )
+    residual = rng.beta(alpha[0], beta[0], size=scenarios) * (1 - score)
+
+    counts, edges = np.histogram(score, bins=HISTOGRAM_BINS, range=(0.0, 1.0))
+    low = float(np.mean(score >= LOW_RISK_SCORE))
+    high = float(np.mean(score < MEDIUM_RISK_SCORE))
+    return RiskSimulation(
+        scenarios=scenarios,
+        score=Distribution.of(score),
+        residual_risk=Distribution.of(residual),
+        categories={
+            category: Distribution.of(by_category[:, column])
+            for column, category in enumerate(categories)
+        },
+        risk_levels={'low': low, 'medium': 1.0 - low - high, 'high': high},
+        histogram=(tuple(int(c) for c in counts), tuple(float(e) for e in edges))
+    )
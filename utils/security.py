@@ -0,0 +1,232 @@
+import hashlib
+import jwt
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Union
+from config import SECURITY_CONFIG
+from database import API_KEY_VERSION_TABLE, db, row_to_model
+from models import APIKey
+from utils.cache import TTLCache
+import re
+
+
+# Verified API keys by hash, so authenticated requests skip the database
+api_key_cache = TTLCache(
+    maxsize=SECURITY_CONFIG['api_key_cache_size'],
+    ttl=SECURITY_CONFIG['api_key_cache_ttl']
+)
+
+# Unknown, expired and revoked keys by hash, kept apart so a flood of bad
+# keys cannot evict the verified ones
+invalid_api_key_cache = TTLCache(
+    maxsize=SECURITY_CONFIG['api_key_cache_size'],
+    ttl=SECURITY_CONFIG['api_key_invalid_cache_ttl']
+)
+
+# The api_keys version both caches reflect, and when it was last compared
+_key_version = {'version': None, 'checked_at': float('-inf')}
+_key_version_lock = threading.Lock()
+
+def _key_version_check_due() -> bool:
+    return time.monotonic() - _key_version['checked_at'] >= SECURITY_CONFIG['api_key_version_check']
+
+class SecurityUtils:
+    @staticmethod
+    def hash_password(password: str) -> str:
+        """Create secure password hash"""
+        salt = secrets.token_hex(16)
+        return hashlib.sha256(f"{password}{salt}".encode()).hexdigest() + ":" + salt
+
+    @staticmethod
+    def verify_password(stored_password: str, provided_password: str) -> bool:
+        """Verify password against stored hash"""
+        if ":" not in stored_password:
+            return False
+        stored_hash, salt = stored_password.split(":")
+        verify_hash = hashlib.sha256(f"{provided_password}{salt}".encode()).hexdigest()
+        return secrets.compare_digest(stored_hash, verify_hash)
+
+    @staticmethod
+    def generate_token(user_id: str, role: str) -> str:
+        """Generate JWT token for user authentication"""
+        expiration = datetime.utcnow() + timedelta(hours=8)
+        payload = {
+            'user_id': user_id,
+            'role': role,
+            'exp': expiration
+        }
+        return jwt.encode(payload, SECURITY_CONFIG['jwt_secret'], algorithm='HS256')
+
+    @staticmethod
+    def validate_password_strength(password: str) -> tuple[bool, str]:
+        """Check if password meets security requirements"""
+        if len(password) < SECURITY_CONFIG['min_password_length']:
+            return False, f"Password must be at least {SECURITY_CONFIG['min_password_length']} characters"
+        
+        checks = {
+            'uppercase': r'[A-Z]',
+            'lowercase': r'[a-z]',
+            'numbers': r'[0-9]',
+            'special': r'[!@#$%^&*(),.?":{}|<>]'
+        }
+        
+        missing = []
+        for check_name, pattern in checks.items():
+            if not re.search(pattern, password):
+                missing.append(check_name)
+        
+        if missing:
+            return False, f"Password must contain {', '.join(missing)}"
+        
+        return True, "Password meets requirements"
+
+    @staticmethod
+    def sanitize_input(input_string: str) -> str:
+        """Sanitize user input to prevent XSS and injection attacks"""
+        # Remove HTML tags
+        clean = re.compile('<.*?>')
+        sanitized = re.sub(clean, '', input_string)
+        # Escape special characters
+        sanitized = re.sub(r'[^\w\s-]', '', sanitized)
+        return sanitized.strip()
+
+    @staticmethod
+    def hash_api_key(api_key: str) -> str:
+        """Hash an API key for storage and lookup"""
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    @staticmethod
+    def lookup_cached_api_key(api_key: str) -> Optional[Union[dict, bool]]:
+        """Return the cached verification result without touching the database
+
+        That is the key's record, False for a key known to be invalid, or
+        None when the database must be asked. Keys revoked or changed by
+        another worker are noticed by the version check that forces a
+        database round every ``api_key_version_check`` seconds.
+        """
+        if _key_version_check_due():
+            return None
+        key_hash = SecurityUtils.hash_api_key(api_key)
+        record = api_key_cache.get(key_hash)
+        if record is None:
+            return False if invalid_api_key_cache.get(key_hash) else None
+        if record['expires_at'] and record['expires_at'] <= datetime.utcnow():
+            api_key_cache.invalidate(key_hash)
+            return None
+        return record
+
+    @staticmethod
+    def verify_api_key(api_key: str) -> Optional[dict]:
+        """Verify an API key and return its permissions and limits"""
+        record = SecurityUtils.lookup_cached_api_key(api_key)
+        if record is not None:
+            return record or None
+        return SecurityUtils.load_api_key(api_key)
+
+    @staticmethod
+    def sync_key_version():
+        """Drop both key caches if any API key changed since they were filled"""
+        row = db.fetch_one(f"SELECT version FROM {API_KEY_VERSION_TABLE} WHERE id = 1")
+        if row is None:
+            return
+        with _key_version_lock:
+            if row[0] != _key_version['version']:
+                api_key_cache.clear()
+                invalid_api_key_cache.clear()
+                _key_version['version'] = row[0]
+            _key_version['checked_at'] = time.monotonic()
+
+    @staticmethod
+    def load_api_key(api_key: str) -> Optional[dict]:
+        """Verify an API key against the database and cache the result
+
+        Callers check the cache first; this never reads it.
+        """
+        if _key_version_check_due():
+            SecurityUtils.sync_key_version()
+        key_hash = SecurityUtils.hash_api_key(api_key)
+        row = db.fetch_one(
+            "SELECT * FROM api_keys WHERE key_hash = ? AND is_active = 1",
+            (key_hash,)
+        )
+        if row is None:
+            invalid_api_key_cache.set(key_hash, True)
+            return None
+        key = row_to_model(APIKey, row)
+        now = datetime.utcnow()
+        if key.expires_at and key.expires_at <= now:
+            invalid_api_key_cache.set(key_hash, True)
+            return None
+
+        record = {
+            'id': key.id,
+            'organization_id': key.organization_id,
+            'permissions': key.permissions or [],
+            'rate_limit': key.rate_limit,
+            'expires_at': key.expires_at,
+        }
+        ttl = SECURITY_CONFIG['api_key_cache_ttl']
+        if key.expires_at:
+            ttl = min(ttl, (key.expires_at - now).total_seconds())
+        api_key_cache.set(key_hash, record, ttl=ttl)
+        return record
+
+    @staticmethod
+    def issue_api_key(
+        organization_id: str,
+        key_name: str,
+        permissions: list,
+        rate_limit: int,
+        created_by: str,
+        expires_in: Optional[timedelta] = None
+    ) -> Tuple[str, APIKey]:
+        """Create a new API key; the raw key is only returned here"""
+        api_key = secrets.token_urlsafe(32)
+        key = APIKey(
+            organization_id=organization_id,
+            key_name=key_name,
+            key_hash=SecurityUtils.hash_api_key(api_key),
+            permissions=permissions,
+            rate_limit=rate_limit,
+            created_by=created_by,
+            expires_at=datetime.utcnow() + expires_in if expires_in else None,
+            is_active=True
+        )
+        if not db.bulk_insert([key]):
+            raise RuntimeError("Failed to store API key")
+        return api_key, key
+
+    @staticmethod
+    def revoke_api_key(key_hash: str) -> bool:
+        """Deactivate an active API key and drop it from the verification cache"""
+        rows = db.execute_returning(
+            "UPDATE api_keys SET is_active = 0, updated_at = ? "
+            "WHERE key_hash = ? AND is_active = 1 RETURNING id",
+            (datetime.utcnow().isoformat(), key_hash)
+        )
+        api_key_cache.invalidate(key_hash)
+        invalid_api_key_cache.set(key_hash, True)
+        return bool(rows)
+
+    @staticmethod
+    def rotate_api_key(key_hash: str) -> Optional[str]:
+        """Replace an active API key's secret; the old key stops working immediately
+
+        Returns None when no active key has the given hash.
+        """
+        api_key = secrets.token_urlsafe(32)
+        rows = db.execute_returning(
+            "UPDATE api_keys SET key_hash = ?, updated_at = ? "
+            "WHERE key_hash = ? AND is_active = 1 RETURNING id",
+            (SecurityUtils.hash_api_key(api_key), datetime.utcnow().isoformat(), key_hash)
+        )
+        api_key_cache.invalidate(key_hash)
+        invalid_api_key_cache.set(key_hash, True)
+        return api_key if rows else None
+
+    @staticmethod
+    def api_key_cache_stats() -> dict:
+        """Return hit/miss counters for the API key cache"""
+        return api_key_cache.stats()
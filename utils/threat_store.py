@@ -0,0 +1,222 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+import numpy as np
+from models import ThreatLevel
+
+MS_PER_DAY = 86_400_000
+# Severity codes run 0 (unknown) to the highest ThreatLevel
+SEVERITY_CODES = max(ThreatLevel) + 1
+UNKNOWN = -1  # code for a missing organization or threat type
+EPOCH = datetime(1970, 1, 1)
+ONE_MS = timedelta(milliseconds=1)
+
+def to_epoch_ms(values) -> np.ndarray:
+    """Convert naive UTC datetimes to int64 milliseconds since the epoch"""
+    return np.asarray(values, dtype='datetime64[ms]').astype(np.int64)
+
+@dataclass(slots=True)
+class ThreatView:
+    """Read-only columns for a subset of a ThreatStore
+
+    The arrays are views into the store where possible, so building a view
+    copies nothing; filters that cannot be expressed as a slice copy only
+    the selected rows.
+    """
+    severity: np.ndarray         # int8 ThreatLevel codes, 0 when unknown
+    timestamp: np.ndarray        # int64 epoch milliseconds
+    organization: np.ndarray     # int32 codes into organizations
+    threat_type: np.ndarray      # int16 codes into threat_types
+    resolution_time: np.ndarray  # float64 minutes, NaN while unresolved
+    organizations: List[str]
+    threat_types: List[str]
+
+    def __len__(self) -> int:
+        return len(self.severity)
+
+    def select(self, mask: np.ndarray) -> 'ThreatView':
+        """Return the rows where mask is true"""
+        return ThreatView(
+            self.severity[mask], self.timestamp[mask], self.organization[mask],
+            self.threat_type[mask], self.resolution_time[mask],
+            self.organizations, self.threat_types
+        )
+
+    def for_organization(self, organization_id: str) -> 'ThreatView':
+        """Return the rows belonging to one organization"""
+        try:
+            code = self.organizations.index(organization_id)
+        except ValueError:
+            return self.select(np.zeros(len(self), dtype=bool))
+        return self.select(self.organization == code)
+
+class ThreatStore:
+    """Columnar, append-only store of threat incidents for analytics
+
+    Each attribute the dashboards aggregate on is kept in its own NumPy
+    array. Organization ids and threat types are interned to small integer
+    codes, so no per-row Python objects are held. Arrays grow by doubling
+    and time windows are found by binary search while rows arrive in time
+    order, which they do with time-ordered ids.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        capacity = max(capacity, 1)
+        self._severity = np.zeros(capacity, dtype=np.int8)
+        self._timestamp = np.zeros(capacity, dtype=np.int64)
+        self._organization = np.zeros(capacity, dtype=np.int32)
+        self._threat_type = np.zeros(capacity, dtype=np.int16)
+        self._resolution_time = np.zeros(capacity, dtype=np.float64)
+        self._size = 0
+        self._sorted = True
+        self.organizations: List[str] = []
+        self.threat_types: List[str] = []
+        self._organization_codes = {}
+        self._threat_type_codes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_records(cls, threats: Iterable) -> 'ThreatStore':
+        """Build a store from ThreatIncident instances or their dicts"""
+        threats = list(threats)
+        store = cls(capacity=len(threats))
+        store.extend(threats)
+        return store
+
+    @classmethod
+    def from_arrays(cls, severity, timestamp, organization, threat_type, resolution_time,
+                    organizations: List[str], threat_types: List[str]) -> 'ThreatStore':
+        """Build a store from columns that are already encoded
+
+        ``organization`` and ``threat_type`` hold codes into the given name
+        lists, as produced by a loader that groups rows itself.
+        """
+        store = cls(capacity=len(severity))
+        for name in organizations:
+            store._intern(name, store._organization_codes, store.organizations)
+        for name in threat_types:
+            store._intern(name, store._threat_type_codes, store.threat_types)
+        if len(severity):
+            store._append_columns(
+                np.asarray(severity, dtype=np.int8),
+                np.asarray(timestamp, dtype=np.int64),
+                np.asarray(organization, dtype=np.int32),
+                np.asarray(threat_type, dtype=np.int16),
+                np.asarray(resolution_time, dtype=np.float64)
+            )
+        return store
+
+    @staticmethod
+    def _intern(value: Optional[str], codes: dict, names: list) -> int:
+        if value is None:
+            return UNKNOWN
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(names)
+            names.append(value)
+        return code
+
+    def append(self, threat):
+        """Add one ThreatIncident (or dict with its fields)"""
+        self.extend([threat])
+
+    def extend(self, threats: Iterable):
+        """Add ThreatIncident instances or dicts with the same field names"""
+        severities, timestamps, organizations, threat_types, resolutions = [], [], [], [], []
+        with self._lock:
+            intern = self._intern
+            organization_codes, threat_type_codes = self._organization_codes, self._threat_type_codes
+            for threat in threats:
+                if isinstance(threat, dict):
+                    level, created_at = threat.get('threat_level'), threat.get('created_at')
+                    organization_id, threat_type = threat.get('organization_id'), threat.get('threat_type')
+                    resolution = threat.get('resolution_time')
+                else:
+                    level, created_at = threat.threat_level, threat.created_at
+                    organization_id, threat_type = threat.organization_id, threat.threat_type
+                    resolution = threat.resolution_time
+                # ThreatLevel members are ints already; labels are parsed
+                severities.append(level if isinstance(level, int) else ThreatLevel(level) if level else 0)
+                if isinstance(created_at, str):
+                    created_at = datetime.fromisoformat(created_at)
+                timestamps.append((created_at - EPOCH) // ONE_MS)
+                organizations.append(
+                    organization_codes.get(organization_id)
+                    if organization_id in organization_codes
+                    else intern(organization_id, organization_codes, self.organizations)
+                )
+                threat_types.append(
+                    threat_type_codes.get(threat_type)
+                    if threat_type in threat_type_codes
+                    else intern(threat_type, threat_type_codes, self.threat_types)
+                )
+                resolutions.append(np.nan if resolution is None else resolution)
+            if not severities:
+                return
+            self._append_columns(
+                np.array(severities, dtype=np.int8),
+                np.array(timestamps, dtype=np.int64),
+                np.array(organizations, dtype=np.int32),
+                np.array(threat_types, dtype=np.int16),
+                np.array(resolutions, dtype=np.float64)
+            )
+
+    def _append_columns(self, severity, timestamp, organization, threat_type, resolution_time):
+        count = len(severity)
+        needed = self._size + count
+        if needed > len(self._severity):
+            capacity = max(needed, 2 * len(self._severity))
+            for name in ('_severity', '_timestamp', '_organization', '_threat_type', '_resolution_time'):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                setattr(self, name, grown)
+
+        start = self._size
+        if self._sorted:
+            previous = self._timestamp[start - 1] if start else np.iinfo(np.int64).min
+            self._sorted = bool(timestamp[0] >= previous and np.all(timestamp[1:] >= timestamp[:-1]))
+        self._severity[start:needed] = severity
+        self._timestamp[start:needed] = timestamp
+        self._organization[start:needed] = organization
+        self._threat_type[start:needed] = threat_type
+        self._resolution_time[start:needed] = resolution_time
+        self._size = needed
+
+    def view(self, start: int = 0, stop: Optional[int] = None) -> ThreatView:
+        """Return a zero-copy view of rows [start, stop)"""
+        stop = self._size if stop is None else min(stop, self._size)
+        return ThreatView(
+            self._severity[start:stop],
+            self._timestamp[start:stop],
+            self._organization[start:stop],
+            self._threat_type[start:stop],
+            self._resolution_time[start:stop],
+            self.organizations,
+            self.threat_types
+        )
+
+    def window(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> ThreatView:
+        """Return the rows created in [start, end)
+
+        A binary search over the timestamps gives a zero-copy slice while
+        rows are in time order; otherwise the rows are selected by mask.
+        """
+        timestamps = self._timestamp[:self._size]
+        low = to_epoch_ms(start).item() if start is not None else None
+        high = to_epoch_ms(end).item() if end is not None else None
+        if self._sorted:
+            first = 0 if low is None else int(np.searchsorted(timestamps, low, side='left'))
+            last = self._size if high is None else int(np.searchsorted(timestamps, high, side='left'))
+            return self.view(first, last)
+
+        mask = np.ones(self._size, dtype=bool)
+        if low is not None:
+            mask &= timestamps >= low
+        if high is not None:
+            mask &= timestamps < high
+        return self.view().select(mask)